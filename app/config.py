@@ -5,7 +5,50 @@ class Settings(BaseSettings):
     POCKETBASE_URL: str = "http://127.0.0.1:8090"
     OLLAMA_BASE_URL: str = "http://127.0.0.1:11434"
     DEFAULT_MODEL: str = "qwen3:8b"
+    DEFAULT_EMBED_MODEL: str = "nomic-embed-text"
+    EMBED_BATCH_WINDOW_MS: int = 5
+    EMBED_MAX_BATCH: int = 64
+    EMBED_CACHE_ENABLED: bool = True
+    EMBED_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
     OLLAMA_KEEP_ALIVE: str = "2h"
+    OLLAMA_KEEP_ALIVE_WARM: str = "30m"
+    OLLAMA_KEEP_ALIVE_COLD: str = "5m"
+
+    OPTIONS_POLICY_ENABLED: bool = True
+    OLLAMA_NUM_CTX_BUCKETS: list[int] = [2048, 4096, 8192, 16384, 32768]
+    OLLAMA_MODEL_OPTIONS: dict[str, dict] = {}
+    OLLAMA_NATIVE_PASSTHROUGH: bool = True
+    MODEL_CATALOG_REFRESH_SECONDS: int = 60
+    SETTINGS_REFRESH_SECONDS: float = 5.0
+    ROLLUP_FLUSH_SECONDS: float = 5.0
+    USAGE_STORE_ENABLED: bool = True
+    USAGE_STORE_FLUSH_SECONDS: float = 1.0
+    USAGE_STORE_RETENTION_DAYS: int = 90  # 0이면 날짜 파티션을 지우지 않음
+    SPOOL_ENABLED: bool = True
+    SPOOL_FSYNC_MS: int = 50
+    SPOOL_SEGMENT_BYTES: int = 4 * 1024 * 1024
+    SPOOL_REPLAY_BATCH: int = 200
+    RETENTION_DAYS: dict[str, int] = {"usage_logs": 90, "security_events": 180}
+    RETENTION_INTERVAL_SECONDS: int = 3600
+    RETENTION_DELETE_BATCH: int = 100
+    RETENTION_DELETE_RATE: float = 50.0
+    STORAGE_BACKEND: str = "pocketbase"  # "pocketbase" | "sqlite" (단일 노드, app/services/sqlite_storage.py)
+    STORAGE_THREADS: int = 8
+    STORAGE_SQLITE_PATH: str = ""  # 기본 {DATA_DIR}/storage.db
+    STORAGE_SQLITE_BATCH: int = 500
+    STORAGE_SYNC_SECONDS: float = 15.0
+    STORAGE_RECONCILE_SECONDS: float = 600.0  # PocketBase 삭제 반영(id 전체 비교) 간격
+    OLLAMA_PULL_BACKENDS: list[str] = []
+
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL_MS: int = 100
+    LOOP_STALL_THRESHOLD_MS: int = 250
+
+    MODEL_POLICY_ENABLED: bool = True
+    MODEL_POLICY_INTERVAL: int = 300
+    MODEL_POLICY_WINDOW_HOURS: int = 168
+    MODEL_POLICY_IDLE_MINUTES: int = 30
+    MODEL_POLICY_PRELOAD_MIN_REQUESTS: float = 3.0
 
     JWT_SECRET: str = "change-me"
     JWT_ALGORITHM: str = "HS256"
@@ -15,6 +58,14 @@ class Settings(BaseSettings):
 
     REDIS_URL: str = ""
 
+    DATA_DIR: str = "data"
+    OLLAMA_DETECT_TIMEOUT: float = 2.0
+
+    LEADER_LOCK_TTL: int = 15
+
+    BATCH_CONCURRENCY: int = 2
+    BATCH_MAX_FILE_BYTES: int = 200 * 1024 * 1024
+
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
 
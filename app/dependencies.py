@@ -4,11 +4,9 @@ import logging
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from pocketbase.utils import ClientResponseError
 
 from app.config import settings
-from app.database import pb
-from app.services import cache
+from app.services import cache, storage, timing
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +23,7 @@ def _decode_jwt(token: str) -> dict:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
 
+@timing.timed("auth")
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> dict:
@@ -43,15 +42,12 @@ async def get_current_user(
         return cached
 
     try:
-        record = pb.collection("users").get_one(user_id)
-    except ClientResponseError as e:
-        if e.status == 404:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-        logger.error(f"PocketBase error fetching user {user_id}: {e}")
-        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Database temporarily unavailable")
+        record = await storage.run(storage.backend().get_user, user_id)
     except Exception as e:
         logger.error(f"PocketBase error fetching user {user_id}: {type(e).__name__}: {e}")
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Database temporarily unavailable")
+    if record is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
 
     user = _record_to_dict(record)
     cache.set_cached_jwt_user(user_id, user)
@@ -65,34 +61,41 @@ async def get_api_key_user(
     token = credentials.credentials
 
     if token.startswith(API_KEY_PREFIX):
-        key_hash = hashlib.sha256(token.encode()).hexdigest()
-
-        # 캐시 히트 → DB 2번 스킵
-        cached = cache.get_cached_apikey_user(key_hash)
-        if cached:
-            return cached
-
-        try:
-            results = pb.collection("api_keys").get_list(1, 1, {"filter": f'keyHash="{key_hash}" && isActive=true'})
-            if not results.items:
-                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid API key")
-            key_record = results.items[0]
-            user_record = pb.collection("users").get_one(key_record.user)
-            user_status = getattr(user_record, "status", "active")
-            if user_status == "blocked":
-                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Account blocked")
-            user = {**_record_to_dict(user_record), "_api_key_id": key_record.id}
-            cache.set_cached_apikey_user(key_hash, user)
-            return user
-        except HTTPException:
-            raise
-        except Exception as e:
-            logger.error(f"PocketBase error (API key auth): {type(e).__name__}: {e}")
-            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Database temporarily unavailable")
+        with timing.span("auth"):
+            return await _get_api_key_user(token)
     else:
         return await get_current_user(credentials)
 
 
+async def _get_api_key_user(token: str) -> dict:
+    key_hash = hashlib.sha256(token.encode()).hexdigest()
+
+    # 캐시 히트 → DB 2번 스킵
+    cached = cache.get_cached_apikey_user(key_hash)
+    if cached:
+        return cached
+
+    backend = storage.backend()
+    try:
+        key_record = await storage.run(backend.find_api_key, key_hash)
+        if key_record is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid API key")
+        user_record = await storage.run(backend.get_user, key_record.user)
+        if user_record is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid API key")
+        user_status = getattr(user_record, "status", "active")
+        if user_status == "blocked":
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Account blocked")
+        user = {**_record_to_dict(user_record), "_api_key_id": key_record.id}
+        cache.set_cached_apikey_user(key_hash, user)
+        return user
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"PocketBase error (API key auth): {type(e).__name__}: {e}")
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Database temporarily unavailable")
+
+
 async def require_admin(user: dict = Depends(get_current_user)) -> dict:
     if user.get("role") != "ADMIN":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
@@ -1,23 +1,70 @@
+import json
+import re
 import time
 import logging
+import uuid
 
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import Response
 
+from app.services import timing
+
 logger = logging.getLogger("abcdllm")
 
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
 
 class RequestLoggerMiddleware(BaseHTTPMiddleware):
+    """요청 로그 + 요청 ID + Server-Timing.
+
+    - X-Request-ID: 클라이언트가 보낸 값(형식이 맞을 때) 또는 새로 생성, 응답 헤더로 반환
+    - Server-Timing: timing.span 구간 합계 (app/services/timing.py)
+    - 스트리밍 응답(Content-Length 없음)은 본문이 끝날 때 전체 구간으로 한 줄 더 기록
+    """
+
     async def dispatch(self, request: Request, call_next) -> Response:
+        incoming = request.headers.get("x-request-id", "")
+        request_id = incoming if _REQUEST_ID_RE.match(incoming) else uuid.uuid4().hex
+        req_timing = timing.begin(request_id)
+        request.state.request_id = request_id  # scope["state"] — loop_monitor가 정체 스택에서 읽음
+
         start = time.time()
         response = await call_next(request)
         elapsed = (time.time() - start) * 1000
+
+        response.headers["X-Request-ID"] = request_id
+        response.headers["Server-Timing"] = req_timing.header()
+        streaming = "content-length" not in response.headers
         logger.info(
-            "%s %s %d %.1fms",
+            "%s %s %d %.1fms rid=%s spans=%s%s",
             request.method,
             request.url.path,
             response.status_code,
             elapsed,
+            request_id,
+            json.dumps(req_timing.summary(), separators=(",", ":")),
+            " (headers)" if streaming else "",
+            extra={"requestId": request_id, "spans": req_timing.summary()},
         )
+        if streaming:
+            response.body_iterator = _log_on_finish(response.body_iterator, request, response.status_code, req_timing)
         return response
+
+
+async def _log_on_finish(body_iterator, request: Request, status_code: int, req_timing: timing.RequestTiming):
+    """스트리밍 본문이 끝난 뒤(또는 클라이언트가 끊은 뒤) 전체 구간 기록 — Server-Timing 트레일러 대신"""
+    try:
+        async for chunk in body_iterator:
+            yield chunk
+    finally:
+        logger.info(
+            "%s %s %d %.1fms rid=%s spans=%s (stream end)",
+            request.method,
+            request.url.path,
+            status_code,
+            req_timing.total_ms(),
+            req_timing.request_id,
+            json.dumps(req_timing.summary(), separators=(",", ":")),
+            extra={"requestId": req_timing.request_id, "spans": req_timing.summary()},
+        )
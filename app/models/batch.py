@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+from typing import Optional
+
+
+class BatchCreateRequest(BaseModel):
+    input_file_id: str
+    endpoint: str
+    completion_window: str = "24h"
+    metadata: Optional[dict] = None
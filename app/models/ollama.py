@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional
 
 
@@ -15,6 +15,21 @@ class ChatRequest(BaseModel):
     think: Optional[bool] = None  # None = 모델 기본값, False = thinking 비활성화(빠름)
 
 
+class NativeMessageSchema(MessageSchema):
+    """Ollama 네이티브 메시지 — images, tool_calls 등 추가 필드 보존"""
+    model_config = ConfigDict(extra="allow")
+
+    content: str = ""
+
+
+class NativeChatRequest(ChatRequest):
+    """Ollama 네이티브 /api/chat — tools, format 등 추가 필드 보존. stream 기본값은 Ollama와 같이 true"""
+    model_config = ConfigDict(extra="allow")
+
+    messages: list[NativeMessageSchema]
+    stream: bool = True
+
+
 class ChatResponse(BaseModel):
     model: str
     message: MessageSchema
@@ -24,6 +39,23 @@ class ChatResponse(BaseModel):
     eval_count: Optional[int] = None
 
 
+class EmbeddingRequest(BaseModel):
+    """OpenAI 호환 /v1/embeddings"""
+    model: Optional[str] = None
+    input: str | list[str]
+    encoding_format: Optional[str] = None  # "float"(기본) | "base64"
+    dimensions: Optional[int] = None
+
+
+class EmbedRequest(BaseModel):
+    """Ollama 네이티브 /api/embed"""
+    model: Optional[str] = None
+    input: str | list[str]
+    truncate: Optional[bool] = None
+    options: Optional[dict] = None
+    keep_alive: Optional[str | int] = None
+
+
 class ModelShowRequest(BaseModel):
     name: str
 
@@ -1,4 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pocketbase.models import Record
 
 from app.database import pb
 from app.dependencies import require_admin, _record_to_dict
@@ -10,7 +16,10 @@ from app.models.admin import (
     OllamaSettingsResponse,
     OllamaSettingsUpdateRequest,
 )
-from app.services import metrics_service, security_service, ollama_client
+from app.services import (
+    embed_batcher, embedding_cache, export_service, leader, pagination, metrics_service, model_catalog, model_policy, options_policy,
+    loop_monitor, profiler, pull_jobs, retention, rollups, security_service, ollama_client, storage, system_settings, usage_spool, usage_store,
+)
 from app.config import settings
 
 router = APIRouter()
@@ -32,10 +41,44 @@ def _app_record_to_dict(r) -> dict:
     }
 
 
+def _keyset_page(
+    response: Response, collection: str, filter: str, sort: str, allowed: tuple[str, ...],
+    limit: int, cursor: str | None,
+) -> list[Record]:
+    """관리자 목록 공통: 정렬 검증 → 키셋 한 페이지 조회, 다음 커서는 X-Next-Cursor 헤더로 (마지막 페이지면 헤더 없음)"""
+    try:
+        field, descending = pagination.parse_sort(sort, allowed)
+        items, next_cursor = pagination.fetch_page(collection, filter, field, descending, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [Record(item) for item in items]
+
+
+def _equals(**fields) -> list[str]:
+    return [f"{name}={pagination.quote(value)}" for name, value in fields.items() if value not in (None, "")]
+
+
 @router.get("/users")
-async def list_users(admin: dict = Depends(require_admin)):
-    results = pb.collection("users").get_list(1, 200, {"sort": "-created"})
-    return [_record_to_dict(r) for r in results.items]
+async def list_users(
+    response: Response,
+    limit: int = Query(200, ge=1, le=pagination.MAX_PAGE_SIZE),
+    cursor: str | None = Query(None, description="이전 응답의 X-Next-Cursor (같은 sort/필터로)"),
+    sort: str = Query("-created", description="created, email, name, totalUsage, dailyUsage, lastActive (- 내림차순)"),
+    q: str = Query("", description="이메일/이름 부분 일치"),
+    role: str = "",
+    user_status: str = Query("", alias="status"),
+    admin: dict = Depends(require_admin),
+):
+    conditions = _equals(role=role, status=user_status)
+    if q:
+        conditions.append(f"(email~{pagination.quote(q)} || name~{pagination.quote(q)})")
+    records = _keyset_page(
+        response, "users", pagination.join_filters(*conditions), sort,
+        ("created", "email", "name", "totalUsage", "dailyUsage", "lastActive"), limit, cursor,
+    )
+    return [_record_to_dict(r) for r in records]
 
 
 @router.patch("/users/{user_id}")
@@ -56,6 +99,56 @@ async def security_events(admin: dict = Depends(require_admin)):
     return security_service.get_events()
 
 
+async def _export_response(collection: str, filter: str, format: str) -> StreamingResponse:
+    try:
+        body = await export_service.open_export(collection, filter, format)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"PocketBase error: {e}")
+    filename = f"{collection}-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.{format}"
+    return StreamingResponse(
+        body,
+        media_type=export_service.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/export/usage-logs")
+async def export_usage_logs(
+    start: datetime | None = Query(None, description="시작 시각 (ISO 8601, 포함)"),
+    end: datetime | None = Query(None, description="종료 시각 (ISO 8601, 미포함)"),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    user: str = "",
+    api_key: str = Query("", alias="apiKey"),
+    model: str = "",
+    endpoint: str = "",
+    status_code: int | None = Query(None, alias="status"),
+    errors_only: bool = Query(False, alias="errorsOnly"),
+    admin: dict = Depends(require_admin),
+):
+    """usage_logs 원본을 created 순으로 스트리밍 (NDJSON/CSV)"""
+    filter = export_service.build_filter(start, end, {
+        "user": user, "apiKey": api_key, "model": model, "endpoint": endpoint,
+        "statusCode": status_code, "isError": True if errors_only else None,
+    })
+    return await _export_response("usage_logs", filter, format)
+
+
+@router.get("/export/security-events")
+async def export_security_events(
+    start: datetime | None = Query(None, description="시작 시각 (ISO 8601, 포함)"),
+    end: datetime | None = Query(None, description="종료 시각 (ISO 8601, 미포함)"),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    type: str = "",
+    severity: str = "",
+    ip: str = "",
+    user: str = "",
+    admin: dict = Depends(require_admin),
+):
+    """security_events 원본을 created 순으로 스트리밍 (NDJSON/CSV)"""
+    filter = export_service.build_filter(start, end, {"type": type, "severity": severity, "ip": ip, "userId": user})
+    return await _export_response("security_events", filter, format)
+
+
 @router.get("/metrics")
 async def system_metrics(admin: dict = Depends(require_admin)):
     base = metrics_service.get_system_metrics()
@@ -83,33 +176,100 @@ async def system_metrics(admin: dict = Depends(require_admin)):
     }
 
 
+@router.get("/profile")
+async def sampling_profile(
+    seconds: float = Query(10.0, gt=0, le=profiler.MAX_SECONDS),
+    interval_ms: float = Query(10.0, ge=profiler.MIN_INTERVAL_MS, le=1000),
+    format: str = Query("collapsed", pattern="^(collapsed|speedscope)$"),
+    idle: bool = Query(False, description="대기 중인 스택(select, 큐 대기)도 포함"),
+    admin: dict = Depends(require_admin),
+):
+    """요청을 받은 워커의 파이썬 스택을 seconds 동안 샘플링 + 같은 기간 이벤트 루프 지연.
+    collapsed는 text/plain(루프 지연은 X-Loop-Lag-* 헤더), speedscope는 JSON(loopLag 포함)."""
+    try:
+        result = await profiler.profile(seconds, interval_ms, include_idle=idle)
+    except profiler.ProfilerBusy as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+    lag = result["loopLag"]
+    headers = {
+        "X-Profile-Ticks": str(result["ticks"]),
+        "X-Profile-Duration-Ms": str(result["durationMs"]),
+        "X-Loop-Lag-P99-Ms": str(lag.get("p99Ms", 0)),
+        "X-Loop-Lag-Max-Ms": str(lag.get("maxMs", 0)),
+    }
+    if format == "speedscope":
+        return JSONResponse(
+            profiler.to_speedscope(result),
+            headers={**headers, "Content-Disposition": 'attachment; filename="profile.speedscope.json"'},
+        )
+    return PlainTextResponse(profiler.to_collapsed(result), headers=headers)
+
+
+@router.get("/loop-lag")
+async def loop_lag(
+    format: str = Query("json", pattern="^(json|prometheus)$"),
+    stacks: bool = Query(True, description="정체 내역에 스택 포함"),
+    admin: dict = Depends(require_admin),
+):
+    """이벤트 루프 지연 히스토그램(누적 버킷)과 최근 정체(블로킹 호출) 스택 — 요청을 받은 워커 기준"""
+    snap = loop_monitor.snapshot(include_stacks=stacks)
+    if format == "prometheus":
+        lines = ["# TYPE gateway_event_loop_lag_ms histogram"]
+        lines += [f'gateway_event_loop_lag_ms_bucket{{le="{b["le"]}"}} {b["count"]}' for b in snap["buckets"]]
+        lines += [f"gateway_event_loop_lag_ms_sum {snap['sumMs']}", f"gateway_event_loop_lag_ms_count {snap['count']}"]
+        return PlainTextResponse("\n".join(lines) + "\n")
+    return snap
+
+
+@router.get("/spool")
+async def spool_status(
+    format: str = Query("json", pattern="^(json|prometheus)$"),
+    admin: dict = Depends(require_admin),
+):
+    """사용량/쿼터 스풀: 미반영 깊이, 지연(가장 오래된 미반영 항목 경과 시간), 재전송 실패 — 요청을 받은 워커 기준"""
+    snap = await asyncio.to_thread(usage_spool.snapshot)
+    if format == "prometheus":
+        lines = [
+            "# TYPE gateway_usage_spool_depth_entries gauge",
+            f"gateway_usage_spool_depth_entries {snap['depthEntries']}",
+            "# TYPE gateway_usage_spool_depth_bytes gauge",
+            f"gateway_usage_spool_depth_bytes {snap['depthBytes']}",
+            "# TYPE gateway_usage_spool_lag_seconds gauge",
+            f"gateway_usage_spool_lag_seconds {snap['lagSeconds']}",
+            "# TYPE gateway_usage_spool_delivered_total counter",
+            f"gateway_usage_spool_delivered_total {snap['delivered']}",
+            "# TYPE gateway_usage_spool_failures_total counter",
+            f"gateway_usage_spool_failures_total {snap['failures']}",
+            "# TYPE gateway_usage_spool_dead_letters_total counter",
+            f"gateway_usage_spool_dead_letters_total {snap['deadLetters']}",
+        ]
+        return PlainTextResponse("\n".join(lines) + "\n")
+    return snap
+
+
 @router.get("/models/performance")
-async def model_performance(admin: dict = Depends(require_admin)):
-    """Compute model performance from usage_logs."""
+async def model_performance(
+    hours: int = Query(24, ge=1, le=24 * 90, description="집계 기간 (시간)"),
+    admin: dict = Depends(require_admin),
+):
+    """Compute model performance from hourly usage rollups."""
     performance: list[dict] = []
     try:
-        data = await ollama_client.list_models()
+        data = await model_catalog.get_tags()
         models = data.get("models", [])
 
-        # N+1 제거: 모든 모델 로그를 쿼리 1번으로 가져와 메모리에서 집계
-        all_logs = pb.collection("usage_logs").get_list(
-            1, 500, {"sort": "-created"}
-        )
-        # 모델별 로그 분류
-        logs_by_model: dict[str, list] = {}
-        for r in all_logs.items:
-            m_name = getattr(r, "model", "") or ""
-            if m_name not in logs_by_model:
-                logs_by_model[m_name] = []
-            logs_by_model[m_name].append(r)
+        # 모델×시간 롤업만 읽음 (usage_logs 원본 스캔 없음)
+        since = (datetime.now(timezone.utc) - timedelta(hours=hours - 1)).strftime("%Y-%m-%d %H:00")
+        totals = rollups.model_totals(since)
 
         for m in models:
             name = m.get("name", "")
-            items = logs_by_model.get(name, [])
-            total_tokens = sum((getattr(r, "total_tokens", 0) or 0) for r in items)
-            total_time = sum((getattr(r, "response_time_ms", 0) or 0) for r in items)
-            error_count = sum(1 for r in items if getattr(r, "is_error", False) or getattr(r, "isError", False))
-            count = len(items)
+            t = totals.get(name) or {}
+            total_tokens = t.get("totalTokens", 0)
+            total_time = t.get("responseTimeMs", 0)
+            error_count = t.get("errors", 0)
+            count = t.get("requests", 0)
 
             tokens_per_sec = round(total_tokens / (total_time / 1000), 1) if total_time > 0 else 0
             avg_latency = round(total_time / count, 1) if count > 0 else 0
@@ -132,6 +292,91 @@ async def model_performance(admin: dict = Depends(require_admin)):
     return performance
 
 
+@router.get("/usage/query")
+async def usage_query(
+    start: datetime | None = Query(None, description="시작 시각 (ISO 8601, 기본: end 24시간 전)"),
+    end: datetime | None = Query(None, description="종료 시각 (ISO 8601, 기본: 현재)"),
+    group_by: str = Query("model", description=f"쉼표 구분: {', '.join(usage_store.GROUP_BY)} (빈 값이면 전체 합계)"),
+    model: str = "",
+    key: str = Query("", description="API 키 id"),
+    user: str = Query("", description="사용자 id"),
+    endpoint: str = "",
+    status_code: int | None = Query(None, alias="status"),
+    percentiles: str = Query("50,95,99", description="응답 시간 백분위 (쉼표 구분)"),
+    admin: dict = Depends(require_admin),
+):
+    """로컬 컬럼 저장소 기반 사용량 분석: 기간 + 그룹별 요청/오류/토큰 합계와 응답 시간 백분위"""
+    # 시간대가 없는 값은 UTC로 간주 (usage_logs.created와 동일)
+    end_ts = (end.replace(tzinfo=end.tzinfo or timezone.utc) if end else datetime.now(timezone.utc)).timestamp()
+    start_ts = start.replace(tzinfo=start.tzinfo or timezone.utc).timestamp() if start else end_ts - 86400
+    if start_ts >= end_ts:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    groups = [g.strip() for g in group_by.split(",") if g.strip()]
+    unknown = [g for g in groups if g not in usage_store.GROUP_BY]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown group_by: {', '.join(unknown)}")
+    try:
+        points = tuple(float(p) for p in percentiles.split(",") if p.strip())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="percentiles must be numbers")
+    if any(not 0 < p <= 100 for p in points):
+        raise HTTPException(status_code=400, detail="percentiles must be in (0, 100]")
+
+    filters = {"model": model, "key": key, "user": user, "endpoint": endpoint, "status": status_code}
+    result = await asyncio.to_thread(usage_store.query, start_ts, end_ts, groups, filters, points)
+    return {
+        "start": datetime.fromtimestamp(start_ts, timezone.utc).isoformat(),
+        "end": datetime.fromtimestamp(end_ts, timezone.utc).isoformat(),
+        **result,
+    }
+
+
+@router.get("/models/policy")
+async def model_policy_status(admin: dict = Depends(require_admin)):
+    """모델 VRAM 정책: 모델별 등급/keep_alive와 최근 preload/unload 결정"""
+    policy = model_policy.snapshot()
+    if not leader.is_leader():
+        # 통계/등급 계산과 preload/unload는 리더 워커에서만 실행되므로 리더가 게시한 내역을 사용
+        policy = ((await asyncio.to_thread(leader.read_state) or {}).get("modelPolicy")) or policy
+    return {
+        "enabled": settings.MODEL_POLICY_ENABLED,
+        "models": policy["models"],
+        "decisions": policy["decisions"],
+    }
+
+
+@router.get("/retention")
+async def retention_status(admin: dict = Depends(require_admin)):
+    """보존 정책: 콜렉션별 보존 기간, 접기 완료 날짜, 삭제 누적 수, 마지막 실행/오류 (리더 워커 기준)"""
+    if leader.is_leader():
+        return retention.snapshot()
+    return (leader.read_state() or {}).get("retention") or retention.snapshot()
+
+
+@router.get("/storage")
+async def storage_status(admin: dict = Depends(require_admin)):
+    """핫 경로 저장소: 백엔드, 쓰기 트랜잭션/배치 크기, PocketBase 미반영 건수와 마지막 동기화 (sqlite는 이 워커 기준)"""
+    return await storage.run(storage.snapshot)
+
+
+@router.get("/models/options-policy")
+async def model_options_policy(admin: dict = Depends(require_admin)):
+    """로드 시점 옵션 정규화 현황: 모델별 현재 로드 옵션, 재로드/회피 횟수 (이 워커 기준)"""
+    return options_policy.stats()
+
+
+@router.get("/models/catalog")
+async def model_catalog_stats(admin: dict = Depends(require_admin)):
+    """모델 카탈로그 캐시 현황: 목록 경과 시간, 갱신/실패 횟수, show 캐시 히트 (이 워커 기준)"""
+    return model_catalog.stats()
+
+
+@router.get("/embeddings/stats")
+async def embedding_stats(admin: dict = Depends(require_admin)):
+    """임베딩 마이크로 배칭(이 워커 기준) 및 영구 캐시 현황 (히트율, 절약 바이트)"""
+    return {"batcher": embed_batcher.stats(), "cache": embedding_cache.stats()}
+
+
 @router.post("/insights")
 async def admin_insights(body: InsightsRequest, admin: dict = Depends(require_admin)):
     try:
@@ -156,15 +401,29 @@ async def admin_insights(body: InsightsRequest, admin: dict = Depends(require_ad
 
 
 @router.get("/keys")
-async def list_all_keys(admin: dict = Depends(require_admin)):
+async def list_all_keys(
+    response: Response,
+    limit: int = Query(200, ge=1, le=pagination.MAX_PAGE_SIZE),
+    cursor: str | None = Query(None, description="이전 응답의 X-Next-Cursor (같은 sort/필터로)"),
+    sort: str = Query("-created", description="created, name, usedTokens, totalUsedTokens (- 내림차순)"),
+    q: str = Query("", description="키 이름 부분 일치"),
+    user: str = Query("", description="소유자 id"),
+    active: bool | None = None,
+    admin: dict = Depends(require_admin),
+):
     """관리자용: 전체 API 키 목록 조회"""
-    results = pb.collection("api_keys").get_list(1, 200, {"sort": "-created"})
-    # N+1 제거: 유저 목록 1번 조회 후 메모리에서 매핑
-    users_result = pb.collection("users").get_list(1, 200)
-    user_email_map = {u.id: getattr(u, "email", "") for u in users_result.items}
+    conditions = _equals(user=user, isActive=active)
+    if q:
+        conditions.append(f"name~{pagination.quote(q)}")
+    records = _keyset_page(
+        response, "api_keys", pagination.join_filters(*conditions), sort,
+        ("created", "name", "usedTokens", "totalUsedTokens"), limit, cursor,
+    )
+    # 이 페이지의 소유자만 id 묶음 조회 (N+1 없음, 전체 유저 목록에 의존하지 않음)
+    owners = pagination.fetch_by_ids("users", (r.user for r in records), fields="id,email")
     keys = []
-    for r in results.items:
-        owner_email = user_email_map.get(r.user, "")
+    for r in records:
+        owner_email = (owners.get(r.user) or {}).get("email", "")
         keys.append({
             "id": r.id,
             "name": getattr(r, "name", ""),
@@ -198,9 +457,20 @@ async def admin_update_key(key_id: str, body: dict, admin: dict = Depends(requir
 
 
 @router.get("/applications")
-async def list_all_applications(admin: dict = Depends(require_admin)):
-    results = pb.collection("api_applications").get_list(1, 200, {"sort": "-created"})
-    return [_app_record_to_dict(r) for r in results.items]
+async def list_all_applications(
+    response: Response,
+    limit: int = Query(200, ge=1, le=pagination.MAX_PAGE_SIZE),
+    cursor: str | None = Query(None, description="이전 응답의 X-Next-Cursor (같은 sort/필터로)"),
+    sort: str = Query("-created", description="created, status (- 내림차순)"),
+    app_status: str = Query("", alias="status"),
+    user: str = Query("", description="신청자 id"),
+    admin: dict = Depends(require_admin),
+):
+    records = _keyset_page(
+        response, "api_applications", pagination.join_filters(*_equals(status=app_status, user=user)), sort,
+        ("created", "status"), limit, cursor,
+    )
+    return [_app_record_to_dict(r) for r in records]
 
 
 @router.patch("/applications/{app_id}")
@@ -234,31 +504,14 @@ async def update_application(
 
 
 def _get_system_setting(key: str, default: str = "") -> str:
-    """시스템 설정 값을 가져옵니다."""
-    try:
-        results = pb.collection("system_settings").get_list(1, 1, {"filter": f'key="{key}"'})
-        if results.items:
-            return getattr(results.items[0], "value", default)
-    except Exception:
-        pass
-    return default
+    """시스템 설정 값을 가져옵니다 (워커 메모리 스냅샷)."""
+    return system_settings.get(key) or default
 
 
 def _set_system_setting(key: str, value: str, description: str = "") -> None:
-    """시스템 설정 값을 저장합니다."""
+    """시스템 설정 값을 저장합니다. 이 워커는 바로, 다른 워커는 다음 스냅샷 확인 때 반영."""
     try:
-        # 기존 설정이 있는지 확인
-        results = pb.collection("system_settings").get_list(1, 1, {"filter": f'key="{key}"'})
-        if results.items:
-            # 업데이트
-            pb.collection("system_settings").update(results.items[0].id, {"value": value})
-        else:
-            # 새로 생성
-            pb.collection("system_settings").create({
-                "key": key,
-                "value": value,
-                "description": description,
-            })
+        system_settings.put(key, value, description)
     except Exception:
         pass
 
@@ -275,23 +528,53 @@ async def update_ollama_settings(
     body: OllamaSettingsUpdateRequest, admin: dict = Depends(require_admin)
 ):
     """관리자용 Ollama URL 업데이트"""
+    # 값이 바뀌면 system_settings 리스너가 Ollama 클라이언트 재생성 + 모델 카탈로그 무효화
     _set_system_setting("ollama_base_url", body.ollamaBaseUrl, "Ollama 서버 베이스 URL")
-    # 클라이언트 재생성을 위해 기존 클라이언트 닫기
-    ollama_client.reset_client()
     return OllamaSettingsResponse(ollamaBaseUrl=body.ollamaBaseUrl)
 
 
-@router.post("/models/pull")
+@router.get("/system-settings/snapshot")
+async def system_settings_snapshot(admin: dict = Depends(require_admin)):
+    """system_settings 스냅샷 현황: 키 수, 마지막 로드 시각, 다시 로드 횟수, 마지막 오류 (이 워커 기준)"""
+    return system_settings.stats()
+
+
+@router.post("/models/pull", status_code=status.HTTP_202_ACCEPTED)
 async def pull_ollama_model(
     body: OllamaPullRequest, admin: dict = Depends(require_admin)
 ):
-    """관리자용: Ollama에 새 모델 pull"""
-    model_name = (body.name or "").strip()
-    if not model_name:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Model name is required")
-
+    """관리자용: Ollama에 새 모델 pull (백그라운드 작업).
+    진행 상황은 GET /models/pull/{job_id} 폴링 또는 /models/pull/{job_id}/events (SSE)"""
     try:
-        result = await ollama_client.pull_model(model_name)
-        return {"ok": True, "result": result}
-    except Exception as e:
-        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"Failed to pull model: {e}")
+        job, created = await pull_jobs.start(body.name)
+    except pull_jobs.PullJobError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"ok": True, "deduplicated": not created, "job": job}
+
+
+@router.get("/models/pull/{job_id}")
+async def pull_job_status(job_id: str, admin: dict = Depends(require_admin)):
+    job = await asyncio.to_thread(pull_jobs.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Pull job not found")
+    return job
+
+
+@router.get("/models/pull/{job_id}/events")
+async def pull_job_events(job_id: str, admin: dict = Depends(require_admin)):
+    """Server-Sent Events: 상태가 바뀔 때마다 `data: {작업 JSON}`, 작업이 끝나면 스트림 종료"""
+    if await asyncio.to_thread(pull_jobs.get_job, job_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Pull job not found")
+
+    async def events():
+        async for job in pull_jobs.follow(job_id):
+            if job is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,91 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
+from fastapi.responses import FileResponse
+
+from app.dependencies import get_api_key_user
+from app.models.batch import BatchCreateRequest
+from app.services import batch_service
+from app.services.batch_service import BatchError
+
+router = APIRouter()
+
+
+async def _upload_chunks(upload: UploadFile, size: int = 1024 * 1024):
+    while chunk := await upload.read(size):
+        yield chunk
+
+
+@router.post("/files")
+async def upload_file(
+    file: UploadFile = File(...),
+    purpose: str = Form("batch"),
+    user: dict = Depends(get_api_key_user),
+):
+    """OpenAI-compatible file upload (purpose=batch, JSONL)."""
+    if purpose != "batch":
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Only purpose=batch is supported")
+    try:
+        return await batch_service.save_upload(user["id"], file.filename or "upload.jsonl", purpose, _upload_chunks(file))
+    except BatchError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+
+
+@router.get("/files/{file_id}")
+async def get_file(file_id: str, user: dict = Depends(get_api_key_user)):
+    meta = await asyncio.to_thread(batch_service.get_file, file_id, user["id"])
+    if meta is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    return meta
+
+
+@router.get("/files/{file_id}/content")
+async def get_file_content(file_id: str, user: dict = Depends(get_api_key_user)):
+    """입력/결과 JSONL 다운로드 (진행 중인 배치의 결과 파일은 지금까지 끝난 줄까지)"""
+    meta = await asyncio.to_thread(batch_service.get_file, file_id, user["id"])
+    if meta is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    return FileResponse(
+        batch_service.file_path(file_id),
+        media_type="application/jsonl",
+        filename=meta["filename"],
+    )
+
+
+@router.post("/batches")
+async def create_batch(body: BatchCreateRequest, user: dict = Depends(get_api_key_user)):
+    # 입력 파일 검증(최대 BATCH_MAX_FILE_BYTES 파싱)은 스레드에서
+    try:
+        return await asyncio.to_thread(
+            batch_service.create_batch, user, body.input_file_id, body.endpoint, body.completion_window, body.metadata
+        )
+    except BatchError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/batches")
+async def list_batches(limit: int = 20, user: dict = Depends(get_api_key_user)):
+    data = await asyncio.to_thread(batch_service.list_batches, user["id"], min(max(limit, 1), 100))
+    return {
+        "object": "list",
+        "data": data,
+        "first_id": data[0]["id"] if data else None,
+        "last_id": data[-1]["id"] if data else None,
+        "has_more": False,
+    }
+
+
+@router.get("/batches/{batch_id}")
+async def get_batch(batch_id: str, user: dict = Depends(get_api_key_user)):
+    batch = await asyncio.to_thread(batch_service.get_batch, batch_id, user["id"])
+    if batch is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Batch not found")
+    return batch
+
+
+@router.post("/batches/{batch_id}/cancel")
+async def cancel_batch(batch_id: str, user: dict = Depends(get_api_key_user)):
+    batch = await asyncio.to_thread(batch_service.cancel_batch, batch_id, user["id"])
+    if batch is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Batch not found")
+    return batch
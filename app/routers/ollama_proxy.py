@@ -1,17 +1,25 @@
+import asyncio
+import base64
+import hashlib
 import json
 import time
 import uuid
+from array import array
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, Depends, HTTPException, Request, status
-from fastapi.responses import StreamingResponse
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response, StreamingResponse
+from pydantic import ValidationError
 
 from app.config import settings
 from app.dependencies import get_api_key_user
-from app.models.ollama import ChatRequest, ModelShowRequest
-from app.services import ollama_client
-from app.services.quota_service import check_and_deduct, reset_daily_if_needed
-from app.database import pb
+from app.models.ollama import ChatRequest, EmbeddingRequest, EmbedRequest, ModelShowRequest, NativeChatRequest
+from app.services import (
+    batch_service, embed_batcher, embedding_cache, model_catalog, model_policy, ollama_client, options_policy,
+    passthrough, priority, rollups, storage, timing, usage_spool, usage_store,
+)
+from app.services.quota_service import check_and_deduct, ensure_quota_available, reset_daily_if_needed
 
 router = APIRouter()
 openai_router = APIRouter()
@@ -50,91 +58,54 @@ def _format_relative(date_str: str) -> str:
         return "Unknown"
 
 
-@router.post("/chat")
-async def chat(body: ChatRequest, request: Request, user: dict = Depends(get_api_key_user)):
-    reset_daily_if_needed(user["id"])
-    model = body.model or settings.DEFAULT_MODEL
+def _timestamp(date_str: str) -> int:
+    """Ollama modified_at → epoch 초 (OpenAI models의 created). 해석 실패 시 0"""
+    try:
+        return int(datetime.fromisoformat(date_str.replace("Z", "+00:00")).timestamp())
+    except Exception:
+        return 0
 
-    # 스트리밍 요청 처리
-    if body.stream:
-        payload = {
-            "model": model,
-            "messages": [m.model_dump() for m in body.messages],
-            "stream": True,
-        }
-        if body.options:
-            payload["options"] = body.options
-        if body.think is not None:
-            payload["think"] = body.think
-
-        start = time.time()
-        token_state = {"prompt": 0, "completion": 0}
-
-        async def generate():
-            try:
-                async for chunk in ollama_client.chat_stream(payload):
-                    yield chunk
-                    try:
-                        data = json.loads(chunk)
-                        if data.get("done"):
-                            token_state["prompt"] = data.get("prompt_eval_count", 0) or 0
-                            token_state["completion"] = data.get("eval_count", 0) or 0
-                    except Exception:
-                        pass
-            except Exception as e:
-                yield (json.dumps({"error": str(e)}) + "\n").encode()
-            finally:
-                total = token_state["prompt"] + token_state["completion"]
-                elapsed = time.time() - start
-                try:
-                    check_and_deduct(user, total, user.get("_api_key_id"))
-                except ValueError:
-                    pass
-                _log_usage(user, model, "/api/v1/chat", token_state["prompt"], token_state["completion"], elapsed, 200, request, False)
-
-        return StreamingResponse(
-            generate(),
-            media_type="application/x-ndjson",
-            headers={"X-Accel-Buffering": "no"},
-        )
-
-    # 일반(비스트리밍) 처리
-    payload = {
-        "model": model,
-        "messages": [m.model_dump() for m in body.messages],
-        "stream": False,
-    }
-    if body.options:
-        payload["options"] = body.options
+
+def _chat_payload(body: ChatRequest, model: str, stream: bool) -> dict:
+    """Ollama /api/chat payload. options는 모델 재로드를 막도록 정규화 (options_policy).
+    NativeChatRequest의 추가 필드(tools, format, 메시지 images 등)는 그대로 전달."""
+    messages = [m.model_dump() for m in body.messages]
+    payload = {**(body.model_extra or {}), "model": model, "messages": messages, "stream": stream}
     if body.think is not None:
         payload["think"] = body.think
+    options = options_policy.canonicalize(model, body.options, sum(len(m["content"] or "") for m in messages))
+    if options:
+        payload["options"] = options
+    return payload
 
-    start = time.time()
-    try:
-        result = await ollama_client.chat(payload)
-    except Exception as e:
-        _log_usage(user, model, "/api/v1/chat", 0, 0, time.time() - start, 502, request, True)
-        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"Ollama error: {e}")
 
-    prompt_tokens = result.get("prompt_eval_count", 0) or 0
-    completion_tokens = result.get("eval_count", 0) or 0
-    total_tokens = prompt_tokens + completion_tokens
-    elapsed = time.time() - start
+@router.post("/chat")
+async def chat(body: ChatRequest, request: Request, user: dict = Depends(get_api_key_user)):
+    await reset_daily_if_needed(user["id"])
+    model = body.model or settings.DEFAULT_MODEL
+    payload = _chat_payload(body, model, stream=body.stream)
 
-    try:
-        check_and_deduct(user, total_tokens, user.get("_api_key_id"))
-    except ValueError as e:
-        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
+    if body.stream:
+        return await _stream_payload("/api/chat", payload, user, request, model, "/api/v1/chat")
+    return await _metered_call(ollama_client.chat, payload, user, request, model, "/api/v1/chat")
 
-    _log_usage(user, model, "/api/v1/chat", prompt_tokens, completion_tokens, elapsed, 200, request, False)
 
-    return result
+def _conditional_json(request: Request, data) -> Response:
+    """모델 목록 응답: 본문 해시를 ETag로 붙이고 If-None-Match가 일치하면 304"""
+    body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+    etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    if etag in tags or "*" in tags:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
 
 
 @router.get("/models")
-async def list_models(user: dict = Depends(get_api_key_user)):
+async def list_models(request: Request, user: dict = Depends(get_api_key_user)):
     try:
-        data = await ollama_client.list_models()
+        data = await model_catalog.get_tags()
     except Exception:
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Cannot reach Ollama")
 
@@ -146,13 +117,13 @@ async def list_models(user: dict = Depends(get_api_key_user)):
             "modified": _format_relative(m.get("modified_at", "")),
             "parameterCount": (m.get("details") or {}).get("parameter_size"),
         })
-    return models
+    return _conditional_json(request, models)
 
 
 @router.post("/models/show")
 async def show_model(body: ModelShowRequest, user: dict = Depends(get_api_key_user)):
     try:
-        return await ollama_client.show_model(body.name)
+        return await model_catalog.get_show(body.name)
     except Exception:
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Cannot reach Ollama")
 
@@ -163,66 +134,207 @@ async def ollama_health():
     return {"status": "ok" if ok else "unreachable"}
 
 
+def _create_usage_log(entry: dict) -> None:
+    """스풀 항목 → usage_logs (항목 id 해시를 레코드 id로 사용해 재전송해도 한 번만 생성)"""
+    try:
+        storage.backend().insert_usage_log(usage_spool.record_id("usage", entry["id"]), entry["body"])
+    except storage.Rejected as e:
+        raise usage_spool.Rejected(str(e))
+
+
+usage_spool.register("usage", [("log", _create_usage_log)])
+
+
+@timing.timed("log")
 def _log_usage(
     user: dict, model: str, endpoint: str,
     prompt_tokens: int, completion_tokens: int,
-    elapsed: float, status_code: int, request: Request, is_error: bool,
+    elapsed: float, status_code: int, request: Request | None, is_error: bool,
 ) -> None:
+    # PocketBase 장애 중에도 유실되지 않도록 스풀을 거쳐 기록 (_create_usage_log)
+    usage_spool.submit("usage", {
+        "user": user["id"],
+        "apiKey": user.get("_api_key_id", ""),
+        "model": model,
+        "endpoint": endpoint,
+        "promptTokens": prompt_tokens,
+        "completionTokens": completion_tokens,
+        "totalTokens": prompt_tokens + completion_tokens,
+        "responseTimeMs": int(elapsed * 1000),
+        "statusCode": status_code,
+        "ip": request.client.host if request and request.client else "",
+        "isError": is_error,
+    })
+    rollups.record(
+        user["id"], user.get("_api_key_id", ""), model,
+        prompt_tokens, completion_tokens, int(elapsed * 1000), is_error,
+    )
+    usage_store.append(
+        user["id"], user.get("_api_key_id", ""), model, endpoint, status_code,
+        prompt_tokens, completion_tokens, int(elapsed * 1000), is_error,
+    )
+    if not is_error:
+        model_policy.record_usage(model)
+
+
+async def _metered_relay(chunks, user: dict, request: Request | None, model: str, endpoint: str, status_code: int = 200):
+    """스트리밍 공통 파이프라인 (/api/v1/chat, 네이티브 /api/chat·/api/generate, 패스스루).
+
+    응답 바이트는 그대로 흘려보내고 NdjsonFramer가 done 객체에서 토큰 수만 수집.
+    스트림이 끝나거나 끊기면 쿼터 차감과 사용 로그를 한 번 기록.
+    """
+    start = time.time()
+    framer = passthrough.NdjsonFramer()
     try:
-        pb.collection("usage_logs").create({
-            "user": user["id"],
-            "apiKey": user.get("_api_key_id", ""),
-            "model": model,
-            "endpoint": endpoint,
-            "promptTokens": prompt_tokens,
-            "completionTokens": completion_tokens,
-            "totalTokens": prompt_tokens + completion_tokens,
-            "responseTimeMs": int(elapsed * 1000),
-            "statusCode": status_code,
-            "ip": request.client.host if request.client else "",
-            "isError": is_error,
-        })
-    except Exception:
-        pass
+        async for chunk in chunks:
+            framer.feed(chunk)
+            yield chunk
+    except Exception as e:
+        status_code = 502
+        yield (json.dumps({"error": f"Ollama error: {e}"}) + "\n").encode()
+    finally:
+        framer.close()
+        is_error = status_code != 200 or framer.error is not None
+        prompt_tokens, completion_tokens = framer.prompt_tokens, framer.completion_tokens
+        if not is_error:
+            try:
+                check_and_deduct(user, prompt_tokens + completion_tokens, user.get("_api_key_id"))
+            except ValueError:
+                pass
+        _log_usage(user, model, endpoint, prompt_tokens, completion_tokens, time.time() - start, status_code, request, is_error)
+
+
+async def _stream_upstream(
+    path: str, parts: list, length: int,
+    user: dict, request: Request | None, model: str, endpoint: str,
+) -> StreamingResponse:
+    """Ollama 스트림을 먼저 열고 상태 코드·Content-Type까지 그대로 중계 (모델 없음 404 등도 그대로 전달).
+    응답이 시작되면 429로 바꿀 수 없으므로 열기 전에 남은 쿼터를 확인."""
+    try:
+        ensure_quota_available(user)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
 
+    start = time.time()
+    try:
+        upstream = await ollama_client.open_passthrough(path, parts, length)
+    except Exception as e:
+        _log_usage(user, model, endpoint, 0, 0, time.time() - start, 502, request, True)
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"Ollama error: {e}")
 
-# ── OpenAI Compatible Endpoints ──
+    async def chunks():
+        try:
+            with priority.track(), timing.span("stream"):
+                async for chunk in upstream.aiter_raw():
+                    yield chunk
+        finally:
+            await upstream.aclose()
 
+    return StreamingResponse(
+        _metered_relay(chunks(), user, request, model, endpoint, upstream.status_code),
+        status_code=upstream.status_code,
+        media_type=upstream.headers.get("content-type", "application/x-ndjson"),
+        headers={"X-Accel-Buffering": "no"},
+    )
 
-@openai_router.post("/chat/completions")
-async def openai_chat_completions(body: ChatRequest, request: Request, user: dict = Depends(get_api_key_user)):
-    """OpenAI-compatible chat completions endpoint."""
-    reset_daily_if_needed(user["id"])
-    model = body.model or settings.DEFAULT_MODEL
 
-    payload = {
-        "model": model,
-        "messages": [m.model_dump() for m in body.messages],
-        "stream": False,
-    }
-    if body.options:
-        payload["options"] = body.options
+async def _stream_payload(
+    path: str, payload: dict, user: dict, request: Request | None, model: str, endpoint: str,
+) -> StreamingResponse:
+    """파싱 모드 스트리밍: payload를 직렬화해 _stream_upstream으로 전달"""
+    if "keep_alive" not in payload:
+        payload["keep_alive"] = model_policy.keep_alive_for(model)
+    data = json.dumps(payload).encode()
+    return await _stream_upstream(path, [data], len(data), user, request, model, endpoint)
+
 
+async def _metered_call(call, payload: dict, user: dict, request: Request | None, model: str, endpoint: str) -> dict:
+    """비스트리밍 공통: Ollama 호출 → 쿼터 차감(초과 시 429) → 사용 로그"""
     start = time.time()
     try:
-        result = await ollama_client.chat(payload)
+        result = await call(payload)
     except Exception as e:
-        _log_usage(user, model, "/v1/chat/completions", 0, 0, time.time() - start, 502, request, True)
+        _log_usage(user, model, endpoint, 0, 0, time.time() - start, 502, request, True)
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"Ollama error: {e}")
 
     prompt_tokens = result.get("prompt_eval_count", 0) or 0
     completion_tokens = result.get("eval_count", 0) or 0
-    total_tokens = prompt_tokens + completion_tokens
     elapsed = time.time() - start
 
     try:
-        check_and_deduct(user, total_tokens, user.get("_api_key_id"))
+        check_and_deduct(user, prompt_tokens + completion_tokens, user.get("_api_key_id"))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
+
+    _log_usage(user, model, endpoint, prompt_tokens, completion_tokens, elapsed, 200, request, False)
+    return result
+
+
+async def _embed_metered(
+    user: dict, request: Request, endpoint: str,
+    model: str, inputs: list[str], extra: dict | None = None,
+) -> tuple[list[list[float]], int]:
+    """임베딩 공통 처리: 캐시 조회 → 미스만 마이크로 배칭 → 쿼터 차감 → 사용 로그. (벡터 목록, 프롬프트 토큰) 반환"""
+    await reset_daily_if_needed(user["id"])
+    if not inputs:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="input must not be empty")
+
+    start = time.time()
+    # 캐시 키에는 벡터 값에 영향을 주는 옵션만 포함 (keep_alive 제외)
+    key_extra = {k: v for k, v in (extra or {}).items() if k != "keep_alive"} or None
+    with timing.span("cache"):
+        cached = await asyncio.to_thread(embedding_cache.get_many, model, inputs, key_extra)
+    missing = [i for i, hit in enumerate(cached) if hit is None]
+
+    embeddings = [hit[0] if hit else None for hit in cached]
+    tokens = [hit[1] if hit else 0 for hit in cached]
+    if missing:
+        miss_inputs = [inputs[i] for i in missing]
+        try:
+            with timing.span("embed_wait"):  # 마이크로 배치 창 대기 + Ollama 호출
+                vectors, miss_tokens = await embed_batcher.embed(model, miss_inputs, extra)
+        except Exception as e:
+            _log_usage(user, model, endpoint, 0, 0, time.time() - start, 502, request, True)
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"Ollama error: {e}")
+        for i, vector, count in zip(missing, vectors, miss_tokens):
+            embeddings[i] = vector
+            tokens[i] = count
+        with timing.span("cache"):
+            await asyncio.to_thread(embedding_cache.put_many, model, miss_inputs, vectors, miss_tokens, key_extra)
+
+    # 캐시 히트도 최초 임베딩 시 토큰 수로 동일하게 과금
+    prompt_tokens = sum(tokens)
+    elapsed = time.time() - start
+
+    try:
+        check_and_deduct(user, prompt_tokens, user.get("_api_key_id"))
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
 
-    _log_usage(user, model, "/v1/chat/completions", prompt_tokens, completion_tokens, elapsed, 200, request, False)
+    _log_usage(user, model, endpoint, prompt_tokens, 0, elapsed, 200, request, False)
+    return embeddings, prompt_tokens
+
+
+# ── OpenAI Compatible Endpoints ──
+
+
+@openai_router.post("/chat/completions")
+async def openai_chat_completions(body: ChatRequest, request: Request, user: dict = Depends(get_api_key_user)):
+    """OpenAI-compatible chat completions endpoint."""
+    await reset_daily_if_needed(user["id"])
+    model = body.model or settings.DEFAULT_MODEL
+
+    payload = _chat_payload(body, model, stream=False)
+    result = await _metered_call(ollama_client.chat, payload, user, request, model, "/v1/chat/completions")
+    return _openai_completion(result, model)
+
+
+def _openai_completion(result: dict, model: str) -> dict:
+    """Ollama /api/chat 응답 → OpenAI chat.completion 형식"""
+    prompt_tokens = result.get("prompt_eval_count", 0) or 0
+    completion_tokens = result.get("eval_count", 0) or 0
+    total_tokens = prompt_tokens + completion_tokens
 
-    # Return OpenAI-compatible response format
     msg = result.get("message", {})
     return {
         "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
@@ -247,11 +359,33 @@ async def openai_chat_completions(body: ChatRequest, request: Request, user: dic
     }
 
 
+@openai_router.post("/embeddings")
+async def openai_embeddings(body: EmbeddingRequest, request: Request, user: dict = Depends(get_api_key_user)):
+    """OpenAI-compatible embeddings endpoint (동시 단일 입력 요청은 마이크로 배칭)."""
+    model = body.model or settings.DEFAULT_EMBED_MODEL
+    inputs = [body.input] if isinstance(body.input, str) else body.input
+    extra = {"dimensions": body.dimensions} if body.dimensions else None
+
+    embeddings, prompt_tokens = await _embed_metered(user, request, "/v1/embeddings", model, inputs, extra)
+
+    data = []
+    for i, vector in enumerate(embeddings):
+        if body.encoding_format == "base64":
+            vector = base64.b64encode(array("f", vector).tobytes()).decode()
+        data.append({"object": "embedding", "index": i, "embedding": vector})
+    return {
+        "object": "list",
+        "data": data,
+        "model": model,
+        "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+    }
+
+
 @openai_router.get("/models")
-async def openai_list_models(user: dict = Depends(get_api_key_user)):
+async def openai_list_models(request: Request, user: dict = Depends(get_api_key_user)):
     """OpenAI-compatible models list endpoint."""
     try:
-        data = await ollama_client.list_models()
+        data = await model_catalog.get_tags()
     except Exception:
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Cannot reach Ollama")
 
@@ -260,81 +394,122 @@ async def openai_list_models(user: dict = Depends(get_api_key_user)):
         models.append({
             "id": m.get("name", ""),
             "object": "model",
-            "created": int(time.time()),
+            "created": _timestamp(m.get("modified_at", "")),
             "owned_by": "ollama",
         })
-    return {"object": "list", "data": models}
+    return _conditional_json(request, {"object": "list", "data": models})
+
+
+# ── Batch API 핸들러 (batch_service 워커가 호출, 같은 쿼터/로그 경로 사용) ──
+
+
+async def _batch_chat_completions(user: dict, body: dict) -> tuple[int, dict]:
+    return 200, await openai_chat_completions(ChatRequest(**body), None, user)
+
+
+async def _batch_embeddings(user: dict, body: dict) -> tuple[int, dict]:
+    return 200, await openai_embeddings(EmbeddingRequest(**body), None, user)
+
+
+batch_service.register_handler("/v1/chat/completions", _batch_chat_completions)
+batch_service.register_handler("/v1/embeddings", _batch_embeddings)
 
 
 # ── Ollama Native Endpoints (for n8n Ollama node) ──
 
 
 @ollama_native_router.get("/tags")
-async def ollama_tags(user: dict = Depends(get_api_key_user)):
+async def ollama_tags(request: Request, user: dict = Depends(get_api_key_user)):
     """Ollama-native /api/tags endpoint for n8n compatibility."""
     try:
-        data = await ollama_client.list_models()
+        data = await model_catalog.get_tags()
     except Exception:
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Cannot reach Ollama")
-    return data
+    return _conditional_json(request, data)
+
+
+async def _native_passthrough(request: Request, user: dict, endpoint: str) -> StreamingResponse:
+    """패스스루 모드: 원본 본문을 그대로 Ollama로 보내고 응답 바이트를 그대로 중계.
+
+    본문은 model/options 위치만 스캔 (images, tools, format 등 나머지 필드는 손대지 않음).
+    중계·토큰 수집·차감·기록은 파싱 모드와 같은 _stream_upstream 파이프라인을 사용.
+    """
+    await reset_daily_if_needed(user["id"])
+    raw = await request.body()
+    try:
+        scanned = passthrough.scan(raw)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid JSON body: {e}")
+
+    model = scanned.value(raw, "model") or settings.DEFAULT_MODEL
+    if not isinstance(model, str):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="model must be a string")
+    options = scanned.value(raw, "options")
+    options = options_policy.canonicalize(
+        model, options if isinstance(options, dict) else None, len(raw) - scanned.image_bytes,
+    )
+
+    inject = {"model": model, "keep_alive": model_policy.keep_alive_for(model)}
+    replace = {}
+    if "model" in scanned.fields and scanned.value(raw, "model") != model:
+        replace["model"] = model  # "model": "" / null → 기본 모델
+    if options:
+        (replace if "options" in scanned.fields else inject)["options"] = options
+    parts, length = passthrough.rewrite(raw, scanned, inject, replace)
+    return await _stream_upstream(endpoint, parts, length, user, request, model, endpoint)
 
 
 @ollama_native_router.post("/chat")
-async def ollama_native_chat(body: ChatRequest, request: Request, user: dict = Depends(get_api_key_user)):
+async def ollama_native_chat(request: Request, user: dict = Depends(get_api_key_user)):
     """Ollama-native /api/chat endpoint for n8n compatibility."""
-    reset_daily_if_needed(user["id"])
-    model = body.model or settings.DEFAULT_MODEL
+    if settings.OLLAMA_NATIVE_PASSTHROUGH:
+        return await _native_passthrough(request, user, "/api/chat")
 
-    payload = {
-        "model": model,
-        "messages": [m.model_dump() for m in body.messages],
-        "stream": False,
-    }
-    if body.options:
-        payload["options"] = body.options
-
-    start = time.time()
     try:
-        result = await ollama_client.chat(payload)
-    except Exception as e:
-        _log_usage(user, model, "/api/chat", 0, 0, time.time() - start, 502, request, True)
-        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"Ollama error: {e}")
+        body = NativeChatRequest.model_validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    await reset_daily_if_needed(user["id"])
+    model = body.model or settings.DEFAULT_MODEL
+    payload = _chat_payload(body, model, stream=body.stream)
 
-    prompt_tokens = result.get("prompt_eval_count", 0) or 0
-    completion_tokens = result.get("eval_count", 0) or 0
-    total_tokens = prompt_tokens + completion_tokens
-    elapsed = time.time() - start
+    if body.stream:
+        return await _stream_payload("/api/chat", payload, user, request, model, "/api/chat")
+    return await _metered_call(ollama_client.chat, payload, user, request, model, "/api/chat")
 
-    try:
-        check_and_deduct(user, total_tokens, user.get("_api_key_id"))
-    except ValueError as e:
-        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
 
-    _log_usage(user, model, "/api/chat", prompt_tokens, completion_tokens, elapsed, 200, request, False)
+@ollama_native_router.post("/embed")
+async def ollama_native_embed(body: EmbedRequest, request: Request, user: dict = Depends(get_api_key_user)):
+    """Ollama-native /api/embed endpoint."""
+    model = body.model or settings.DEFAULT_EMBED_MODEL
+    inputs = [body.input] if isinstance(body.input, str) else body.input
+    extra = body.model_dump(include={"truncate", "options", "keep_alive"}, exclude_none=True) or None
 
-    return result
+    embeddings, prompt_tokens = await _embed_metered(user, request, "/api/embed", model, inputs, extra)
+    return {"model": model, "embeddings": embeddings, "prompt_eval_count": prompt_tokens}
 
 
 @ollama_native_router.post("/generate")
 async def ollama_native_generate(request: Request, user: dict = Depends(get_api_key_user)):
     """Ollama-native /api/generate endpoint."""
-    body = await request.json()
-    start = time.time()
-    try:
-        result = await ollama_client.generate(body)
-    except Exception as e:
-        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"Ollama error: {e}")
-
-    prompt_tokens = result.get("prompt_eval_count", 0) or 0
-    completion_tokens = result.get("eval_count", 0) or 0
-    total_tokens = prompt_tokens + completion_tokens
-    elapsed = time.time() - start
+    if settings.OLLAMA_NATIVE_PASSTHROUGH:
+        return await _native_passthrough(request, user, "/api/generate")
 
     try:
-        check_and_deduct(user, total_tokens, user.get("_api_key_id"))
-    except ValueError as e:
-        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
-
-    _log_usage(user, body.get("model", ""), "/api/generate", prompt_tokens, completion_tokens, elapsed, 200, request, False)
-
-    return result
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid JSON body")
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="request body must be a JSON object")
+    await reset_daily_if_needed(user["id"])
+    model = body.get("model") or settings.DEFAULT_MODEL
+    body["model"] = model
+
+    prompt_chars = len(body.get("prompt") or "") + len(body.get("system") or "")
+    options = options_policy.canonicalize(model, body.get("options"), prompt_chars)
+    if options:
+        body["options"] = options
+
+    if body.get("stream", True):
+        return await _stream_payload("/api/generate", body, user, request, model, "/api/generate")
+    return await _metered_call(ollama_client.generate, body, user, request, model, "/api/generate")
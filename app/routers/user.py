@@ -5,7 +5,8 @@ from fastapi import APIRouter, Depends
 
 from app.database import pb
 from app.dependencies import get_current_user
-from app.services import ollama_client
+from app.services import model_catalog
+from app.services import rollups
 from app.services import metrics_service
 from app.services import cache
 
@@ -24,31 +25,24 @@ async def dashboard(user: dict = Depends(get_current_user)):
         cached["user"] = user  # user 정보는 항상 신선하게
         return cached
 
-    # Ollama list_models 비동기 시작 (DB 쿼리와 병렬 실행)
-    ollama_task = asyncio.create_task(ollama_client.list_models())
+    # 모델 목록 비동기 시작 (DB 쿼리와 병렬 실행, 보통 카탈로그 캐시에서 즉시 반환)
+    ollama_task = asyncio.create_task(model_catalog.get_tags())
 
-    # DB 쿼리 (동기, 순차)
+    # 일별 롤업에서 집계 (사용자의 활동 일수만큼만 읽음, app/services/rollups.py)
     recent_usage: list[dict] = []
     total_requests = 0
     try:
-        logs = pb.collection("usage_logs").get_list(
-            1, 100,
-            {"filter": f'user="{user["id"]}"', "sort": "-created"},
-        )
-        total_requests = logs.total_items  # 두 번째 쿼리 제거 — 같은 응답에서 추출
-
-        by_date: dict[str, dict] = {}
-        for log in logs.items:
-            date = str(log.created)[:10]
-            if date not in by_date:
-                by_date[date] = {"date": date, "requests": 0, "tokens": 0, "responseTime": 0}
-            by_date[date]["requests"] += 1
-            by_date[date]["tokens"] += getattr(log, "total_tokens", 0) or 0
-            by_date[date]["responseTime"] += getattr(log, "response_time_ms", 0) or 0
-        for d in by_date.values():
-            if d["requests"] > 0:
-                d["responseTime"] = d["responseTime"] // d["requests"]
-        recent_usage = sorted(by_date.values(), key=lambda x: x["date"])[-7:]
+        days = rollups.user_days(user["id"])
+        total_requests = sum(d["requests"] for d in days)
+        recent_usage = [
+            {
+                "date": d["day"],
+                "requests": d["requests"],
+                "tokens": d["totalTokens"],
+                "responseTime": d["responseTimeMs"] // d["requests"] if d["requests"] else 0,
+            }
+            for d in days[-7:]
+        ]
     except Exception:
         pass
 
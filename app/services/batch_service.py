@@ -0,0 +1,487 @@
+"""
+OpenAI 호환 Batch API — 로컬 디스크 기반 내구성 작업 큐
+대량 오프라인 작업(JSONL 요청 파일)을 HTTP 연결 없이 백그라운드에서 처리합니다.
+
+저장 구조 ({DATA_DIR}/batches/):
+  files/{file_id}.jsonl          → 업로드된 입력 파일 / 결과 파일
+  files/{file_id}.json           → 파일 메타데이터 (소유자, 크기, 용도)
+  jobs/{batch_id}.json           → 배치 상태 (OpenAI batch 객체 + 소유자 정보)
+  jobs/{batch_id}.cancel         → 취소 요청 표시 (API 워커가 생성, 처리 워커가 확인)
+
+- 처리는 리더 싱글톤 작업(worker_job)에서만 실행 → 멀티 워커에서도 한 번만 처리
+- 결과는 줄 단위로 output/error 파일에 바로 추가 → 재시작 시 이미 끝난 custom_id는 건너뛰고 이어서 처리
+- 동시 처리 수는 BATCH_CONCURRENCY로 제한, 대화형 요청이 있으면 양보 (priority.wait_for_turn)
+- completion_window("{N}h")가 지나면(expires_at) 남은 요청은 batch_expired 오류로 기록하고 status=expired
+- 파일/작업 조회 함수는 디스크를 읽으므로 라우터에서 asyncio.to_thread로 호출
+- 처리 중 디스크 I/O(입력 청크 읽기, 결과 줄 추가, 상태 저장, 이어하기/만료 처리)도 모두 스레드에서 실행
+  → 리더 워커는 대화형 요청도 받으므로 큰 배치가 이벤트 루프를 막지 않음
+- 줄마다 요청 전에 쿼터 확인: 사용자는 storage 백엔드(SQLite 모드면 로컬 카운터)에서 읽고
+  배치 안에서 USER_REFRESH_SECONDS 동안 재사용, 한도를 다 썼으면 Ollama 호출 없이 429 오류로 기록
+- 실제 요청 처리(쿼터 차감, 사용 로그 포함)는 라우터가 register_handler로 등록한 핸들러가 담당
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import secrets
+import threading
+import time
+from typing import Awaitable, Callable
+
+from app.config import settings
+from app.services import priority, storage
+from app.services.quota_service import ensure_quota_available
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_ENDPOINTS = ("/v1/chat/completions", "/v1/embeddings")
+ACTIVE_STATUSES = ("validating", "in_progress", "finalizing", "cancelling")
+_ID_RE = re.compile(r"^[A-Za-z0-9_-]+$")  # 경로 조작 방지
+_WINDOW_RE = re.compile(r"^([1-9][0-9]*)h$")
+READ_CHUNK = 256              # 입력 파일을 한 번에 읽는 줄 수 (스레드에서 파싱)
+CANCEL_CHECK_SECONDS = 1.0   # 취소 표시 파일 확인 간격
+USER_REFRESH_SECONDS = 2.0   # 배치 안에서 사용자(쿼터) 정보를 재사용하는 시간
+EXPIRED_ERROR = {"code": "batch_expired", "message": "This request could not be executed before the completion window expired."}
+
+# endpoint → async (user, body) -> (status_code, response_body)
+_handlers: dict[str, Callable[[dict, dict], Awaitable[tuple[int, dict]]]] = {}
+_append_lock = threading.Lock()  # 결과 파일 추가는 여러 스레드에서 (TextIOWrapper는 스레드 안전하지 않음)
+
+
+class BatchError(ValueError):
+    """잘못된 배치 요청 (라우터에서 400으로 변환)"""
+
+
+def register_handler(endpoint: str, handler: Callable[[dict, dict], Awaitable[tuple[int, dict]]]) -> None:
+    _handlers[endpoint] = handler
+
+
+def _dir(kind: str) -> str:
+    path = os.path.join(settings.DATA_DIR, "batches", kind)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _write_json(path: str, data: dict) -> None:
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _read_json(path: str) -> dict | None:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+# ── 파일 ──────────────────────────────────────────────────────────
+
+def file_path(file_id: str) -> str:
+    return os.path.join(_dir("files"), f"{file_id}.jsonl")
+
+
+def _file_meta_path(file_id: str) -> str:
+    return os.path.join(_dir("files"), f"{file_id}.json")
+
+
+def _file_object(meta: dict) -> dict:
+    return {k: v for k, v in meta.items() if not k.startswith("_")}
+
+
+def _register_file(file_id: str, user_id: str, filename: str, purpose: str) -> dict:
+    try:
+        size = os.path.getsize(file_path(file_id))
+    except FileNotFoundError:
+        size = 0
+    meta = {
+        "id": file_id,
+        "object": "file",
+        "bytes": size,
+        "created_at": int(time.time()),
+        "filename": filename,
+        "purpose": purpose,
+        "_user": user_id,
+    }
+    _write_json(_file_meta_path(file_id), meta)
+    return meta
+
+
+async def save_upload(user_id: str, filename: str, purpose: str, chunks) -> dict:
+    """업로드 스트림을 디스크에 저장. chunks: bytes async iterator"""
+    file_id = f"file-{secrets.token_hex(12)}"
+    path = file_path(file_id)
+    size = 0
+    f = await asyncio.to_thread(open, path, "wb")
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > settings.BATCH_MAX_FILE_BYTES:
+                raise BatchError(f"File exceeds {settings.BATCH_MAX_FILE_BYTES} bytes")
+            await asyncio.to_thread(f.write, chunk)
+    except BaseException:
+        await asyncio.to_thread(f.close)
+        await asyncio.to_thread(os.remove, path)
+        raise
+    await asyncio.to_thread(f.close)
+    return _file_object(await asyncio.to_thread(_register_file, file_id, user_id, filename, purpose))
+
+
+def get_file(file_id: str, user_id: str) -> dict | None:
+    if not _ID_RE.match(file_id):
+        return None
+    meta = _read_json(_file_meta_path(file_id))
+    if not meta or meta.get("_user") != user_id:
+        return None
+    meta["bytes"] = os.path.getsize(file_path(file_id)) if os.path.exists(file_path(file_id)) else 0
+    return _file_object(meta)
+
+
+# ── 배치 ──────────────────────────────────────────────────────────
+
+def _job_path(batch_id: str) -> str:
+    return os.path.join(_dir("jobs"), f"{batch_id}.json")
+
+
+def _cancel_path(batch_id: str) -> str:
+    return os.path.join(_dir("jobs"), f"{batch_id}.cancel")
+
+
+def _batch_object(job: dict) -> dict:
+    return {k: v for k, v in job.items() if not k.startswith("_")}
+
+
+def _validate_input(path: str, endpoint: str) -> int:
+    total = 0
+    seen: set[str] = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError:
+                raise BatchError(f"Line {lineno}: invalid JSON")
+            custom_id = item.get("custom_id")
+            if not custom_id or custom_id in seen:
+                raise BatchError(f"Line {lineno}: missing or duplicate custom_id")
+            if item.get("url") != endpoint:
+                raise BatchError(f"Line {lineno}: url must be {endpoint}")
+            if not isinstance(item.get("body"), dict):
+                raise BatchError(f"Line {lineno}: body must be an object")
+            seen.add(custom_id)
+            total += 1
+    if not total:
+        raise BatchError("Input file has no requests")
+    return total
+
+
+def create_batch(user: dict, input_file_id: str, endpoint: str, completion_window: str, metadata: dict | None) -> dict:
+    if endpoint not in SUPPORTED_ENDPOINTS:
+        raise BatchError(f"Unsupported endpoint: {endpoint}")
+    window = _WINDOW_RE.match(completion_window or "")
+    if not window:
+        raise BatchError(f"Invalid completion_window: {completion_window} (expected e.g. 24h)")
+    if not get_file(input_file_id, user["id"]):
+        raise BatchError("Input file not found")
+    total = _validate_input(file_path(input_file_id), endpoint)
+
+    batch_id = f"batch_{secrets.token_hex(12)}"
+    now = int(time.time())
+    output_file_id = f"file-{batch_id}-output"
+    error_file_id = f"file-{batch_id}-errors"
+    for fid in (output_file_id, error_file_id):
+        open(file_path(fid), "a").close()
+        _register_file(fid, user["id"], f"{fid}.jsonl", "batch_output")
+
+    job = {
+        "id": batch_id,
+        "object": "batch",
+        "endpoint": endpoint,
+        "errors": None,
+        "input_file_id": input_file_id,
+        "completion_window": completion_window,
+        "status": "validating",
+        "output_file_id": output_file_id,
+        "error_file_id": error_file_id,
+        "created_at": now,
+        "in_progress_at": None,
+        "expires_at": now + int(window.group(1)) * 3600,
+        "finalizing_at": None,
+        "completed_at": None,
+        "failed_at": None,
+        "expired_at": None,
+        "cancelling_at": None,
+        "cancelled_at": None,
+        "request_counts": {"total": total, "completed": 0, "failed": 0},
+        "metadata": metadata,
+        "_user": user["id"],
+        "_api_key_id": user.get("_api_key_id"),
+    }
+    _write_json(_job_path(batch_id), job)
+    return _batch_object(job)
+
+
+def get_batch(batch_id: str, user_id: str) -> dict | None:
+    if not _ID_RE.match(batch_id):
+        return None
+    job = _read_json(_job_path(batch_id))
+    if not job or job.get("_user") != user_id:
+        return None
+    if job["status"] in ("validating", "in_progress") and os.path.exists(_cancel_path(batch_id)):
+        job["status"] = "cancelling"
+    return _batch_object(job)
+
+
+def list_batches(user_id: str, limit: int = 20) -> list[dict]:
+    jobs = []
+    for name in os.listdir(_dir("jobs")):
+        if name.endswith(".json"):
+            job = get_batch(name[:-5], user_id)
+            if job:
+                jobs.append(job)
+    jobs.sort(key=lambda j: j["created_at"], reverse=True)
+    return jobs[:limit]
+
+
+def cancel_batch(batch_id: str, user_id: str) -> dict | None:
+    job = get_batch(batch_id, user_id)
+    if job is None:
+        return None
+    if job["status"] in ACTIVE_STATUSES:
+        open(_cancel_path(batch_id), "a").close()
+        job["status"] = "cancelling"
+        job["cancelling_at"] = int(time.time())
+    return job
+
+
+# ── 처리 (리더 싱글톤 작업) ───────────────────────────────────────
+
+def _done_ids(job: dict) -> tuple[set[str], int, int]:
+    """결과 파일에서 이미 처리된 custom_id (재시작 후 이어하기용, 스레드에서 호출)"""
+    done: set[str] = set()
+    counts = []
+    for fid in (job["output_file_id"], job["error_file_id"]):
+        n = 0
+        try:
+            with open(file_path(fid), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        done.add(json.loads(line)["custom_id"])
+                        n += 1
+                    except (json.JSONDecodeError, KeyError):
+                        continue  # 중단 시 잘린 마지막 줄
+        except FileNotFoundError:
+            pass
+        counts.append(n)
+    return done, counts[0], counts[1]
+
+
+async def _load_user(job: dict, cached: dict) -> dict:
+    """쿼터 계산용 사용자 — 배치는 오래 걸리므로 생성 시점 스냅샷 대신 저장소에서 다시 읽되,
+    줄마다 조회하지 않도록 cached(배치별)에 USER_REFRESH_SECONDS 동안 보관"""
+    from app.dependencies import _record_to_dict
+
+    if cached and time.monotonic() - cached["at"] < USER_REFRESH_SECONDS:
+        return cached["user"]
+    record = await storage.run(storage.backend().get_user, job["_user"])
+    if record is None:
+        raise PermissionError("User not found")
+    user = _record_to_dict(record)
+    if job.get("_api_key_id"):
+        user["_api_key_id"] = job["_api_key_id"]
+    cached.update(user=user, at=time.monotonic())
+    return user
+
+
+async def _run_line(job: dict, item: dict, users: dict) -> dict:
+    request_id = f"batch_req_{secrets.token_hex(12)}"
+    handler = _handlers[job["endpoint"]]
+    try:
+        user = await _load_user(job, users)
+        if user.get("status") == "blocked":
+            raise PermissionError("Account blocked")
+        try:
+            ensure_quota_available(user)
+        except ValueError as e:  # 한도 초과 → Ollama 호출 없이 실패로 기록
+            status_code = 429
+            body = {"error": {"message": str(e), "type": "quota_exceeded"}}
+        else:
+            status_code, body = await handler(user, item["body"])
+    except ValueError as e:  # 요청 본문 검증 실패 (pydantic ValidationError 포함)
+        status_code = 400
+        body = {"error": {"message": str(e), "type": "invalid_request_error"}}
+    except Exception as e:
+        status_code = getattr(e, "status_code", 500)
+        body = {"error": {"message": str(getattr(e, "detail", e)), "type": type(e).__name__}}
+
+    if status_code == 200:
+        return {
+            "id": request_id,
+            "custom_id": item["custom_id"],
+            "response": {"status_code": 200, "request_id": request_id, "body": body},
+            "error": None,
+        }
+    return {
+        "id": request_id,
+        "custom_id": item["custom_id"],
+        "response": {"status_code": status_code, "request_id": request_id, "body": body},
+        "error": {"code": str(status_code), "message": body.get("error", {}).get("message", "")},
+    }
+
+
+def _read_items(f, done: set[str], limit: int) -> list[dict]:
+    """입력 파일에서 아직 결과가 없는 요청을 최대 limit개 읽음 (스레드에서 호출). 빈 목록이면 끝"""
+    items = []
+    while len(items) < limit:
+        line = f.readline()
+        if not line:
+            break
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        if item["custom_id"] not in done:
+            items.append(item)
+    return items
+
+
+def _append(f, line: str) -> None:
+    with _append_lock:
+        f.write(line)
+        f.flush()
+
+
+async def _save_job(job: dict) -> None:
+    # 스레드에서 직렬화하는 동안 카운터가 바뀌지 않도록 사본을 넘김
+    snapshot = {**job, "request_counts": dict(job["request_counts"])}
+    await asyncio.to_thread(_write_json, _job_path(job["id"]), snapshot)
+
+
+async def _process(job: dict) -> None:
+    batch_id = job["id"]
+    done, completed, failed = await asyncio.to_thread(_done_ids, job)
+    job["request_counts"].update(completed=completed, failed=failed)
+    if job["status"] == "validating":
+        job["status"] = "in_progress"
+        job["in_progress_at"] = int(time.time())
+    await _save_job(job)
+
+    semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+    out = await asyncio.to_thread(open, file_path(job["output_file_id"]), "a", encoding="utf-8")
+    err = await asyncio.to_thread(open, file_path(job["error_file_id"]), "a", encoding="utf-8")
+    source = await asyncio.to_thread(open, file_path(job["input_file_id"]), "r", encoding="utf-8")
+    users: dict = {}
+    last_save = time.monotonic()
+    last_cancel_check = 0.0
+    cancelled = False
+    expires_at = job.get("expires_at") or float("inf")
+
+    async def _one(item: dict) -> None:
+        nonlocal last_save
+        async with semaphore:
+            if cancelled or time.time() >= expires_at:
+                return
+            await priority.wait_for_turn()
+            result = await _run_line(job, item, users)
+            target = out if result["error"] is None else err
+            await asyncio.to_thread(_append, target, json.dumps(result, ensure_ascii=False) + "\n")
+            job["request_counts"]["completed" if result["error"] is None else "failed"] += 1
+            if time.monotonic() - last_save > 1.0:
+                last_save = time.monotonic()
+                await _save_job(job)
+
+    try:
+        with priority.background():
+            pending: set[asyncio.Task] = set()
+            while not cancelled and time.time() < expires_at:
+                items = await asyncio.to_thread(_read_items, source, done, READ_CHUNK)
+                if not items:
+                    break
+                for item in items:
+                    if time.monotonic() - last_cancel_check >= CANCEL_CHECK_SECONDS:
+                        last_cancel_check = time.monotonic()
+                        cancelled = await asyncio.to_thread(os.path.exists, _cancel_path(batch_id))
+                    if cancelled or time.time() >= expires_at:
+                        break
+                    # 입력 전체를 태스크로 만들지 않도록 동시 처리 수의 2배까지만 선행 생성
+                    while len(pending) >= settings.BATCH_CONCURRENCY * 2:
+                        _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    pending.add(asyncio.create_task(_one(item)))
+            if pending:
+                await asyncio.gather(*pending)
+    finally:
+        for f in (source, out, err):
+            await asyncio.to_thread(f.close)
+
+    await asyncio.to_thread(_finish, job, cancelled, expires_at)
+    logger.info(f"Batch {batch_id} {job['status']}: {job['request_counts']}")
+
+
+def _finish(job: dict, cancelled: bool, expires_at: float) -> None:
+    """최종 상태 기록 + 결과 파일 크기 갱신 (스레드에서 호출 — 처리 태스크는 모두 끝난 뒤)"""
+    now = int(time.time())
+    if cancelled or os.path.exists(_cancel_path(job["id"])):
+        job.update(status="cancelled", cancelled_at=now)
+    elif now >= expires_at:
+        job["request_counts"]["failed"] += _expire_remaining(job)
+        job.update(status="expired", expired_at=now)
+    else:
+        job.update(status="completed", finalizing_at=now, completed_at=now)
+    _write_json(_job_path(job["id"]), job)
+    for fid in (job["output_file_id"], job["error_file_id"]):
+        meta = _read_json(_file_meta_path(fid))
+        if meta:
+            meta["bytes"] = os.path.getsize(file_path(fid))
+            _write_json(_file_meta_path(fid), meta)
+
+
+def _expire_remaining(job: dict) -> int:
+    """완료 기한이 지난 배치: 아직 결과가 없는 요청을 batch_expired 오류로 기록. 기록한 수 반환 (스레드에서 호출)"""
+    done, _, _ = _done_ids(job)
+    expired = 0
+    with open(file_path(job["input_file_id"]), "r", encoding="utf-8") as f, \
+            open(file_path(job["error_file_id"]), "a", encoding="utf-8") as err:
+        for line in f:
+            if not line.strip():
+                continue
+            custom_id = json.loads(line)["custom_id"]
+            if custom_id in done:
+                continue
+            err.write(json.dumps({
+                "id": f"batch_req_{secrets.token_hex(12)}",
+                "custom_id": custom_id,
+                "response": None,
+                "error": EXPIRED_ERROR,
+            }) + "\n")
+            expired += 1
+    return expired
+
+
+def _next_job() -> dict | None:
+    candidates = []
+    for name in os.listdir(_dir("jobs")):
+        if name.endswith(".json"):
+            job = _read_json(os.path.join(_dir("jobs"), name))
+            if job and job.get("status") in ACTIVE_STATUSES:
+                candidates.append(job)
+    candidates.sort(key=lambda j: j["created_at"])  # 먼저 만든 배치부터
+    return candidates[0] if candidates else None
+
+
+async def worker_job() -> None:
+    """리더 싱글톤 작업: 대기 중인 배치를 하나씩 처리 (재시작 시 진행 중 배치부터 재개)"""
+    while True:
+        job = await asyncio.to_thread(_next_job)
+        if job is None:
+            await asyncio.sleep(2.0)
+            continue
+        try:
+            await _process(job)
+        except Exception as e:
+            logger.error(f"Batch {job['id']} failed: {type(e).__name__}: {e}")
+            job.update(status="failed", failed_at=int(time.time()),
+                       errors={"object": "list", "data": [{"message": str(e)}]})
+            await asyncio.to_thread(_write_json, _job_path(job["id"]), job)
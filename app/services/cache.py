@@ -7,7 +7,8 @@ Redis 캐시 서비스
   auth:apikey:{key_hash}   → API Key 인증 결과 (user dict + _api_key_id), TTL 5분
   auth:user:{user_id}      → JWT 인증 결과 (user dict), TTL 5분
   reset:{user_id}:{date}   → 일일 리셋 완료 여부, TTL 자정까지
-  config:ollama_url        → Ollama 서버 URL, TTL 10분
+  lock:{name}              → 워커 간 분산 락 (소유자 ID), TTL 락마다 지정
+  priority:interactive:{worker} → 워커별 진행 중인 대화형 Ollama 요청 수 (app/services/priority.py), TTL 3초
 """
 import json
 import logging
@@ -81,6 +82,24 @@ def delete_pattern(pattern: str) -> None:
         pass
 
 
+def enabled() -> bool:
+    return _get_client() is not None
+
+
+def get_pattern(pattern: str) -> dict[str, Any]:
+    """패턴에 맞는 키 전체 → {키: 값} (SCAN — 키 수가 적은 용도만)"""
+    r = _get_client()
+    if r is None:
+        return {}
+    try:
+        keys = list(r.scan_iter(match=pattern, count=100))
+        if not keys:
+            return {}
+        return {k: json.loads(v) for k, v in zip(keys, r.mget(keys)) if v}
+    except Exception:
+        return {}
+
+
 def _seconds_until_midnight() -> int:
     """자정까지 남은 초 (최소 60초)"""
     now = datetime.now(timezone.utc)
@@ -103,8 +122,8 @@ def key_daily_reset(user_id: str, date: str) -> str:
     return f"reset:{user_id}:{date}"
 
 
-def key_ollama_url() -> str:
-    return "config:ollama_url"
+def key_interactive(worker: str) -> str:
+    return f"priority:interactive:{worker}"
 
 
 # ── 도메인 캐시 함수 ──────────────────────────────────────────────
@@ -139,14 +158,6 @@ def mark_daily_reset_done(user_id: str, today: str) -> None:
     set(key_daily_reset(user_id, today), 1, ttl=_seconds_until_midnight())
 
 
-def get_cached_ollama_url() -> str | None:
-    return get(key_ollama_url())
-
-
-def set_cached_ollama_url(url: str) -> None:
-    set(key_ollama_url(), url, ttl=600)  # 10분
-
-
 # ── API Keys 캐시 ─────────────────────────────────────────────────
 
 def key_list(user_id: str) -> str:
@@ -180,3 +191,63 @@ def set_cached_reveal(key_id: str, plain_key: str) -> None:
 
 def invalidate_reveal(key_id: str) -> None:
     delete(key_reveal(key_id))
+
+
+# ── 분산 락 (멀티 워커 리더 선출) ─────────────────────────────────
+# acquire_lock: Redis 미설정 시 None (호출 측에서 파일 락 사용), 설정됐는데 장애면 False
+# (파일 락으로 넘어가지 않음 — 다른 워커가 아직 Redis 락을 보유한 리더일 수 있음)
+
+_RENEW_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def key_lock(name: str) -> str:
+    return f"lock:{name}"
+
+
+def acquire_lock(name: str, owner: str, ttl: int) -> bool | None:
+    """락 획득 시도. 이미 소유 중이면 TTL 갱신.
+    REDIS_URL 미설정 시 None, 설정되어 있는데 Redis 연결/명령이 실패하면 False (획득 못 함으로 간주)."""
+    if not settings.REDIS_URL:
+        return None
+    r = _get_client()
+    if r is None:
+        return False
+    try:
+        if r.set(key_lock(name), owner, nx=True, px=ttl * 1000):
+            return True
+        return bool(r.eval(_RENEW_LOCK_SCRIPT, 1, key_lock(name), owner, ttl * 1000))
+    except Exception:
+        return False
+
+
+def lock_owner(name: str) -> str | None:
+    """락 보유자 (없거나 Redis 미사용/장애 시 None)"""
+    r = _get_client()
+    if r is None:
+        return None
+    try:
+        return r.get(key_lock(name))
+    except Exception:
+        return None
+
+
+def release_lock(name: str, owner: str) -> None:
+    r = _get_client()
+    if r is None:
+        return
+    try:
+        r.eval(_RELEASE_LOCK_SCRIPT, 1, key_lock(name), owner)
+    except Exception:
+        pass
@@ -0,0 +1,94 @@
+"""
+임베딩 마이크로 배칭
+동시에 들어오는 단일 입력 임베딩 요청을 모델별로 모아 Ollama /api/embed 한 번으로 처리합니다.
+
+- 첫 요청 도착 후 EMBED_BATCH_WINDOW_MS 동안 같은 모델 요청을 모음
+- EMBED_MAX_BATCH개가 차면 창을 기다리지 않고 즉시 전송
+- 결과 벡터는 요청자별로 분배, 토큰(prompt_eval_count)은 입력 길이 비율로 나눔
+- 여러 입력을 가진 요청이나 추가 옵션(truncate/options/dimensions)이 있는 요청은 배칭 없이 바로 전송
+"""
+import asyncio
+
+from app.config import settings
+from app.services import ollama_client
+
+_queues: dict[str, list[tuple[str, asyncio.Future]]] = {}
+_timers: dict[str, asyncio.TimerHandle] = {}
+_inflight: set[asyncio.Task] = set()
+_stats = {"requests": 0, "batches": 0, "batchedInputs": 0}
+
+
+def split_tokens(total: int, inputs: list[str]) -> list[int]:
+    """배치 토큰 수를 입력 길이 비율로 분배 (합계 보존, 최대 나머지 방식)"""
+    if not inputs:
+        return []
+    weights = [max(len(t), 1) for t in inputs]
+    weight_sum = sum(weights)
+    raw = [total * w / weight_sum for w in weights]
+    shares = [int(r) for r in raw]
+    remainder = total - sum(shares)
+    for i in sorted(range(len(raw)), key=lambda i: raw[i] - shares[i], reverse=True)[:remainder]:
+        shares[i] += 1
+    return shares
+
+
+async def embed(model: str, inputs: list[str], extra: dict | None = None) -> tuple[list[list[float]], list[int]]:
+    """임베딩 벡터와 입력별 토큰 수를 반환"""
+    _stats["requests"] += 1
+    if len(inputs) == 1 and not extra:
+        vector, tokens = await _enqueue(model, inputs[0])
+        return [vector], [tokens]
+
+    result = await ollama_client.embed({"model": model, "input": inputs, **(extra or {})})
+    return result.get("embeddings", []), split_tokens(result.get("prompt_eval_count", 0) or 0, inputs)
+
+
+async def _enqueue(model: str, text: str) -> tuple[list[float], int]:
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    queue = _queues.setdefault(model, [])
+    queue.append((text, future))
+
+    if len(queue) >= settings.EMBED_MAX_BATCH:
+        _flush(model)
+    elif model not in _timers:
+        _timers[model] = loop.call_later(settings.EMBED_BATCH_WINDOW_MS / 1000, _flush, model)
+    return await future
+
+
+def _flush(model: str) -> None:
+    timer = _timers.pop(model, None)
+    if timer is not None:
+        timer.cancel()
+    batch = _queues.pop(model, [])
+    if batch:
+        task = asyncio.create_task(_run_batch(model, batch))
+        _inflight.add(task)
+        task.add_done_callback(_inflight.discard)
+
+
+async def _run_batch(model: str, batch: list[tuple[str, asyncio.Future]]) -> None:
+    inputs = [text for text, _ in batch]
+    _stats["batches"] += 1
+    _stats["batchedInputs"] += len(inputs)
+    try:
+        result = await ollama_client.embed({"model": model, "input": inputs})
+        embeddings = result.get("embeddings", [])
+        if len(embeddings) != len(inputs):
+            raise ValueError(f"Ollama returned {len(embeddings)} embeddings for {len(inputs)} inputs")
+        tokens = split_tokens(result.get("prompt_eval_count", 0) or 0, inputs)
+        for (_, future), vector, count in zip(batch, embeddings, tokens):
+            if not future.done():
+                future.set_result((vector, count))
+    except Exception as e:
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(e)
+
+
+def stats() -> dict:
+    batches = _stats["batches"]
+    return {
+        **_stats,
+        "avgBatchSize": round(_stats["batchedInputs"] / batches, 2) if batches else 0,
+    }
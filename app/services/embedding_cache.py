@@ -0,0 +1,282 @@
+"""
+영구 임베딩 캐시 — 콘텐츠 주소 기반 (model + 입력 해시)
+RAG 재색인 시 같은 청크가 반복 임베딩되므로, 결과 벡터를 로컬 디스크에 저장해 두고
+캐시 히트는 Ollama를 거치지 않고 바로 반환합니다.
+
+저장 구조 ({DATA_DIR}/embeddings/):
+  CURRENT              → 현재 세대 번호
+  vectors-{gen}.bin    → float32 벡터를 이어 붙인 데이터 파일 (읽기는 mmap)
+  index-{gen}.jsonl    → 추가 전용 인덱스 {"k": 키, "o": 오프셋, "d": 차원, "t": 토큰} / 삭제 {"k": 키, "x": 1}
+  .lock                → 워커 간 쓰기 락 (flock)
+
+- 크기 상한(EMBED_CACHE_MAX_BYTES)을 넘으면 LRU 순으로 삭제 레코드를 남기고 제거
+- 삭제로 생긴 빈 공간이 살아있는 데이터보다 커지면 새 세대로 압축(compaction)
+  새 세대 파일은 _lock 없이 만들고 CURRENT 교체 + 재로딩만 _lock 안에서 (압축 중에도 조회가 막히지 않도록)
+- 다른 워커가 쓴 항목은 조회 시 인덱스 파일 뒷부분을 읽어 반영 (세대가 바뀌면 전체 재로딩)
+- LRU 순서는 프로세스 메모리 기준 (재시작 시 인덱스 기록 순서로 복원)
+"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import threading
+from array import array
+from collections import OrderedDict
+
+from app.config import settings
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+FLOAT_BYTES = 4
+COMPACT_MIN_DEAD_BYTES = 16 * 1024 * 1024
+
+_lock = threading.Lock()
+_entries: OrderedDict[str, tuple[int, int, int]] = OrderedDict()  # key → (offset, dim, tokens)
+_state = {
+    "gen": None,
+    "indexPos": 0,
+    "liveBytes": 0,
+    "deadBytes": 0,
+}
+_mm: mmap.mmap | None = None
+_mm_size = 0
+_stats = {"hits": 0, "misses": 0, "bytesSaved": 0, "evictions": 0, "compactions": 0}
+
+
+def _root() -> str:
+    return os.path.join(settings.DATA_DIR, "embeddings")
+
+
+def _path(name: str) -> str:
+    return os.path.join(_root(), name)
+
+
+def cache_key(model: str, text: str, extra: dict | None = None) -> str:
+    h = hashlib.sha256()
+    h.update(model.encode())
+    h.update(b"\0")
+    if extra:
+        h.update(json.dumps(extra, sort_keys=True).encode())
+    h.update(b"\0")
+    h.update(text.encode())
+    return h.hexdigest()
+
+
+class _FileLock:
+    """워커 간 쓰기 직렬화 (fcntl 미지원 환경에서는 프로세스 내 락만 사용)"""
+
+    def __enter__(self):
+        os.makedirs(_root(), exist_ok=True)
+        self._f = open(_path(".lock"), "a+")
+        if fcntl is not None:
+            fcntl.flock(self._f.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._f.fileno(), fcntl.LOCK_UN)
+        self._f.close()
+
+
+# ── 동기화 (다른 워커의 쓰기 반영) ───────────────────────────────
+
+def _read_gen() -> int:
+    try:
+        with open(_path("CURRENT")) as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _reset(gen: int) -> None:
+    global _mm, _mm_size
+    _entries.clear()
+    _state.update(gen=gen, indexPos=0, liveBytes=0, deadBytes=0)
+    if _mm is not None:
+        _mm.close()
+    _mm, _mm_size = None, 0
+
+
+def _apply_index_line(line: str) -> None:
+    rec = json.loads(line)
+    key = rec["k"]
+    old = _entries.pop(key, None)
+    if old is not None:
+        _state["liveBytes"] -= old[1] * FLOAT_BYTES
+        _state["deadBytes"] += old[1] * FLOAT_BYTES
+    if not rec.get("x"):
+        _entries[key] = (rec["o"], rec["d"], rec.get("t", 0))
+        _state["liveBytes"] += rec["d"] * FLOAT_BYTES
+
+
+def _sync() -> None:
+    """CURRENT 세대 확인 → 인덱스 꼬리 읽기 → 데이터 파일 mmap 갱신 (_lock 보유 상태에서 호출)"""
+    global _mm, _mm_size
+    gen = _read_gen()
+    if gen != _state["gen"]:
+        _reset(gen)
+
+    index_path = _path(f"index-{gen}.jsonl")
+    try:
+        with open(index_path, "r") as f:
+            f.seek(_state["indexPos"])
+            while True:
+                line = f.readline()
+                if not line or not line.endswith("\n"):
+                    break  # 다른 워커가 쓰는 중인 마지막 줄은 다음에 읽음
+                _apply_index_line(line)
+                _state["indexPos"] = f.tell()
+    except FileNotFoundError:
+        pass
+
+    data_path = _path(f"vectors-{gen}.bin")
+    try:
+        size = os.path.getsize(data_path)
+    except FileNotFoundError:
+        size = 0
+    if size != _mm_size:
+        if _mm is not None:
+            _mm.close()
+        _mm = None
+        if size:
+            with open(data_path, "rb") as f:
+                _mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _mm_size = size
+
+
+# ── 조회/저장 ─────────────────────────────────────────────────────
+
+def get_many(model: str, texts: list[str], extra: dict | None = None) -> list[tuple[list[float], int] | None]:
+    """입력별 (벡터, 토큰 수) 또는 None(미스). 인덱스 파일을 읽을 수 있으므로 asyncio.to_thread로 호출."""
+    results: list[tuple[list[float], int] | None] = []
+    if not settings.EMBED_CACHE_ENABLED:
+        return [None] * len(texts)
+    with _lock:
+        try:
+            _sync()
+        except Exception as e:
+            logger.warning(f"Embedding cache sync failed: {e}")
+            return [None] * len(texts)
+        for text in texts:
+            key = cache_key(model, text, extra)
+            entry = _entries.get(key)
+            if entry is None or _mm is None or entry[0] + entry[1] * FLOAT_BYTES > _mm_size:
+                _stats["misses"] += 1
+                results.append(None)
+                continue
+            offset, dim, tokens = entry
+            _entries.move_to_end(key)
+            vector = array("f")
+            vector.frombytes(_mm[offset:offset + dim * FLOAT_BYTES])
+            _stats["hits"] += 1
+            _stats["bytesSaved"] += dim * FLOAT_BYTES
+            results.append((vector.tolist(), tokens))
+    return results
+
+
+def put_many(model: str, texts: list[str], vectors: list[list[float]], tokens: list[int], extra: dict | None = None) -> None:
+    """새 벡터 저장 + 크기 상한 적용. 파일 I/O가 있으므로 asyncio.to_thread로 호출."""
+    if not settings.EMBED_CACHE_ENABLED or not texts:
+        return
+    try:
+        with _FileLock():
+            with _lock:
+                _sync()
+                gen = _state["gen"]
+                data_path = _path(f"vectors-{gen}.bin")
+                lines = []
+                written: set[str] = set()  # 같은 호출 안의 중복 입력은 한 번만
+                with open(data_path, "ab") as data:
+                    offset = data.tell()
+                    for text, vector, count in zip(texts, vectors, tokens):
+                        key = cache_key(model, text, extra)
+                        if key in _entries or key in written:
+                            continue
+                        written.add(key)
+                        data.write(array("f", vector).tobytes())
+                        lines.append(json.dumps({"k": key, "o": offset, "d": len(vector), "t": count}))
+                        offset += len(vector) * FLOAT_BYTES
+                _append_index(gen, lines)
+                _sync()
+                _evict_over_budget(gen)
+                needs_compaction = _state["deadBytes"] > max(_state["liveBytes"], COMPACT_MIN_DEAD_BYTES)
+                live = list(_entries.items())
+            if needs_compaction:
+                _compact(gen, live)
+    except Exception as e:
+        logger.warning(f"Embedding cache write failed: {type(e).__name__}: {e}")
+
+
+def _append_index(gen: int, lines: list[str]) -> None:
+    if lines:
+        with open(_path(f"index-{gen}.jsonl"), "a") as f:
+            f.write("".join(line + "\n" for line in lines))
+
+
+def _evict_over_budget(gen: int) -> None:
+    limit = settings.EMBED_CACHE_MAX_BYTES
+    if _state["liveBytes"] <= limit:
+        return
+    target = int(limit * 0.9)
+    victims = []
+    freed = 0
+    for key, (_, dim, _) in _entries.items():  # 앞쪽이 가장 오래 안 쓰인 항목
+        if _state["liveBytes"] - freed <= target:
+            break
+        victims.append(key)
+        freed += dim * FLOAT_BYTES
+    _append_index(gen, [json.dumps({"k": key, "x": 1}) for key in victims])
+    _stats["evictions"] += len(victims)
+    _sync()
+
+
+def _compact(gen: int, live: list[tuple[str, tuple[int, int, int]]]) -> None:
+    """살아있는 항목만 LRU 순서로 새 세대 파일에 다시 쓰고 CURRENT 교체.
+
+    _FileLock 보유(다른 쓰기 없음), _lock 미보유 상태에서 호출 — 기존 세대는 별도로 열어서 읽고
+    (조회 쪽 _sync가 _mm을 닫을 수 있으므로) 교체와 재로딩만 _lock 안에서.
+    """
+    new_gen = gen + 1
+    lines = []
+    with open(_path(f"vectors-{gen}.bin"), "rb") as src, open(_path(f"vectors-{new_gen}.bin"), "wb") as data:
+        with mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as old:
+            offset = 0
+            for key, (old_offset, dim, count) in live:
+                size = dim * FLOAT_BYTES
+                data.write(old[old_offset:old_offset + size])
+                lines.append(json.dumps({"k": key, "o": offset, "d": dim, "t": count}))
+                offset += size
+    with open(_path(f"index-{new_gen}.jsonl"), "w") as f:
+        f.write("".join(line + "\n" for line in lines))
+    tmp = _path("CURRENT.tmp")
+    with open(tmp, "w") as f:
+        f.write(str(new_gen))
+
+    with _lock:
+        os.replace(tmp, _path("CURRENT"))
+        _sync()
+        _stats["compactions"] += 1
+    for name in (f"vectors-{gen}.bin", f"index-{gen}.jsonl"):
+        try:
+            os.remove(_path(name))  # 다른 워커의 기존 mmap은 닫을 때까지 유효
+        except FileNotFoundError:
+            pass
+
+
+def stats() -> dict:
+    lookups = _stats["hits"] + _stats["misses"]
+    with _lock:
+        return {
+            **_stats,
+            "hitRatio": round(_stats["hits"] / lookups, 4) if lookups else 0.0,
+            "entries": len(_entries),
+            "liveBytes": _state["liveBytes"],
+            "deadBytes": _state["deadBytes"],
+            "maxBytes": settings.EMBED_CACHE_MAX_BYTES,
+        }
@@ -0,0 +1,89 @@
+"""
+관리자 원본 데이터 내보내기 (usage_logs, security_events)
+기간/필터에 맞는 행을 created 오름차순 키셋 페이지네이션으로 읽어 NDJSON 또는 CSV로 바로 흘려보냅니다.
+한 번에 한 페이지만 메모리에 두므로 행 수와 무관하게 메모리 사용량이 일정 (응답은 chunked 전송).
+
+- 첫 페이지는 응답 시작 전에 읽음 → PocketBase 오류를 502 상태 코드로 돌려줄 수 있음
+- 이후 페이지 오류는 상태 코드를 바꿀 수 없으므로 NDJSON은 마지막 줄에 {"error": ...}, CSV는 로그만 남기고 종료
+"""
+import asyncio
+import csv
+import io
+import json
+import logging
+from datetime import datetime
+from typing import AsyncIterator
+
+from app.services import pagination
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = pagination.MAX_PAGE_SIZE
+
+COLUMNS = {
+    "usage_logs": [
+        "id", "created", "user", "apiKey", "model", "endpoint", "promptTokens", "completionTokens",
+        "totalTokens", "responseTimeMs", "statusCode", "ip", "isError",
+    ],
+    "security_events": ["id", "created", "type", "severity", "description", "ip", "userId"],
+}
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def build_filter(start: datetime | None, end: datetime | None, equals: dict) -> str:
+    """기간 [start, end) + 필드 일치 조건 → PocketBase 필터 (빈 값은 제외)"""
+    conditions = []
+    if start:
+        conditions.append(f"created>={pagination.quote(pagination.format_datetime(start))}")
+    if end:
+        conditions.append(f"created<{pagination.quote(pagination.format_datetime(end))}")
+    for field, value in equals.items():
+        if value is None or value == "":
+            continue
+        conditions.append(f"{field}={pagination.quote(value)}")
+    return " && ".join(conditions)
+
+
+def _encode(rows: list[dict], columns: list[str], fmt: str, header: bool) -> bytes:
+    if fmt == "ndjson":
+        return "".join(json.dumps({c: row.get(c) for c in columns}, ensure_ascii=False) + "\n" for row in rows).encode()
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if header:
+        writer.writerow(columns)
+    for row in rows:
+        writer.writerow(["" if row.get(c) is None else row.get(c) for c in columns])
+    return buf.getvalue().encode()
+
+
+async def open_export(collection: str, filter: str, fmt: str) -> AsyncIterator[bytes]:
+    """첫 페이지를 읽은 뒤 스트림 생성기를 반환 (첫 페이지 조회 실패는 호출 쪽으로 예외 전달)"""
+    columns = COLUMNS[collection]
+    fields = ",".join(columns)
+    items, cursor = await asyncio.to_thread(
+        pagination.fetch_page, collection, filter, "created", False, PAGE_SIZE, None, fields,
+    )
+
+    async def stream():
+        nonlocal items, cursor
+        header = True
+        count = 0
+        while True:
+            if items or header:
+                yield _encode(items, columns, fmt, header and fmt == "csv")
+            count += len(items)
+            header = False
+            if cursor is None:
+                break
+            try:
+                items, cursor = await asyncio.to_thread(
+                    pagination.fetch_page, collection, filter, "created", False, PAGE_SIZE, cursor, fields,
+                )
+            except Exception as e:
+                logger.error(f"Export of {collection} failed after {count} rows: {type(e).__name__}: {e}")
+                if fmt == "ndjson":
+                    yield (json.dumps({"error": f"export interrupted after {count} rows: {e}"}) + "\n").encode()
+                return
+        logger.info(f"Exported {count} {collection} rows ({fmt})")
+
+    return stream()
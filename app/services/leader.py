@@ -0,0 +1,241 @@
+"""
+멀티 워커 조정 — 리더 선출
+uvicorn --workers N 으로 실행하면 워커마다 lifespan이 돌기 때문에, 한 번만 실행되어야 하는
+작업(Ollama 감지, 워밍업, 일일 리셋 등)은 리더 워커 하나에서만 실행합니다.
+
+- REDIS_URL 설정 시 Redis 락(SET NX PX + 주기적 갱신), 미설정 시 파일 락({DATA_DIR}/leader.lock, flock)
+  Redis 장애 중에는 파일 락으로 넘어가지 않고 "획득 못 함"으로 처리 — 다른 워커/호스트가 아직 Redis 락을
+  보유한 리더일 수 있으므로, 리더가 둘이 되느니 장애가 끝날 때까지 리더 없이 둠
+- 사용할 수 있는 락이 없으면(REDIS_URL 없음 + fcntl 미지원) 리더가 되지 않음 — 이 경우 REDIS_URL 설정 필요
+- 리더는 register_job()으로 등록된 싱글톤 작업을 실행하고, 결과를 publish_state()로 게시
+- 팔로워는 read_state()로 리더가 게시한 결과를 사용
+  게시 상태에는 리더 id와 임기(term — 리더가 될 때마다 새로 발급)를 찍음. 새 리더는 상태를 비우고 시작하며,
+  게시자가 지금 락 보유자가 아닌 상태(이전 실행/죽은 리더가 남긴 것)는 read_state가 무시
+  → 재시작 직후 팔로워가 이전 실행의 "감지/워밍업 완료"를 보고 ready가 되지 않음
+- 리더 프로세스가 죽으면 락이 풀리고(파일 락: 커널이 해제, Redis: TTL 만료) 팔로워 중 하나가 승계
+  → 승계한 워커가 싱글톤 작업을 다시 시작
+
+배포 (multi-worker 모드):
+  uvicorn main:app --host 0.0.0.0 --port 8000 --workers 4
+  - 같은 호스트의 워커들은 같은 DATA_DIR을 바라봐야 함 (기본 ./data)
+  - 여러 컨테이너/호스트에 걸쳐 하나의 리더만 두려면 모든 인스턴스에 같은 REDIS_URL 설정
+  - 단일 워커 실행 시에도 동일하게 동작 (항상 리더)
+  - 리더 1명 유지 / 승계는 benchmarks/check_leader.py 로 확인 (워커 프로세스 여러 개가 같은 DATA_DIR 공유)
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from typing import Awaitable, Callable
+
+from app.config import settings
+from app.services import cache
+
+try:
+    import fcntl
+except ImportError:  # Windows: 파일 락 미지원 → REDIS_URL 없이는 리더가 되지 않음
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LOCK_NAME = "leader"
+STATE_CACHE_KEY = "leader:state"
+
+_owner = f"{socket.gethostname()}:{os.getpid()}"
+_is_leader = False
+_term: str | None = None
+_lock_file = None
+_jobs: dict[str, Callable[[], Awaitable[None]]] = {}
+_running: dict[str, asyncio.Task] = {}
+_election_done = asyncio.Event()
+
+
+def is_leader() -> bool:
+    return _is_leader
+
+
+def owner_id() -> str:
+    return _owner
+
+
+def register_job(name: str, job: Callable[[], Awaitable[None]]) -> None:
+    """리더에서만 실행할 싱글톤 작업 등록 (리더가 되면 시작, 리더십을 잃으면 취소)"""
+    _jobs[name] = job
+    if _is_leader and name not in _running:
+        _start_job(name)
+
+
+# ── 공유 상태 ─────────────────────────────────────────────────────
+
+def _state_path() -> str:
+    return os.path.join(settings.DATA_DIR, "leader_state.json")
+
+
+def publish_state(**values) -> None:
+    """리더가 작업 결과를 팔로워에게 게시 (파일 + Redis). 같은 임기에 게시한 값에만 합침"""
+    previous = _read_published() or {}
+    if previous.get("term") != _term:
+        previous = {}
+    _write_state({**previous, **values, "leader": _owner, "term": _term, "updatedAt": time.time()})
+
+
+def _write_state(state: dict) -> None:
+    try:
+        os.makedirs(settings.DATA_DIR, exist_ok=True)
+        tmp = f"{_state_path()}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f, default=str)
+        os.replace(tmp, _state_path())
+    except Exception as e:
+        logger.warning(f"Leader state publish failed: {e}")
+    cache.set(STATE_CACHE_KEY, state, ttl=86400)
+
+
+def read_state() -> dict | None:
+    """현재 리더가 게시한 상태. 게시자가 지금 락 보유자가 아니면 None"""
+    state = _read_published()
+    if not state or state.get("leader") != current_owner():
+        return None
+    return state
+
+
+def _read_published() -> dict | None:
+    state = cache.get(STATE_CACHE_KEY)
+    if state:
+        return state
+    try:
+        with open(_state_path(), "r") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+# ── 락 ────────────────────────────────────────────────────────────
+
+def _try_file_lock() -> bool:
+    global _lock_file
+    if fcntl is None:
+        return False
+    if _lock_file is not None:
+        return True  # 이미 보유 중 (flock은 fd가 열려 있는 동안 유지)
+    try:
+        os.makedirs(settings.DATA_DIR, exist_ok=True)
+        f = open(os.path.join(settings.DATA_DIR, "leader.lock"), "a+")
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        f.seek(0)
+        f.truncate()
+        f.write(_owner)
+        f.flush()
+        _lock_file = f
+        return True
+    except Exception as e:
+        logger.warning(f"Leader file lock failed: {e}")
+        return False
+
+
+def current_owner() -> str | None:
+    """지금 리더 락을 가진 워커 id (없으면 None)"""
+    if _is_leader:
+        return _owner
+    if settings.REDIS_URL:
+        return cache.lock_owner(LOCK_NAME)
+    if fcntl is None:
+        return None
+    try:
+        with open(os.path.join(settings.DATA_DIR, "leader.lock"), "r") as f:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except OSError:
+                return f.read().strip() or None  # 누군가 배타 락 보유 중 → 기록된 id
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            return None  # 파일만 남고 보유자 없음 (리더가 죽음)
+    except OSError:
+        return None
+
+
+def _try_acquire() -> bool:
+    acquired = cache.acquire_lock(LOCK_NAME, _owner, settings.LEADER_LOCK_TTL)
+    if acquired is None:  # REDIS_URL 미설정 → 파일 락
+        return _try_file_lock()
+    return acquired  # Redis 오류는 False — 파일 락으로 넘어가지 않음
+
+
+def _release() -> None:
+    global _lock_file
+    cache.release_lock(LOCK_NAME, _owner)
+    if _lock_file is not None:
+        try:
+            _lock_file.close()  # fd 닫힘 → flock 해제
+        except Exception:
+            pass
+        _lock_file = None
+
+
+# ── 작업 관리 ─────────────────────────────────────────────────────
+
+def _start_job(name: str) -> None:
+    async def _run():
+        try:
+            await _jobs[name]()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Leader job '{name}' failed: {type(e).__name__}: {e}")
+
+    _running[name] = asyncio.create_task(_run(), name=f"leader:{name}")
+
+
+async def _stop_jobs() -> None:
+    tasks = list(_running.values())
+    _running.clear()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def run() -> None:
+    """리더 선출 루프. lifespan에서 백그라운드 작업으로 실행."""
+    global _is_leader, _term
+    interval = max(settings.LEADER_LOCK_TTL / 3, 1.0)
+    if fcntl is None and not settings.REDIS_URL:
+        logger.error("No leader lock available (fcntl unsupported, REDIS_URL unset) — singleton jobs will not run")
+    try:
+        while True:
+            try:
+                acquired = await asyncio.to_thread(_try_acquire)
+            except Exception:
+                acquired = False
+
+            if acquired and not _is_leader:
+                _is_leader = True
+                _term = f"{_owner}:{time.time_ns()}"
+                # 이전 임기(다른 워커 또는 이 워커의 지난 리더십)가 남긴 상태를 비우고 시작
+                await asyncio.to_thread(_write_state, {"leader": _owner, "term": _term, "updatedAt": time.time()})
+                logger.info(f"Became leader ({_owner})")
+                for name in _jobs:
+                    if name not in _running:
+                        _start_job(name)
+            elif not acquired and _is_leader:
+                _is_leader = False
+                logger.warning(f"Lost leadership ({_owner})")
+                await _stop_jobs()
+
+            _election_done.set()
+            await asyncio.sleep(interval)
+    finally:
+        await _stop_jobs()
+        if _is_leader:
+            _release()
+        _is_leader = False
+
+
+async def wait_for_election() -> bool:
+    """첫 선출 시도가 끝날 때까지 대기. 리더 여부 반환."""
+    await _election_done.wait()
+    return _is_leader
@@ -0,0 +1,136 @@
+"""
+이벤트 루프 지연(lag) 모니터 + 블로킹 호출 탐지
+비동기 핸들러 안의 동기 호출(PocketBase, Redis, psutil 등)이 루프를 멈추면 그동안 모든 요청이 대기한다.
+
+- 루프 안의 틱 코루틴이 LOOP_MONITOR_INTERVAL_MS마다 깨어나며 예정 시각 대비 지연을 히스토그램에 기록
+- 감시 스레드(워치독)는 틱이 LOOP_STALL_THRESHOLD_MS 넘게 멈추면 그 순간 루프 스레드의 스택을 잡아
+  실행 중이던 라우트(프레임의 ASGI `scope` 지역 변수에서 추출)와 함께 경고 로그로 남김
+  → 멈춘 "동안" 스택을 잡으므로 블로킹 호출 위치가 그대로 찍힘
+- 최근 정체 내역과 히스토그램은 /api/admin/loop-lag 에서 확인 (워커별)
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+MAX_STACK_LINES = 40
+
+_counts = [0] * (len(BUCKETS_MS) + 1)   # 마지막 칸은 +Inf
+_totals = {"count": 0, "sumMs": 0.0, "maxMs": 0.0}
+_stalls: deque = deque(maxlen=50)
+_state = {"lastTick": 0.0, "loopThread": None, "reportedTick": 0.0}
+
+
+def observe(lag_ms: float) -> None:
+    for i, bound in enumerate(BUCKETS_MS):
+        if lag_ms <= bound:
+            _counts[i] += 1
+            break
+    else:
+        _counts[-1] += 1
+    _totals["count"] += 1
+    _totals["sumMs"] += lag_ms
+    if lag_ms > _totals["maxMs"]:
+        _totals["maxMs"] = lag_ms
+
+
+def _route_of(frame) -> dict:
+    """루프 스레드 스택을 거슬러 올라가며 ASGI scope(dict, type=http)를 찾음"""
+    while frame is not None:
+        try:
+            scope = frame.f_locals.get("scope")
+        except Exception:
+            scope = None
+        if isinstance(scope, dict) and scope.get("type") in ("http", "websocket"):
+            route = scope.get("route")
+            state = scope.get("state") or {}
+            return {
+                "method": scope.get("method", ""),
+                "path": scope.get("path", ""),
+                "route": getattr(route, "path", None),
+                "requestId": state.get("request_id") if isinstance(state, dict) else None,
+            }
+        frame = frame.f_back
+    return {}
+
+
+def _capture(stalled_ms: float) -> None:
+    frame = sys._current_frames().get(_state["loopThread"])
+    if frame is None:
+        return
+    stack = traceback.format_stack(frame)[-MAX_STACK_LINES:]
+    route = _route_of(frame)
+    stall = {
+        "at": time.time(),
+        "stalledMs": round(stalled_ms, 1),
+        **route,
+        "stack": "".join(stack),
+    }
+    _stalls.append(stall)
+    where = f"{route.get('method', '')} {route.get('route') or route.get('path', '')}".strip() or "(no request)"
+    logger.warning(
+        f"Event loop blocked for {stalled_ms:.0f}ms+ in {where} rid={route.get('requestId') or '-'}\n"
+        + "".join(stack)
+    )
+
+
+def _watchdog(stop: threading.Event) -> None:
+    interval = settings.LOOP_MONITOR_INTERVAL_MS / 1000
+    threshold = settings.LOOP_STALL_THRESHOLD_MS / 1000
+    while not stop.wait(min(threshold / 4, interval)):
+        last = _state["lastTick"]
+        stalled = time.monotonic() - last - interval
+        if last and stalled > threshold and _state["reportedTick"] != last:
+            _state["reportedTick"] = last  # 같은 정체는 한 번만 기록
+            try:
+                _capture(stalled * 1000)
+            except Exception as e:
+                logger.debug(f"Loop stall capture failed: {e}")
+
+
+async def run() -> None:
+    """워커별 백그라운드 작업 (lifespan에서 시작)"""
+    if not settings.LOOP_MONITOR_ENABLED:
+        return
+    interval = settings.LOOP_MONITOR_INTERVAL_MS / 1000
+    _state["loopThread"] = threading.get_ident()
+    _state["lastTick"] = time.monotonic()
+    stop = threading.Event()
+    threading.Thread(target=_watchdog, args=(stop,), name="loop-watchdog", daemon=True).start()
+    try:
+        while True:
+            expected = time.monotonic() + interval
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            _state["lastTick"] = now
+            observe(max(0.0, now - expected) * 1000)
+    finally:
+        stop.set()
+
+
+def snapshot(include_stacks: bool = True) -> dict:
+    cumulative = 0
+    buckets = []
+    for bound, count in zip((*BUCKETS_MS, "+Inf"), _counts):
+        cumulative += count
+        buckets.append({"le": bound, "count": cumulative})
+    count = _totals["count"]
+    return {
+        "enabled": settings.LOOP_MONITOR_ENABLED,
+        "intervalMs": settings.LOOP_MONITOR_INTERVAL_MS,
+        "stallThresholdMs": settings.LOOP_STALL_THRESHOLD_MS,
+        "count": count,
+        "sumMs": round(_totals["sumMs"], 1),
+        "meanMs": round(_totals["sumMs"] / count, 2) if count else 0.0,
+        "maxMs": round(_totals["maxMs"], 1),
+        "buckets": buckets,
+        "stalls": [s if include_stacks else {k: v for k, v in s.items() if k != "stack"} for s in reversed(_stalls)],
+    }
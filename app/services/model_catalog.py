@@ -0,0 +1,119 @@
+"""
+모델 카탈로그 캐시 — Ollama /api/tags, /api/show 결과를 워커 메모리에서 제공
+모델 목록 라우트(/api/v1/models, /v1/models, /api/tags), 대시보드, 관리자 성능 화면이
+요청마다 Ollama를 호출하지 않도록:
+
+- 워커별 백그라운드 작업(refresh_job)이 MODEL_CATALOG_REFRESH_SECONDS마다 /api/tags 갱신
+- 모델 pull 완료·Ollama URL 변경 시 즉시 갱신 (refresh / invalidate — URL 변경은 system_settings 리스너)
+- 아직 한 번도 못 가져왔거나 invalidate된 경우에만 요청 경로에서 갱신 (동시 요청은 한 번만 호출)
+- 갱신 실패 시 마지막으로 성공한 목록을 계속 제공
+- /api/show 결과는 모델 digest 기준으로 캐시 → 같은 이름으로 다시 pull해 digest가 바뀌면 자동 무효화
+"""
+import asyncio
+import logging
+import time
+
+from app.config import settings
+from app.services import ollama_client, system_settings
+
+logger = logging.getLogger(__name__)
+
+_tags: dict | None = None
+_digests: dict[str, str] = {}     # 모델 이름 → digest
+_show: dict[str, dict] = {}       # digest → /api/show 결과
+_state = {"refreshedAt": 0.0, "stale": True, "lastError": None}
+_stats = {"refreshes": 0, "refreshErrors": 0, "showHits": 0, "showMisses": 0}
+_lock: asyncio.Lock | None = None
+
+
+def _get_lock() -> asyncio.Lock:
+    global _lock
+    if _lock is None:
+        _lock = asyncio.Lock()
+    return _lock
+
+
+def _store(data: dict) -> None:
+    global _tags, _digests
+    _tags = data
+    _digests = {
+        m.get("name", ""): m.get("digest", "")
+        for m in data.get("models", []) if m.get("digest")
+    }
+    live = set(_digests.values())
+    for digest in [d for d in _show if d not in live]:
+        del _show[digest]
+    _state.update(refreshedAt=time.time(), stale=False, lastError=None)
+    _stats["refreshes"] += 1
+
+
+async def _refresh_locked() -> dict:
+    try:
+        data = await ollama_client.list_models()
+    except Exception as e:
+        _stats["refreshErrors"] += 1
+        _state["lastError"] = f"{type(e).__name__}: {e}"
+        if _tags is None:
+            raise
+        _state["stale"] = False  # 다음 주기까지는 이전 목록 사용 (요청마다 재시도하지 않음)
+        logger.warning(f"Model catalog refresh failed, serving previous list: {_state['lastError']}")
+        return _tags
+    _store(data)
+    return data
+
+
+async def refresh() -> dict:
+    """즉시 갱신 (pull 완료 후 등)"""
+    async with _get_lock():
+        return await _refresh_locked()
+
+
+def invalidate() -> None:
+    """다음 조회 때 다시 가져오도록 표시 (Ollama URL 변경 시)"""
+    _state["stale"] = True
+
+
+system_settings.on_change(lambda changed: "ollama_base_url" in changed and invalidate())
+
+
+async def get_tags() -> dict:
+    """/api/tags 형식의 모델 목록. Ollama에 한 번도 연결하지 못했으면 예외."""
+    if _tags is not None and not _state["stale"]:
+        return _tags
+    async with _get_lock():
+        if _tags is not None and not _state["stale"]:
+            return _tags  # 대기하는 동안 다른 요청이 갱신함
+        return await _refresh_locked()
+
+
+async def get_show(name: str) -> dict:
+    """/api/show 결과. 카탈로그에 있는 모델은 digest 기준으로 캐시."""
+    digest = _digests.get(name) or _digests.get(f"{name}:latest")
+    if digest and digest in _show:
+        _stats["showHits"] += 1
+        return _show[digest]
+    _stats["showMisses"] += 1
+    result = await ollama_client.show_model(name)
+    if digest:
+        _show[digest] = result
+    return result
+
+
+async def refresh_job() -> None:
+    """워커별 백그라운드 갱신 (lifespan에서 시작, 리더 여부와 무관)"""
+    while True:
+        try:
+            await refresh()
+        except Exception as e:
+            logger.debug(f"Model catalog refresh failed: {type(e).__name__}: {e}")
+        await asyncio.sleep(settings.MODEL_CATALOG_REFRESH_SECONDS)
+
+
+def stats() -> dict:
+    return {
+        **_stats,
+        "models": len((_tags or {}).get("models", [])),
+        "showCached": len(_show),
+        "ageSeconds": round(time.time() - _state["refreshedAt"], 1) if _state["refreshedAt"] else None,
+        "lastError": _state["lastError"],
+    }
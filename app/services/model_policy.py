@@ -0,0 +1,246 @@
+"""
+모델 VRAM 정책 엔진 — 사용량 기반 keep_alive / 사전 로드 / 언로드
+- 통계는 usage_model_hourly 롤업(모든 워커가 기록하는 모델×시간 요청 수)에서 리더가 읽어 옴
+  → 워커 수와 무관하게 전체 트래픽 기준 (워커별 메모리 집계는 쓰지 않음)
+- 요청마다 keep_alive_for(model)로 모델 등급(hot/warm/cold)에 맞는 keep_alive 사용
+  등급은 리더가 계산해 게시(publish_state의 modelPolicy.tiers)하고, 팔로워는 tiers_job이 주기적으로 받아 씀
+- 리더 싱글톤 작업(policy_job)이:
+    · TIER_REFRESH_SECONDS마다 롤업을 다시 읽어 등급 계산 + 게시
+    · MODEL_POLICY_INTERVAL마다 다음 시간대가 평소 피크인 모델을 미리 로드 (warmup),
+      유휴 상태로 VRAM을 차지하는 모델을 keep_alive: 0 으로 언로드
+      (관찰 기간에 게이트웨이 사용 기록이 없는 모델 — 다른 클라이언트가 직접 올린 모델 — 은 언로드하지 않음)
+- 결정 내역은 /api/admin/models/policy 에서 확인 (팔로워 워커는 리더가 게시한 내역을 반환)
+
+등급:
+  hot  → 최근 1시간 내 사용 + 최근 24시간 요청 비중 10% 이상, 또는 곧 피크 → OLLAMA_KEEP_ALIVE
+  warm → 최근 24시간 내 사용 (DEFAULT_MODEL은 최소 warm) → OLLAMA_KEEP_ALIVE_WARM
+  cold → 그 외 → OLLAMA_KEEP_ALIVE_COLD
+  아직 리더의 등급을 받지 못한 워커(시작 직후)는 warm으로 취급 — 리더가 정한 긴 keep_alive를 짧게 덮어쓰지 않도록
+
+마지막 사용 시각: 롤업은 시간 단위이므로, 리더가 읽을 때마다 현재 시간대 요청 수가 늘었으면 "지금 사용됨"으로 기록
+(정밀도 TIER_REFRESH_SECONDS + ROLLUP_FLUSH_SECONDS), 지난 시간대만 있으면 그 시간대의 끝으로 간주.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+HOT_SHARE = 0.1
+TIER_REFRESH_SECONDS = 60
+FOLLOW_SECONDS = 15
+
+_hourly: dict[str, dict[int, int]] = {}  # model → {epoch_hour: count} (리더: 롤업에서 읽은 전체 워커 합계)
+_last_used: dict[str, float] = {}
+_observed: dict[str, tuple[int, int]] = {}  # model → (현재 시간대, 마지막으로 본 요청 수)
+_tiers: dict[str, str] | None = None  # 리더가 계산한 등급 (None: 아직 없음)
+_decisions: deque = deque(maxlen=100)
+
+
+def record_usage(model: str, ts: float | None = None) -> None:
+    """사용 스트림 훅: 이 워커의 마지막 사용 시각만 기록 (요청 수는 롤업에서 집계)"""
+    if not model:
+        return
+    ts = ts or time.time()
+    if ts > _last_used.get(model, 0):
+        _last_used[model] = ts
+
+
+def _epoch_hour(hour: str) -> int:
+    return int(datetime.strptime(hour, "%Y-%m-%d %H:00").replace(tzinfo=timezone.utc).timestamp() // 3600)
+
+
+def _load_rollups(now: float) -> int:
+    """usage_model_hourly에서 관찰 기간 통계를 다시 읽음 (동기 — 스레드에서 호출). 읽은 행 수 반환"""
+    from app.services import rollups
+
+    global _hourly
+    since = datetime.fromtimestamp(now - settings.MODEL_POLICY_WINDOW_HOURS * 3600, timezone.utc)
+    rows = rollups.model_hours(since.strftime("%Y-%m-%d %H:00"))
+    hourly: dict[str, dict[int, int]] = {}
+    for row in rows:
+        count = row["requests"] - row["errors"]
+        if row["model"] and count > 0:
+            hourly.setdefault(row["model"], {})[_epoch_hour(row["hour"])] = count
+
+    current = int(now // 3600)
+    for model, buckets in hourly.items():
+        latest = max(buckets)
+        if latest == current:
+            seen_hour, seen_count = _observed.get(model, (current, 0))
+            if seen_hour != current or buckets[current] > seen_count:
+                _last_used[model] = max(_last_used.get(model, 0), now)
+            _observed[model] = (current, buckets[current])
+        else:
+            _last_used[model] = max(_last_used.get(model, 0), min((latest + 1) * 3600, now))
+    _hourly = hourly
+    return len(rows)
+
+
+def _count_since(model: str, since_hour: int) -> int:
+    return sum(c for h, c in _hourly.get(model, {}).items() if h >= since_hour)
+
+
+def expected_next_hour(model: str, now: float | None = None) -> float:
+    """다음 시간대(UTC 시)의 일평균 요청 수 — 관찰 기간의 같은 시각 요청 수 평균"""
+    now = now or time.time()
+    current = int(now // 3600)
+    target_hod = (current + 1) % 24
+    days = max(settings.MODEL_POLICY_WINDOW_HOURS // 24, 1)
+    total = sum(c for h, c in _hourly.get(model, {}).items() if h % 24 == target_hod and h < current)
+    return total / days
+
+
+def tier(model: str, now: float | None = None) -> str:
+    """롤업 통계 기준 등급 계산 (리더)"""
+    now = now or time.time()
+    day_ago = int(now // 3600) - 24
+    recent = _count_since(model, day_ago)
+    total = sum(_count_since(m, day_ago) for m in _hourly)
+    last = _last_used.get(model, 0)
+
+    if recent and now - last <= 3600 and recent / max(total, 1) >= HOT_SHARE:
+        return "hot"
+    if expected_next_hour(model, now) >= settings.MODEL_POLICY_PRELOAD_MIN_REQUESTS:
+        return "hot"
+    if recent or model == settings.DEFAULT_MODEL:
+        return "warm"
+    return "cold"
+
+
+def current_tier(model: str) -> str:
+    """요청 경로용 등급 (리더가 계산한 값 조회만 — I/O·계산 없음)"""
+    if _tiers is None:
+        return "warm"
+    return _tiers.get(model) or ("warm" if model == settings.DEFAULT_MODEL else "cold")
+
+
+def keep_alive_for(model: str) -> str:
+    """요청 payload에 넣을 keep_alive"""
+    if not settings.MODEL_POLICY_ENABLED:
+        return settings.OLLAMA_KEEP_ALIVE
+    return {
+        "hot": settings.OLLAMA_KEEP_ALIVE,
+        "warm": settings.OLLAMA_KEEP_ALIVE_WARM,
+        "cold": settings.OLLAMA_KEEP_ALIVE_COLD,
+    }[current_tier(model)]
+
+
+def _compute_tiers(now: float) -> dict[str, str]:
+    return {model: tier(model, now) for model in set(_hourly) | {settings.DEFAULT_MODEL}}
+
+
+def evaluate(loaded: set[str], now: float | None = None) -> list[dict]:
+    """현재 로드된 모델 목록을 받아 preload/unload 결정 목록을 반환 (I/O 없음)"""
+    now = now or time.time()
+    decisions = []
+    idle_limit = settings.MODEL_POLICY_IDLE_MINUTES * 60
+
+    for model in _hourly:
+        expected = expected_next_hour(model, now)
+        if model not in loaded and expected >= settings.MODEL_POLICY_PRELOAD_MIN_REQUESTS:
+            decisions.append({
+                "action": "preload",
+                "model": model,
+                "reason": f"expected {expected:.1f} req in next hour",
+            })
+
+    for model in loaded:
+        if model == settings.DEFAULT_MODEL or model not in _hourly:
+            continue  # 게이트웨이 사용 기록이 없는 모델은 다른 클라이언트 것일 수 있음
+        idle = now - _last_used.get(model, 0)
+        if idle < idle_limit:
+            continue
+        if expected_next_hour(model, now) >= settings.MODEL_POLICY_PRELOAD_MIN_REQUESTS:
+            continue
+        decisions.append({
+            "action": "unload",
+            "model": model,
+            "reason": f"idle {int(idle // 60)}m",
+        })
+    return decisions
+
+
+def snapshot() -> dict:
+    now = time.time()
+    day_ago = int(now // 3600) - 24
+    models = []
+    for model in sorted(set(_hourly) | {settings.DEFAULT_MODEL}):
+        last = _last_used.get(model)
+        models.append({
+            "model": model,
+            "tier": current_tier(model),
+            "keepAlive": keep_alive_for(model),
+            "requests24h": _count_since(model, day_ago),
+            "expectedNextHour": round(expected_next_hour(model, now), 2),
+            "lastUsed": datetime.fromtimestamp(last, timezone.utc).isoformat() if last else None,
+        })
+    return {"models": models, "tiers": dict(_tiers or {}), "decisions": list(_decisions)}
+
+
+async def _apply(decision: dict) -> None:
+    from app.services import ollama_client
+
+    if decision["action"] == "preload":
+        ok = await ollama_client.warmup(decision["model"], keep_alive=settings.OLLAMA_KEEP_ALIVE)
+    else:
+        ok = await ollama_client.unload(decision["model"])
+    decision["ok"] = ok
+    decision["at"] = datetime.now(timezone.utc).isoformat()
+    _decisions.appendleft(decision)
+    logger.info(f"Model policy: {decision['action']} {decision['model']} ({decision['reason']}) ok={ok}")
+
+
+async def _refresh(now: float) -> bool:
+    global _tiers
+    try:
+        await asyncio.to_thread(_load_rollups, now)
+    except Exception as e:
+        logger.warning(f"Model policy rollup load failed: {type(e).__name__}: {e}")
+        return False
+    _tiers = _compute_tiers(now)
+    return True
+
+
+async def policy_job() -> None:
+    """리더 싱글톤 작업: 등급 갱신/게시 + 주기적으로 preload/unload 결정 및 적용"""
+    from app.services import leader, ollama_client
+
+    if not settings.MODEL_POLICY_ENABLED:
+        return
+    last_evaluate = time.monotonic()
+    while True:
+        ok = await _refresh(time.time())
+        if ok and time.monotonic() - last_evaluate >= settings.MODEL_POLICY_INTERVAL:
+            last_evaluate = time.monotonic()
+            try:
+                running = await ollama_client.list_running()
+                loaded = {m.get("name") or m.get("model", "") for m in running.get("models", [])}
+            except Exception:
+                loaded = None
+            if loaded is not None:
+                for decision in evaluate(loaded):
+                    await _apply(decision)
+        if ok:
+            leader.publish_state(modelPolicy=snapshot())
+        await asyncio.sleep(min(TIER_REFRESH_SECONDS, settings.MODEL_POLICY_INTERVAL))
+
+
+async def tiers_job() -> None:
+    """워커별 작업 (lifespan에서 시작): 팔로워는 리더가 게시한 등급/통계를 받아 씀"""
+    from app.services import leader
+
+    global _tiers
+    if not settings.MODEL_POLICY_ENABLED:
+        return
+    while True:
+        if not leader.is_leader():
+            state = await asyncio.to_thread(leader.read_state)
+            published = (state or {}).get("modelPolicy") or {}
+            if "tiers" in published:
+                _tiers = published["tiers"]
+        await asyncio.sleep(FOLLOW_SECONDS)
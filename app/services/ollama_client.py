@@ -1,36 +1,23 @@
+import json
+
 import httpx
 
 from app.config import settings
+from app.services import model_policy, options_policy, priority, system_settings, timing
 
 _client: httpx.AsyncClient | None = None
 
 
-def _get_ollama_base_url() -> str:
-    """DB에서 Ollama URL을 가져옵니다. Redis 캐시 우선, 없으면 config 기본값 사용"""
-    from app.services import cache
-
-    cached = cache.get_cached_ollama_url()
-    if cached:
-        return cached
-
-    try:
-        from app.database import pb
-        results = pb.collection("system_settings").get_list(1, 1, {"filter": 'key="ollama_base_url"'})
-        if results.items:
-            url = getattr(results.items[0], "value", settings.OLLAMA_BASE_URL)
-            cache.set_cached_ollama_url(url)
-            return url
-    except Exception:
-        pass
-    return settings.OLLAMA_BASE_URL
+def base_url() -> str:
+    """system_settings 스냅샷의 Ollama URL (없으면 config 기본값). PocketBase 조회 없음"""
+    return system_settings.get("ollama_base_url") or settings.OLLAMA_BASE_URL
 
 
 def get_client() -> httpx.AsyncClient:
     global _client
     if _client is None or _client.is_closed:
-        base_url = _get_ollama_base_url()
         _client = httpx.AsyncClient(
-            base_url=base_url,
+            base_url=base_url(),
             timeout=httpx.Timeout(connect=5.0, read=300.0, write=30.0, pool=10.0),
         )
     return _client
@@ -52,75 +39,144 @@ def reset_client() -> None:
     _client = None
 
 
+def _on_settings_change(changed: dict) -> None:
+    """Ollama URL이 바뀌면 다음 요청에서 새 URL로 클라이언트 재생성"""
+    if "ollama_base_url" in changed:
+        reset_client()
+
+
+system_settings.on_change(_on_settings_change)
+
+
 async def chat(payload: dict) -> dict:
     if "keep_alive" not in payload:
-        payload["keep_alive"] = settings.OLLAMA_KEEP_ALIVE
+        payload["keep_alive"] = model_policy.keep_alive_for(payload.get("model", ""))
     client = get_client()
-    resp = await client.post("/api/chat", json=payload)
+    with priority.track(), timing.span("upstream"):
+        resp = await client.post("/api/chat", json=payload)
     resp.raise_for_status()
     return resp.json()
 
 
-async def chat_stream(payload: dict):
-    """Ollama /api/chat를 NDJSON 스트리밍으로 반환하는 async generator.
-    기존 persistent client를 재사용해 TCP 연결 오버헤드 제거."""
-    if "keep_alive" not in payload:
-        payload["keep_alive"] = settings.OLLAMA_KEEP_ALIVE
-    client = get_client()  # persistent client 재사용
-    async with client.stream("POST", "/api/chat", json=payload) as resp:
-        resp.raise_for_status()
-        async for chunk in resp.aiter_bytes():
-            if chunk:
-                yield chunk
+async def open_passthrough(path: str, parts: list, length: int) -> httpx.Response:
+    """본문 조각을 그대로 POST하고 스트리밍 응답을 반환 (호출자가 aclose 책임).
 
+    Content-Length를 직접 지정해 chunked 인코딩 없이 전송, 응답은 압축 없이 받아 aiter_raw로 그대로 중계.
+    """
+    async def body():
+        for part in parts:
+            yield part
 
-async def warmup(model: str | None = None) -> None:
-    """서버 시작 시 기본 모델을 VRAM에 미리 로드. 첫 요청 콜드 스타트 제거."""
+    client = get_client()
+    request = client.build_request(
+        "POST", path, content=body(),
+        headers={
+            "Content-Type": "application/json",
+            "Content-Length": str(length),
+            "Accept-Encoding": "identity",
+        },
+    )
+    with timing.span("upstream"):  # 응답 헤더까지 (본문 중계는 호출자가 "stream"으로 측정)
+        return await client.send(request, stream=True)
+
+
+async def warmup(model: str | None = None, keep_alive: str | None = None) -> bool:
+    """모델을 VRAM에 미리 로드. 서버 시작 시(기본 모델) 및 정책 엔진의 사전 로드에 사용.
+
+    Returns: 워밍업 성공 여부 (실패해도 서버 시작은 계속)
+    """
     target = model or settings.DEFAULT_MODEL
     try:
         client = get_client()
-        await client.post("/api/chat", json={
+        resp = await client.post("/api/chat", json={
             "model": target,
             "messages": [{"role": "user", "content": "hi"}],
             "stream": False,
             "think": False,
-            "keep_alive": settings.OLLAMA_KEEP_ALIVE,
+            "keep_alive": keep_alive or settings.OLLAMA_KEEP_ALIVE,
+            # 실제 요청과 같은 로드 옵션으로 올려야 첫 요청에서 재로드되지 않음
+            "options": options_policy.canonicalize(target, None, 0) or {},
         })
+        return resp.status_code == 200
     except Exception:
-        pass  # 워밍 실패해도 서버 시작은 계속
+        return False
+
+
+async def unload(model: str) -> bool:
+    """keep_alive: 0 으로 모델을 VRAM에서 즉시 내림"""
+    try:
+        client = get_client()
+        resp = await client.post("/api/generate", json={"model": model, "keep_alive": 0})
+        return resp.status_code == 200
+    except Exception:
+        return False
+
+
+async def list_running() -> dict:
+    """현재 VRAM에 로드된 모델 (/api/ps)"""
+    client = get_client()
+    resp = await client.get("/api/ps")
+    resp.raise_for_status()
+    return resp.json()
 
 
 async def list_models() -> dict:
     client = get_client()
-    resp = await client.get("/api/tags")
+    with timing.span("upstream"):
+        resp = await client.get("/api/tags")
     resp.raise_for_status()
     return resp.json()
 
 
 async def generate(payload: dict) -> dict:
     if "keep_alive" not in payload:
-        payload["keep_alive"] = settings.OLLAMA_KEEP_ALIVE
+        payload["keep_alive"] = model_policy.keep_alive_for(payload.get("model", ""))
     client = get_client()
-    resp = await client.post("/api/generate", json=payload)
+    with priority.track(), timing.span("upstream"):
+        resp = await client.post("/api/generate", json=payload)
     resp.raise_for_status()
     return resp.json()
 
 
-async def show_model(name: str) -> dict:
+async def embed(payload: dict) -> dict:
+    """Ollama /api/embed — input은 문자열 또는 문자열 리스트"""
+    if "keep_alive" not in payload:
+        payload["keep_alive"] = model_policy.keep_alive_for(payload.get("model", ""))
     client = get_client()
-    resp = await client.post("/api/show", json={"name": name})
+    with priority.track(), timing.span("upstream"):
+        resp = await client.post("/api/embed", json=payload)
     resp.raise_for_status()
     return resp.json()
 
 
-async def pull_model(name: str) -> dict:
+async def show_model(name: str) -> dict:
     client = get_client()
-    # stream=false returns once when pull is completed
-    resp = await client.post("/api/pull", json={"name": name, "stream": False})
+    with timing.span("upstream"):
+        resp = await client.post("/api/show", json={"name": name})
     resp.raise_for_status()
     return resp.json()
 
 
+async def pull_stream(name: str, base_url: str | None = None):
+    """Ollama /api/pull 진행 상황(NDJSON)을 dict로 순차 반환하는 async generator.
+    base_url이 현재 Ollama와 다르면 해당 백엔드에 별도 연결로 pull."""
+    shared = get_client()
+    if base_url and base_url.rstrip("/") != str(shared.base_url).rstrip("/"):
+        client = httpx.AsyncClient(base_url=base_url, timeout=shared.timeout)
+    else:
+        client = shared
+    try:
+        # 레이어 다운로드 중에는 진행률 줄이 계속 오므로 read 타임아웃은 줄 사이 간격에만 적용됨
+        async with client.stream("POST", "/api/pull", json={"model": name, "stream": True}) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if line.strip():
+                    yield json.loads(line)
+    finally:
+        if client is not shared:
+            await client.aclose()
+
+
 async def health_check() -> bool:
     try:
         client = get_client()
@@ -1,68 +1,157 @@
 """
 Ollama 자동 감지 모듈
 백엔드 시작 시 Ollama 서버를 자동으로 찾아 설정합니다.
+
+- 후보 URL을 동시에 프로브하고 가장 먼저 응답한 URL을 채택 (나머지는 즉시 취소)
+- 게이트웨이/호스트 IP 탐색(subprocess 호출)은 스레드에서 실행해 이벤트 루프를 막지 않음
+- 마지막으로 작동한 URL을 로컬 디스크({DATA_DIR}/ollama_url.json)에 저장해 다음 시작 시 우선 사용
 """
 import asyncio
+import json
+import os
 import socket
+import time
+
 import httpx
 
+from app.config import settings
+
+OLLAMA_PORT = 11434
+
+
+def _cache_path() -> str:
+    return os.path.join(settings.DATA_DIR, "ollama_url.json")
+
+
+def load_cached_url() -> str | None:
+    """디스크에 저장된 마지막 정상 URL"""
+    try:
+        with open(_cache_path(), "r") as f:
+            return json.load(f).get("url") or None
+    except Exception:
+        return None
+
+
+def save_cached_url(url: str) -> None:
+    """정상 URL을 디스크에 원자적으로 저장 (tmp 파일 → rename)"""
+    try:
+        os.makedirs(settings.DATA_DIR, exist_ok=True)
+        tmp = _cache_path() + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"url": url, "detectedAt": time.time()}, f)
+        os.replace(tmp, _cache_path())
+    except Exception as e:
+        print(f"⚠️ Ollama URL 캐시 저장 실패: {e}")
+
 
-async def detect_ollama_url() -> str | None:
+async def detect_ollama_url(extra_candidates: list[str] | None = None) -> str | None:
     """
-    여러 가능한 Ollama URL을 테스트하여 작동하는 URL을 반환합니다.
-
-    테스트 순서:
-    1. http://localhost:11434 (로컬 직접 실행)
-    2. http://127.0.0.1:11434 (로컬 직접 실행)
-    3. http://host.docker.internal:11434 (Docker Desktop)
-    4. http://host.orb.internal:11434 (OrbStack)
-    5. http://[gateway_ip]:11434 (Docker 네트워크 게이트웨이)
-    6. http://[host_ip]:11434 (호스트 머신 IP - Mac/Linux)
+    여러 가능한 Ollama URL을 동시에 테스트하여 가장 먼저 응답한 URL을 반환합니다.
+
+    후보:
+    1. http://localhost:11434, http://127.0.0.1:11434 (로컬 직접 실행)
+    2. http://host.docker.internal:11434 (Docker Desktop)
+    3. http://host.orb.internal:11434 (OrbStack)
+    4. http://[gateway_ip]:11434 (Docker 네트워크 게이트웨이)
+    5. http://[host_ip]:11434 (호스트 머신 IP - Mac/Linux)
+
+    고정 후보는 즉시 프로브를 시작하고, 4~5번은 IP 탐색이 끝나는 대로 합류합니다.
     """
+    candidates = list(dict.fromkeys([
+        *(extra_candidates or []),
+        f"http://localhost:{OLLAMA_PORT}",
+        f"http://127.0.0.1:{OLLAMA_PORT}",
+        f"http://host.docker.internal:{OLLAMA_PORT}",  # Docker Desktop
+        f"http://host.orb.internal:{OLLAMA_PORT}",     # OrbStack
+    ]))
 
-    # 후보 URL 목록
-    candidates = [
-        "http://localhost:11434",
-        "http://127.0.0.1:11434",
-        "http://host.docker.internal:11434",  # Docker Desktop
-        "http://host.orb.internal:11434",     # OrbStack
-    ]
+    print(f"🔍 Ollama 자동 감지 시작... (고정 후보 {len(candidates)}개 + 네트워크 탐색)")
+    started = time.monotonic()
+    url = await _probe_first_success(candidates, discover=True)
+    elapsed = (time.monotonic() - started) * 1000
 
-    # Docker 게이트웨이 IP 추가
-    gateway_ip = _get_docker_gateway_ip()
-    if gateway_ip:
-        candidates.append(f"http://{gateway_ip}:11434")
+    if url:
+        print(f"✅ Ollama 발견: {url} ({elapsed:.0f}ms)")
+    else:
+        print(f"⚠️ Ollama를 찾을 수 없습니다. 기본값 사용 ({elapsed:.0f}ms)")
+    return url
 
-    # 호스트 머신 IP 추가 (Mac/Linux)
-    host_ips = _get_host_ips()
-    for ip in host_ips:
-        if ip not in ["127.0.0.1", "localhost"]:
-            candidates.append(f"http://{ip}:11434")
 
-    print(f"🔍 Ollama 자동 감지 시작... ({len(candidates)}개 후보)")
+async def _probe_first_success(candidates: list[str], discover: bool = False) -> str | None:
+    """후보를 동시에 프로브하여 첫 번째 성공 URL을 반환. 나머지 프로브는 취소."""
+    timeout = settings.OLLAMA_DETECT_TIMEOUT
+    seen: set[str] = set()
+    probes: dict[asyncio.Task, str] = {}
+    discovery: asyncio.Task | None = None
 
-    # 각 URL을 순차적으로 테스트
-    for url in candidates:
-        if await _test_ollama_url(url):
-            print(f"✅ Ollama 발견: {url}")
-            return url
-        else:
-            print(f"   ❌ {url} - 응답 없음")
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        def _launch(urls: list[str]) -> None:
+            for url in urls:
+                if url and url not in seen:
+                    seen.add(url)
+                    probes[asyncio.create_task(_test_ollama_url(url, timeout, client))] = url
 
-    print("⚠️ Ollama를 찾을 수 없습니다. 기본값 사용")
-    return None
+        _launch(candidates)
+        if discover:
+            discovery = asyncio.create_task(asyncio.to_thread(_discover_network_candidates))
+
+        try:
+            while probes or discovery is not None:
+                waiting = set(probes)
+                if discovery is not None:
+                    waiting.add(discovery)
+                done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    if task is discovery:
+                        discovery = None
+                        try:
+                            _launch(task.result())
+                        except Exception:
+                            pass
+                        continue
+                    url = probes.pop(task)
+                    if task.result():
+                        return url
+                    print(f"   ❌ {url} - 응답 없음")
+            return None
+        finally:
+            for task in probes:
+                task.cancel()
+            if discovery is not None:
+                discovery.cancel()
+            if probes:
+                await asyncio.gather(*probes, return_exceptions=True)
 
 
-async def _test_ollama_url(url: str, timeout: float = 2.0) -> bool:
-    """URL이 Ollama 서버인지 테스트"""
+async def _test_ollama_url(
+    url: str, timeout: float = 2.0, client: httpx.AsyncClient | None = None
+) -> bool:
+    """URL이 Ollama 서버인지 테스트 (client를 넘기면 커넥션 풀 공유)"""
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.get(f"{url}/api/tags")
+        if client is not None:
+            response = await client.get(f"{url}/api/tags", timeout=timeout)
+            return response.status_code == 200
+        async with httpx.AsyncClient(timeout=timeout) as own_client:
+            response = await own_client.get(f"{url}/api/tags")
             return response.status_code == 200
     except Exception:
         return False
 
 
+def _discover_network_candidates() -> list[str]:
+    """게이트웨이/호스트 IP 기반 후보 (subprocess 호출 포함 → 스레드에서 실행)"""
+    urls = []
+    gateway_ip = _get_docker_gateway_ip()
+    if gateway_ip:
+        urls.append(f"http://{gateway_ip}:{OLLAMA_PORT}")
+    for ip in _get_host_ips():
+        if ip not in ["127.0.0.1", "localhost"]:
+            host = f"[{ip}]" if ":" in ip else ip  # IPv6
+            urls.append(f"http://{host}:{OLLAMA_PORT}")
+    return urls
+
+
 def _get_docker_gateway_ip() -> str | None:
     """Docker 네트워크 게이트웨이 IP 가져오기"""
     try:
@@ -134,73 +223,58 @@ def _get_host_ips() -> list[str]:
     return ips
 
 
-async def auto_configure_ollama() -> None:
-    """
-    Ollama를 자동으로 감지하고 DB에 저장합니다.
-    백엔드 startup 이벤트에서 호출합니다.
+def _save_db_ollama_url(url: str) -> None:
+    from app.services import system_settings
+
+    system_settings.put("ollama_base_url", url, "자동 감지된 Ollama URL")
+
+
+async def auto_configure_ollama() -> str | None:
     """
-    from app.database import pb
+    Ollama를 자동으로 감지하고 DB와 디스크 캐시에 저장합니다.
+    lifespan 백그라운드 작업에서 호출하므로 PocketBase 호출은 스레드에서 실행합니다.
+
+    1단계: DB 설정값 + 디스크 캐시 URL + 환경변수 기본값을 동시에 프로브 (정상 환경에서는 여기서 끝)
+    2단계: 전체 후보 자동 감지
 
+    Returns: 사용하게 된 URL (감지 실패 시 None)
+    """
     print("\n" + "="*60)
     print("Ollama 자동 구성 시작")
     print("="*60)
 
-    # DB에 이미 설정이 있는지 확인
-    try:
-        results = pb.collection("system_settings").get_list(
-            1, 1, {"filter": 'key="ollama_base_url"'}
-        )
-        if results.items:
-            current_url = getattr(results.items[0], "value", "")
-            print(f"💾 기존 설정 발견: {current_url}")
-
-            # 기존 설정이 작동하는지 테스트
-            if await _test_ollama_url(current_url):
-                print(f"✅ 기존 설정 작동 중: {current_url}")
-                print("="*60 + "\n")
-                return
-            else:
-                print(f"⚠️ 기존 설정 응답 없음: {current_url}")
-                print("   새로운 Ollama 서버를 찾습니다...")
-    except Exception as e:
-        print(f"⚠️ DB 조회 실패: {e}")
+    from app.services import system_settings
 
-    # 자동 감지 실행
-    detected_url = await detect_ollama_url()
+    db_url = system_settings.get("ollama_base_url", "")
+    if db_url:
+        print(f"💾 기존 설정 발견: {db_url}")
 
-    if detected_url:
-        # DB에 저장
-        try:
-            # 기존 설정 업데이트 또는 새로 생성
-            results = pb.collection("system_settings").get_list(
-                1, 1, {"filter": 'key="ollama_base_url"'}
-            )
-
-            if results.items:
-                # 업데이트
-                pb.collection("system_settings").update(results.items[0].id, {
-                    "value": detected_url,
-                    "description": "자동 감지된 Ollama URL",
-                })
-                print(f"💾 DB 업데이트 완료: {detected_url}")
-            else:
-                # 새로 생성
-                pb.collection("system_settings").create({
-                    "key": "ollama_base_url",
-                    "value": detected_url,
-                    "description": "자동 감지된 Ollama URL",
-                })
-                print(f"💾 DB 저장 완료: {detected_url}")
-
-            # 클라이언트 재설정
-            from app.services import ollama_client
-            ollama_client.reset_client()
-            print("🔄 Ollama 클라이언트 재설정 완료")
+    cached_url = load_cached_url()
+    known = [u for u in dict.fromkeys([db_url, cached_url, settings.OLLAMA_BASE_URL]) if u]
 
-        except Exception as e:
-            print(f"❌ DB 저장 실패: {e}")
+    working_url = await _probe_first_success(known) if known else None
+    if working_url:
+        print(f"✅ 기존 설정 작동 중: {working_url}")
     else:
+        if known:
+            print(f"⚠️ 기존 설정 응답 없음: {', '.join(known)}")
+            print("   새로운 Ollama 서버를 찾습니다...")
+        working_url = await detect_ollama_url()
+
+    if not working_url:
         print("⚠️ Ollama를 찾을 수 없습니다.")
-        print("   기본 URL(http://127.0.0.1:11434) 사용")
+        print(f"   기본 URL({settings.OLLAMA_BASE_URL}) 사용")
+        print("="*60 + "\n")
+        return None
+
+    save_cached_url(working_url)
+
+    if working_url != db_url:
+        try:
+            await asyncio.to_thread(_save_db_ollama_url, working_url)
+            print(f"💾 DB 저장 완료: {working_url}")
+        except Exception as e:
+            print(f"❌ DB 저장 실패: {e}")
 
     print("="*60 + "\n")
+    return working_url
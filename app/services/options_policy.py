@@ -0,0 +1,122 @@
+"""
+모델 옵션 정책 — 로드 시점 옵션 정규화로 불필요한 모델 재로드 방지
+Ollama는 num_ctx 등 로드 시점 옵션이 직전 요청과 다르면 모델을 VRAM에서 다시 로드한다.
+클라이언트가 보낸 options를 그대로 전달하면 컨텍스트 크기가 요청마다 달라 재로드가 반복되므로:
+
+- num_ctx → 설정된 버킷(OLLAMA_NUM_CTX_BUCKETS) 중 프롬프트 추정 크기를 담는 가장 작은 값으로 스냅
+- 이미 더 큰 버킷으로 로드돼 있으면(최근 사용) 그 버킷을 재사용 → 줄이느라 재로드하지 않음
+- 가장 큰 버킷보다 큰 num_ctx 요청은 가장 큰 버킷으로 제한 (모델별로 STICKY_SECONDS마다 한 번 경고 로그,
+  numCtxCapped 카운트) — 더 큰 컨텍스트가 필요하면 버킷 설정에 추가
+- 그 외 로드 시점 옵션(num_gpu, num_batch 등)은 제거, 모델별 pin 값이 있으면 그 값으로 고정
+- 샘플링 옵션(temperature, top_p 등)은 그대로 통과
+
+모델별 설정 (OLLAMA_MODEL_OPTIONS, JSON):
+  {"qwen3:8b": {"num_ctx_buckets": [4096, 8192, 16384], "pin": {"num_gpu": 99}}}
+"""
+import logging
+import time
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+LOAD_TIME_OPTIONS = frozenset({
+    "num_ctx", "num_batch", "num_gpu", "main_gpu", "low_vram", "f16_kv", "logits_all",
+    "vocab_only", "use_mmap", "use_mlock", "num_thread", "numa",
+})
+
+CHARS_PER_TOKEN = 3       # 보수적 추정 (한글은 토큰당 글자 수가 적음)
+DEFAULT_HEADROOM = 1024   # num_predict 미지정 시 응답용 여유 토큰
+STICKY_SECONDS = 600      # 이 시간 안에 쓰인 버킷은 유지 (더 작은 버킷으로 재로드하지 않음)
+
+_current: dict[str, tuple[float, dict]] = {}   # model → (마지막 사용 시각, 정규화된 로드 옵션)
+_last_raw: dict[str, dict] = {}                # model → 클라이언트가 보낸 로드 옵션
+_cap_logged: dict[str, float] = {}             # model → 마지막 num_ctx 제한 경고 시각
+_stats = {
+    "requests": 0,
+    "numCtxRewritten": 0,
+    "numCtxCapped": 0,
+    "optionsStripped": 0,
+    "reloadsAvoided": 0,
+    "reloads": 0,
+}
+
+
+def _policy(model: str) -> dict:
+    return settings.OLLAMA_MODEL_OPTIONS.get(model, {})
+
+
+def _buckets(model: str) -> list[int]:
+    return sorted(_policy(model).get("num_ctx_buckets") or settings.OLLAMA_NUM_CTX_BUCKETS)
+
+
+def estimate_tokens(prompt_chars: int, options: dict | None) -> int:
+    num_predict = (options or {}).get("num_predict")
+    headroom = num_predict if isinstance(num_predict, int) and num_predict > 0 else DEFAULT_HEADROOM
+    return prompt_chars // CHARS_PER_TOKEN + headroom
+
+
+def pick_num_ctx(model: str, needed: int, now: float | None = None) -> int:
+    buckets = _buckets(model)
+    now = now or time.time()
+    current = _current.get(model)
+    if current and now - current[0] < STICKY_SECONDS:
+        loaded = current[1].get("num_ctx", 0)
+        if loaded >= needed or loaded == buckets[-1]:
+            return loaded
+    for bucket in buckets:
+        if bucket >= needed:
+            return bucket
+    return buckets[-1]
+
+
+def canonicalize(model: str, options: dict | None, prompt_chars: int) -> dict | None:
+    """요청 options를 정규화해 반환. 정책 비활성 시 원본 그대로."""
+    if not settings.OPTIONS_POLICY_ENABLED:
+        return options
+
+    options = options or {}
+    now = time.time()
+    raw_load = {k: v for k, v in options.items() if k in LOAD_TIME_OPTIONS}
+    result = {k: v for k, v in options.items() if k not in LOAD_TIME_OPTIONS}
+
+    requested_ctx = raw_load.get("num_ctx")
+    needed = estimate_tokens(prompt_chars, options)
+    if isinstance(requested_ctx, int) and requested_ctx > needed:
+        needed = requested_ctx
+    load = {**_policy(model).get("pin", {}), "num_ctx": pick_num_ctx(model, needed, now)}
+    result.update(load)
+
+    _stats["requests"] += 1
+    if requested_ctx != load["num_ctx"]:
+        _stats["numCtxRewritten"] += 1
+    if isinstance(requested_ctx, int) and requested_ctx > load["num_ctx"]:
+        _stats["numCtxCapped"] += 1
+        if now - _cap_logged.get(model, 0) >= STICKY_SECONDS:
+            _cap_logged[model] = now
+            logger.warning(
+                f"num_ctx {requested_ctx} for {model} exceeds the largest bucket, capped to {load['num_ctx']}"
+            )
+    if any(k != "num_ctx" and load.get(k) != v for k, v in raw_load.items()):
+        _stats["optionsStripped"] += 1
+
+    previous = _current.get(model)
+    if previous is not None:
+        if previous[1] != load:
+            _stats["reloads"] += 1
+        elif _last_raw.get(model) != raw_load:
+            # 원본 옵션대로라면 재로드가 일어났을 요청
+            _stats["reloadsAvoided"] += 1
+    _current[model] = (now, load)
+    _last_raw[model] = raw_load
+    return result
+
+
+def stats() -> dict:
+    return {
+        "enabled": settings.OPTIONS_POLICY_ENABLED,
+        "numCtxBuckets": settings.OLLAMA_NUM_CTX_BUCKETS,
+        "modelOptions": settings.OLLAMA_MODEL_OPTIONS,
+        "current": {m: load for m, (_, load) in _current.items()},
+        **_stats,
+    }
@@ -0,0 +1,145 @@
+"""
+PocketBase 키셋(커서) 페이지네이션
+page 번호 방식은 뒤 페이지로 갈수록 OFFSET 비용이 커지고, 목록이 바뀌는 중에는 행이 빠지거나 중복되므로
+(정렬 필드, id) 쌍을 커서로 써서 "마지막으로 본 행 다음"부터 읽습니다.
+
+- 정렬: "{필드},id" (내림차순이면 둘 다 "-") — id를 보조 키로 두어 같은 값이 여러 행이어도 순서가 고정
+- 커서: 마지막 행의 [정렬 필드 값, id]를 JSON → base64url (불투명 문자열로 응답 헤더/쿼리에 그대로 전달)
+- 목록 조회는 pb.send로 원본 JSON을 받음: Record로 변환하면 created가 초 단위로 잘려(밀리초 손실)
+  커서 비교가 같은 초의 행을 다시 읽게 되고, 변환 비용도 없음
+- 총 개수는 세지 않음 (skipTotal) — 다음 커서 유무는 페이지가 꽉 찼는지로 판단
+"""
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Iterator
+
+from app.database import pb
+
+MAX_PAGE_SIZE = 500  # PocketBase perPage 상한
+
+
+def quote(value) -> str:
+    """필터 식에 넣을 값 (문자열은 따옴표/역슬래시 이스케이프)"""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def format_datetime(value: datetime) -> str:
+    """datetime → PocketBase 저장 형식 ("YYYY-MM-DD HH:MM:SS.mmmZ", UTC). 시간대가 없으면 UTC로 간주"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3] + "Z"
+
+
+def encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    """커서 문자열 → [정렬 필드 값, id]. 형식이 잘못되면 ValueError"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("invalid cursor")
+    if not isinstance(values, list) or len(values) != 2 or not isinstance(values[1], str):
+        raise ValueError("invalid cursor")
+    return values
+
+
+def after_filter(sort_field: str, descending: bool, cursor_values: list) -> str:
+    """커서 다음 행 조건: (필드 > 값) || (필드 = 값 && id > 마지막 id) — 내림차순이면 <"""
+    value, last_id = cursor_values
+    op = "<" if descending else ">"
+    if sort_field == "id":
+        return f"id{op}{quote(last_id)}"
+    return f"({sort_field}{op}{quote(value)} || ({sort_field}={quote(value)} && id{op}{quote(last_id)}))"
+
+
+def parse_sort(sort: str, allowed: tuple[str, ...]) -> tuple[str, bool]:
+    """"-created" → ("created", True). 허용 목록 밖의 필드는 ValueError"""
+    descending = sort.startswith("-")
+    field = sort.lstrip("+-")
+    if field not in allowed:
+        raise ValueError(f"sort must be one of: {', '.join(allowed)} (prefix - for descending)")
+    return field, descending
+
+
+def join_filters(*conditions: str) -> str:
+    return " && ".join(f"({c})" for c in conditions if c)
+
+
+def fetch_page(
+    collection: str,
+    filter: str = "",
+    sort_field: str = "created",
+    descending: bool = False,
+    limit: int = 200,
+    cursor: str | None = None,
+    fields: str = "",
+) -> tuple[list[dict], str | None]:
+    """한 페이지 조회 → (원본 레코드 dict 목록, 다음 커서 또는 None). 잘못된 커서는 ValueError"""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    conditions = [filter]
+    if cursor:
+        conditions.append(after_filter(sort_field, descending, decode_cursor(cursor)))
+    sign = "-" if descending else ""
+    params = {
+        "page": 1,
+        "perPage": limit,
+        "sort": f"{sign}{sort_field},{sign}id" if sort_field != "id" else f"{sign}id",
+        "skipTotal": 1,
+    }
+    combined = join_filters(*conditions)
+    if combined:
+        params["filter"] = combined
+    if fields:
+        params["fields"] = fields
+    data = pb.send(f"/api/collections/{collection}/records", {"method": "GET", "params": params})
+    items = data.get("items") or []
+    next_cursor = None
+    if len(items) == limit:
+        last = items[-1]
+        next_cursor = encode_cursor([last.get(sort_field), last["id"]])
+    return items, next_cursor
+
+
+def fetch_by_ids(collection: str, ids, fields: str = "", chunk: int = 50) -> dict[str, dict]:
+    """id 목록 → {id: 원본 레코드} — id="a" || id="b" 필터로 묶어서 조회 (관계 필드 일괄 확장용, 행마다 조회하지 않음)"""
+    unique = sorted({i for i in ids if i})
+    found: dict[str, dict] = {}
+    for offset in range(0, len(unique), chunk):
+        batch = unique[offset:offset + chunk]
+        params = {
+            "page": 1,
+            "perPage": len(batch),
+            "filter": " || ".join(f"id={quote(i)}" for i in batch),
+            "skipTotal": 1,
+        }
+        if fields:
+            params["fields"] = fields
+        data = pb.send(f"/api/collections/{collection}/records", {"method": "GET", "params": params})
+        for item in data.get("items") or []:
+            found[item["id"]] = item
+    return found
+
+
+def iter_pages(
+    collection: str,
+    filter: str = "",
+    sort_field: str = "created",
+    descending: bool = False,
+    page_size: int = MAX_PAGE_SIZE,
+    cursor: str | None = None,
+) -> Iterator[list[dict]]:
+    """전체 결과를 페이지 단위로 반환 (한 번에 한 페이지만 메모리에 유지)"""
+    while True:
+        items, cursor = fetch_page(collection, filter, sort_field, descending, page_size, cursor)
+        if items:
+            yield items
+        if cursor is None:
+            return
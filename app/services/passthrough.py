@@ -0,0 +1,205 @@
+"""
+Ollama 네이티브 엔드포인트 패스스루
+요청 본문을 파싱/재직렬화하지 않고 원본 바이트 그대로 Ollama에 전달합니다.
+멀티 MB 이미지(base64)나 tools/format 등 게이트웨이가 모르는 필드가 있어도 손실·복사 없이 통과.
+
+- scan(): 문자열/괄호 토큰만 훑어 최상위 키의 값 위치만 찾음 (model, stream, options 등)
+  문자열 내부는 bytes.find로 닫는 따옴표까지 건너뛰므로 멀티 MB 이미지도 비용이 작음
+- rewrite(): 게이트웨이가 정해야 하는 값(model 기본값, keep_alive, 정규화된 options)만
+  앞에 끼워 넣거나 해당 구간만 교체 → 나머지는 memoryview 조각으로 그대로 전송
+- NdjsonFramer: 응답 바이트를 그대로 흘려보내면서 마지막 done 객체에서 토큰 수만 추출
+"""
+import json
+import re
+
+# 문자열 밖의 구조 문자. 문자열 내부는 bytes.find로 닫는 따옴표까지 건너뜀 (긴 base64도 memchr 속도)
+_STRUCT = re.compile(rb'["{}\[\]]')
+_COLON = re.compile(rb"\s*:\s*")
+_DONE = re.compile(rb'"done"\s*:\s*true')
+
+
+class ScanResult:
+    __slots__ = ("fields", "open_at", "close_at", "image_bytes")
+
+    def __init__(self):
+        self.fields: dict[str, tuple[int, int]] = {}   # 최상위 키 → 값의 (시작, 끝) 오프셋
+        self.open_at = -1                              # 최상위 '{' 위치
+        self.close_at = -1                             # 최상위 '}' 위치
+        self.image_bytes = 0                           # images 배열 안 문자열 바이트 합
+
+    def raw(self, body: bytes, key: str) -> bytes | None:
+        span = self.fields.get(key)
+        return body[span[0]:span[1]] if span else None
+
+    def value(self, body: bytes, key: str, default=None):
+        """작은 값(model, stream, options 등)만 json으로 해석"""
+        raw = self.raw(body, key)
+        if raw is None:
+            return default
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return default
+
+
+def scan(body: bytes) -> ScanResult:
+    """JSON 객체 본문의 최상위 키 위치를 찾음. 객체가 아니면 ValueError.
+
+    완전한 JSON 검증은 하지 않음 (잘못된 본문은 Ollama가 400으로 거절).
+    """
+    result = ScanResult()
+    depth = 0
+    pending: tuple[str, int] | None = None   # 값 끝을 아직 모르는 최상위 키
+    images_depth = 0                         # images 배열 안이면 그 배열의 깊이
+
+    pos = 0
+    while True:
+        m = _STRUCT.search(body, pos)
+        if m is None:
+            break
+        start = m.start()
+        c = body[start]
+        if c == 0x22:  # '"'
+            end = _string_end(body, start)
+            pos = end
+            colon = _COLON.match(body, end)
+            if colon:
+                if depth == 1:
+                    if pending:
+                        result.fields[pending[0]] = (pending[1], _value_end(body, pending[1], start))
+                    key = body[start + 1:end - 1].decode("utf-8", "replace")
+                    pending = (key, colon.end())
+                if body[start:end] == b'"images"':
+                    # 값이 배열일 때만 (null 등이면 다음 키의 배열을 images로 오인하지 않도록 여기서 확정)
+                    images_depth = depth + 1 if body[colon.end():colon.end() + 1] == b"[" else 0
+            elif images_depth and depth == images_depth:
+                result.image_bytes += end - start
+            continue
+        pos = start + 1
+        if c in (0x7B, 0x5B):  # '{' '['
+            depth += 1
+            if depth == 1:
+                if result.open_at >= 0:
+                    raise ValueError("multiple top-level values")
+                result.open_at = start
+        else:  # '}' ']'
+            if images_depth and depth == images_depth:
+                images_depth = 0
+            depth -= 1
+            if depth == 0:
+                result.close_at = start
+                if pending:
+                    result.fields[pending[0]] = (pending[1], _value_end(body, pending[1], start, last=True))
+                    pending = None
+            elif depth < 0:
+                raise ValueError("unbalanced brackets")
+
+    if result.open_at < 0 or result.close_at < 0 or body[result.open_at] != 0x7B:
+        raise ValueError("request body must be a JSON object")
+    return result
+
+
+def _string_end(body: bytes, start: int) -> int:
+    """start의 여는 따옴표에 대응하는 닫는 따옴표 다음 위치"""
+    pos = start + 1
+    while True:
+        quote = body.find(b'"', pos)
+        if quote < 0:
+            raise ValueError("unterminated string")
+        backslashes = 0
+        while body[quote - 1 - backslashes] == 0x5C:  # '\\'
+            backslashes += 1
+        if backslashes % 2 == 0:
+            return quote + 1
+        pos = quote + 1
+
+
+def _value_end(body: bytes, value_start: int, next_token: int, last: bool = False) -> int:
+    """다음 최상위 키 직전의 구분 콤마(마지막 키면 닫는 '}') 앞까지가 값"""
+    end = next_token if last else body.rfind(b",", value_start, next_token)
+    while end > value_start and body[end - 1] in b" \t\r\n":
+        end -= 1
+    return end
+
+
+def rewrite(body: bytes, result: ScanResult, inject: dict, replace: dict) -> tuple[list, int]:
+    """본문을 (조각 목록, 전체 길이)로 재구성. 원본은 복사하지 않고 memoryview로 참조.
+
+    inject: 본문에 없는 키를 맨 앞에 추가
+    replace: 이미 있는 최상위 키의 값 구간만 교체
+    """
+    view = memoryview(body)
+    parts: list = []
+    pos = 0
+
+    inject = {k: v for k, v in inject.items() if k not in result.fields}
+    if inject:
+        prefix = json.dumps(inject, ensure_ascii=False, separators=(",", ":"))[:-1]
+        empty = not result.fields
+        parts.append((prefix + ("" if empty else ",")).encode())
+        pos = result.open_at + 1
+
+    for start, end, value in sorted(
+        (*result.fields[k], v) for k, v in replace.items() if k in result.fields
+    ):
+        if start > pos:
+            parts.append(view[pos:start])
+        parts.append(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode())
+        pos = end
+    parts.append(view[pos:])
+    return parts, sum(len(p) for p in parts)
+
+
+class NdjsonFramer:
+    """업스트림 응답 조각을 받아 줄 단위로 나누고 done 객체의 토큰 수를 기록.
+
+    스트리밍(NDJSON)과 비스트리밍(단일 JSON) 응답 모두 처리.
+    done 표시가 없는 줄은 파싱하지 않고, 미완성 마지막 줄만 버퍼에 남김.
+    """
+
+    def __init__(self):
+        self._pending: list[bytes] = []   # 개행 전까지의 조각 (큰 단일 JSON 응답도 한 번만 합침)
+        self.final: dict | None = None
+        self.error: str | None = None
+
+    def feed(self, chunk: bytes) -> None:
+        cut = chunk.rfind(b"\n")
+        if cut < 0:
+            self._pending.append(chunk)
+            return
+        if self._pending:
+            self._pending.append(chunk[:cut])
+            complete = b"".join(self._pending)
+        else:
+            complete = chunk[:cut]
+        self._pending = [chunk[cut + 1:]] if cut + 1 < len(chunk) else []
+        if _DONE.search(complete) or b'"error"' in complete:
+            for line in complete.split(b"\n"):
+                self._inspect(line)
+
+    def close(self) -> None:
+        if self._pending:
+            self._inspect(b"".join(self._pending))
+            self._pending = []
+
+    def _inspect(self, line: bytes) -> None:
+        if not _DONE.search(line) and b'"error"' not in line:
+            return
+        try:
+            obj = json.loads(line)
+        except ValueError:
+            return
+        if not isinstance(obj, dict):
+            return
+        if obj.get("done"):
+            self.final = obj
+        elif obj.get("error"):
+            self.error = str(obj["error"])
+
+    @property
+    def prompt_tokens(self) -> int:
+        return (self.final or {}).get("prompt_eval_count", 0) or 0
+
+    @property
+    def completion_tokens(self) -> int:
+        return (self.final or {}).get("eval_count", 0) or 0
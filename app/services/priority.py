@@ -0,0 +1,105 @@
+"""
+Ollama 요청 우선순위
+- 대화형 요청(API 라우트)은 ollama_client 호출 동안 진행 중 카운트에 잡힘
+- 백그라운드 작업(배치 등)은 background() 컨텍스트 안에서 Ollama를 호출하고,
+  호출 전에 wait_for_turn()으로 대화형 요청이 빠질 때까지 양보 → 가장 낮은 우선순위
+
+카운트는 워커(프로세스) 단위로 세고, REDIS_URL이 있으면 share_job이 워커별 값을 Redis에 게시
+→ wait_for_turn은 이 워커 + 다른 워커(호스트 포함)의 대화형 요청을 합쳐서 판단 (배치는 리더 워커에서만 돌기 때문)
+- 다른 워커 값은 background() 구간(배치 처리 중)이 있는 동안에만 SHARE_INTERVAL마다 읽음 (최대 그만큼 늦게 반영)
+- Redis가 없으면 워커 단위로만 판단 — 리더 워커로 들어온 대화형 요청에만 양보
+"""
+import asyncio
+import contextvars
+from contextlib import contextmanager
+
+from app.services import cache, leader
+
+SHARE_INTERVAL = 0.25
+SHARE_TTL = 3
+
+_background = contextvars.ContextVar("ollama_background", default=False)
+_interactive = 0
+_others = 0   # 다른 워커의 대화형 요청 수 (마지막으로 읽은 값)
+_background_active = 0  # 열려 있는 background() 구간 수
+
+
+def is_background() -> bool:
+    return _background.get()
+
+
+def interactive_count() -> int:
+    return _interactive
+
+
+def cluster_interactive_count() -> int:
+    """이 워커 + 다른 워커(Redis 공유 시)의 대화형 요청 수"""
+    return _interactive + _others
+
+
+@contextmanager
+def track():
+    """ollama_client 호출 구간 표시. 백그라운드 컨텍스트면 카운트하지 않음."""
+    global _interactive
+    if _background.get():
+        yield
+        return
+    _interactive += 1
+    try:
+        yield
+    finally:
+        _interactive -= 1
+
+
+@contextmanager
+def background():
+    """이 컨텍스트(및 여기서 만든 태스크)의 Ollama 호출을 백그라운드 우선순위로 표시"""
+    global _background_active
+    token = _background.set(True)
+    _background_active += 1
+    try:
+        yield
+    finally:
+        _background_active -= 1
+        _background.reset(token)
+
+
+async def wait_for_turn(max_interactive: int = 0, poll: float = 0.05, max_wait: float = 30.0) -> None:
+    """대화형 요청이 max_interactive 이하가 될 때까지 대기 (기아 방지를 위해 최대 max_wait초)"""
+    waited = 0.0
+    while _interactive + _others > max_interactive and waited < max_wait:
+        await asyncio.sleep(poll)
+        waited += poll
+
+
+def _exchange(count: int | None, read_others: bool) -> int:
+    """이 워커 값 게시(count가 있으면) + 다른 워커 값 합계 읽기 (동기 Redis 호출 — 스레드에서)"""
+    own = cache.key_interactive(leader.owner_id())
+    if count is not None:
+        cache.set(own, count, ttl=SHARE_TTL)
+    if not read_others:
+        return 0
+    values = cache.get_pattern(cache.key_interactive("*"))
+    return sum(int(v) for k, v in values.items() if k != own)
+
+
+async def share_job() -> None:
+    """워커별 백그라운드 작업 (lifespan에서 시작): 대화형 요청 수를 Redis로 공유. Redis가 없으면 바로 종료"""
+    global _others
+    if not await asyncio.to_thread(cache.enabled):
+        return
+    published = None
+    last_publish = 0.0
+    loop = asyncio.get_running_loop()
+    while True:
+        now = loop.time()
+        # 값이 바뀌었거나 TTL 만료 전이면 게시 (요청이 없는 워커는 1초에 한 번만)
+        count = _interactive if _interactive != published or now - last_publish >= 1.0 else None
+        try:
+            others = await asyncio.to_thread(_exchange, count, _background_active > 0)
+        except Exception:
+            others = 0
+        if count is not None:
+            published, last_publish = count, now
+        _others = others
+        await asyncio.sleep(SHARE_INTERVAL)
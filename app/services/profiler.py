@@ -0,0 +1,187 @@
+"""
+운영 중 샘플링 프로파일러 (관리자 전용, /api/admin/profile)
+부하 상황에서만 재현되는 지연을 찾기 위해, 보조 스레드가 일정 간격으로 sys._current_frames()를
+읽어 모든 스레드의 파이썬 스택을 샘플링합니다. 같은 기간 이벤트 루프 지연(lag)도 함께 측정.
+
+- 코드 계측/트레이스 훅 없이 스택만 읽으므로 오버헤드는 샘플 간격에 비례 (기본 10ms)
+- 한 번에 하나의 프로파일만 실행 (동시 요청은 ProfilerBusy → 409)
+- 결과 형식: collapsed("스레드;함수;함수 횟수", flamegraph.pl/speedscope 호환) 또는 speedscope JSON
+- 대기 중인 스택(selector.select, 스레드풀 큐 대기 등)은 기본적으로 제외
+- 멀티 워커에서는 요청을 받은 워커 프로세스만 측정
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+MAX_SECONDS = 60.0
+MIN_INTERVAL_MS = 1.0
+
+# 리프 프레임이 여기 해당하면 대기(idle) 스택으로 간주
+_IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+_busy = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    """이미 다른 프로파일이 실행 중"""
+
+
+def _frame_key(frame) -> tuple[str, str, int]:
+    code = frame.f_code
+    return code.co_name, code.co_filename, code.co_firstlineno
+
+
+def _is_idle(leaf: tuple[str, str, int]) -> bool:
+    name, filename, _ = leaf
+    return (os.path.basename(filename), name) in _IDLE_LEAVES
+
+
+def _sample(stop: threading.Event, interval: float, samples: Counter, include_idle: bool, meta: dict) -> None:
+    me = threading.get_ident()
+    next_at = time.perf_counter()
+    while not stop.is_set():
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == me:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_key(frame))
+                frame = frame.f_back
+            if not stack or (not include_idle and _is_idle(stack[0])):
+                continue
+            stack.reverse()
+            samples[(names.get(thread_id, str(thread_id)), tuple(stack))] += 1
+        meta["ticks"] += 1
+        next_at += interval
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            stop.wait(delay)
+        else:
+            next_at = time.perf_counter()  # 밀렸으면 따라잡지 않고 다음 간격부터
+
+
+async def _measure_lag(stop: asyncio.Event, interval: float, lags: list) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, loop.time() - expected) * 1000)
+
+
+def _lag_summary(lags: list[float]) -> dict:
+    if not lags:
+        return {"samples": 0}
+    ordered = sorted(lags)
+
+    def pct(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))], 2)
+
+    return {
+        "samples": len(ordered),
+        "meanMs": round(sum(ordered) / len(ordered), 2),
+        "p50Ms": pct(0.5),
+        "p99Ms": pct(0.99),
+        "maxMs": round(ordered[-1], 2),
+    }
+
+
+async def profile(seconds: float, interval_ms: float = 10.0, include_idle: bool = False) -> dict:
+    """seconds 동안 샘플링. {"samples": Counter[(스레드, 스택)], "ticks", "intervalMs", "durationMs", "loopLag"} 반환"""
+    seconds = min(max(seconds, 0.1), MAX_SECONDS)
+    interval = max(interval_ms, MIN_INTERVAL_MS) / 1000
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running")
+    try:
+        samples: Counter = Counter()
+        meta = {"ticks": 0}
+        stop_thread = threading.Event()
+        stop_lag = asyncio.Event()
+        lags: list[float] = []
+
+        sampler = threading.Thread(
+            target=_sample, args=(stop_thread, interval, samples, include_idle, meta),
+            name="profiler-sampler", daemon=True,
+        )
+        started = time.perf_counter()
+        lag_task = asyncio.create_task(_measure_lag(stop_lag, interval, lags))
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stop_thread.set()
+            stop_lag.set()
+            await asyncio.to_thread(sampler.join)
+            await lag_task
+        return {
+            "samples": samples,
+            "ticks": meta["ticks"],
+            "intervalMs": interval * 1000,
+            "durationMs": round((time.perf_counter() - started) * 1000, 1),
+            "loopLag": _lag_summary(lags),
+        }
+    finally:
+        _busy.release()
+
+
+def _frame_label(key: tuple[str, str, int]) -> str:
+    name, filename, line = key
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def to_collapsed(result: dict) -> str:
+    """Brendan Gregg collapsed 형식: 스레드;루트;...;리프 횟수"""
+    lines = []
+    for (thread, stack), count in result["samples"].most_common():
+        frames = ";".join(_frame_label(k).replace(";", ":") for k in stack)
+        lines.append(f"{thread};{frames} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def to_speedscope(result: dict, name: str = "abcdLLM gateway") -> dict:
+    """speedscope 파일 형식 (sampled 프로파일, 스레드별 1개)"""
+    frames: list[dict] = []
+    index: dict[tuple, int] = {}
+    per_thread: dict[str, tuple[list, list]] = {}
+    interval = result["intervalMs"]
+
+    for (thread, stack), count in result["samples"].items():
+        ids = []
+        for key in stack:
+            if key not in index:
+                index[key] = len(frames)
+                frames.append({"name": key[0], "file": key[1], "line": key[2]})
+            ids.append(index[key])
+        stacks, weights = per_thread.setdefault(thread, ([], []))
+        stacks.append(ids)
+        weights.append(count * interval)
+
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "abcdLLM profiler",
+        "activeProfileIndex": 0,
+        "shared": {"frames": frames},
+        "profiles": [
+            {
+                "type": "sampled",
+                "name": thread,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": stacks,
+                "weights": weights,
+            }
+            for thread, (stacks, weights) in sorted(per_thread.items())
+        ],
+        "loopLag": result["loopLag"],
+    }
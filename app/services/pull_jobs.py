@@ -0,0 +1,287 @@
+"""
+모델 pull 백그라운드 작업
+수 GB 모델 다운로드를 관리자 HTTP 요청과 분리해 백그라운드에서 실행하고,
+Ollama의 스트리밍 /api/pull 응답에서 진행률을 파싱해 작업 상태로 노출합니다.
+
+- 같은 모델의 진행 중 작업이 있으면 새로 시작하지 않고 기존 작업을 반환 (워커 간에도 중복 방지)
+- OLLAMA_PULL_BACKENDS에 여러 Ollama URL을 지정하면 모든 백엔드에 병렬로 pull (비어 있으면 현재 Ollama만)
+- 상태는 {DATA_DIR}/pull_jobs/{job_id}.json 과 Redis(pull_job:{job_id})에 기록
+  → 다른 워커로 들어온 폴링/SSE 요청도 같은 상태를 조회
+- 완료되면 모델 카탈로그 캐시를 즉시 갱신
+
+작업 상태:
+  {"id", "model", "status": queued|running|completed|failed, "completed", "total", "percent",
+   "backends": [{"url", "status", "detail", "completed", "total", "percent", "error"}], ...}
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import secrets
+import threading
+import time
+
+from app.config import settings
+from app.services import cache, model_catalog, ollama_client
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+STALE_SECONDS = 120          # 진행 중인데 이 시간 동안 갱신이 없으면 담당 워커가 죽은 것으로 간주
+SAVE_INTERVAL = 1.0          # 진행률 기록 최소 간격 (초)
+HEARTBEAT_INTERVAL = 30.0    # 진행률 줄이 없는 구간(digest 검증 등)에도 살아있음을 기록
+_ID_RE = re.compile(r"^pull_[A-Za-z0-9]+$")  # 경로 조작 방지
+
+_jobs: dict[str, dict] = {}
+_tasks: set[asyncio.Task] = set()
+_write_lock = threading.Lock()
+_written: dict[str, float] = {}  # job_id → 마지막으로 기록한 updatedAt (늦게 끝난 이전 스냅샷 무시)
+
+
+class PullJobError(ValueError):
+    """잘못된 pull 요청 (라우터에서 400으로 변환)"""
+
+
+class _PullFailed(Exception):
+    """Ollama가 pull 스트림에서 보고한 오류"""
+
+
+def _root() -> str:
+    return os.path.join(settings.DATA_DIR, "pull_jobs")
+
+
+def _job_path(job_id: str) -> str:
+    return os.path.join(_root(), f"{job_id}.json")
+
+
+def _model_path(model: str) -> str:
+    return os.path.join(_root(), f"model-{hashlib.sha1(model.encode()).hexdigest()[:16]}")
+
+
+def _cache_key(job_id: str) -> str:
+    return f"pull_job:{job_id}"
+
+
+def _snapshot(job: dict) -> dict:
+    """updatedAt을 찍고 기록용 사본 반환 (이벤트 루프에서 — 스레드가 쓰는 동안 진행률이 바뀌어도 영향 없음)"""
+    job["updatedAt"] = time.time()
+    return {**job, "backends": [dict(b) for b in job["backends"]]}
+
+
+def _write(snapshot: dict) -> None:
+    """상태 파일 + Redis 기록 (동기 — 스레드에서 호출)"""
+    with _write_lock:
+        if snapshot["updatedAt"] < _written.get(snapshot["id"], 0):
+            return
+        _written[snapshot["id"]] = snapshot["updatedAt"]
+        try:
+            os.makedirs(_root(), exist_ok=True)
+            tmp = f"{_job_path(snapshot['id'])}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp, _job_path(snapshot["id"]))
+        except Exception as e:
+            logger.warning(f"Pull job state write failed: {e}")
+        cache.set(_cache_key(snapshot["id"]), snapshot, ttl=86400)
+
+
+async def _save(job: dict) -> None:
+    await asyncio.to_thread(_write, _snapshot(job))
+
+
+def get_job(job_id: str) -> dict | None:
+    """작업 상태 조회 (이 워커 → Redis → 파일 순)"""
+    if not _ID_RE.match(job_id or ""):
+        return None
+    if job_id in _jobs:
+        return _jobs[job_id]
+    job = cache.get(_cache_key(job_id))
+    if not job:
+        try:
+            with open(_job_path(job_id)) as f:
+                job = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+    if job["status"] in ACTIVE_STATUSES and not _is_live(job):
+        # 담당 워커가 재시작/종료되어 더 이상 갱신되지 않는 작업 (updatedAt도 바꿔 follow가 종료 상태를 전달하도록)
+        job = {
+            **job,
+            "status": "failed",
+            "error": "pull worker stopped before completion",
+            "updatedAt": job.get("updatedAt", 0) + STALE_SECONDS,
+        }
+    return job
+
+
+def _is_live(job: dict | None) -> bool:
+    return bool(job) and job["status"] in ACTIVE_STATUSES and time.time() - job.get("updatedAt", 0) < STALE_SECONDS
+
+
+class _ModelLock:
+    """모델별 중복 확인과 작업 등록을 워커 간 직렬화 (fcntl 미지원 환경에서는 생략)"""
+
+    def __enter__(self):
+        os.makedirs(_root(), exist_ok=True)
+        self._f = open(os.path.join(_root(), ".lock"), "a+")
+        if fcntl is not None:
+            fcntl.flock(self._f.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._f.fileno(), fcntl.LOCK_UN)
+        self._f.close()
+
+
+def _backends() -> list[str]:
+    urls = [u.rstrip("/") for u in settings.OLLAMA_PULL_BACKENDS if u.strip()]
+    return list(dict.fromkeys(urls)) or [ollama_client.base_url().rstrip("/")]
+
+
+def _register(model: str) -> tuple[dict, bool]:
+    """진행 중인 같은 모델 작업 확인 + 새 작업 등록 (동기 — 파일 잠금을 기다리므로 스레드에서 호출)"""
+    with _ModelLock():
+        try:
+            with open(_model_path(model)) as f:
+                existing = get_job(f.read().strip())
+        except FileNotFoundError:
+            existing = None
+        if _is_live(existing):
+            return existing, False
+
+        now = time.time()
+        job = {
+            "id": f"pull_{secrets.token_hex(12)}",
+            "model": model,
+            "status": "queued",
+            "completed": 0,
+            "total": 0,
+            "percent": 0.0,
+            "backends": [
+                {"url": url, "status": "queued", "detail": "", "completed": 0, "total": 0, "percent": 0.0, "error": None}
+                for url in _backends()
+            ],
+            "error": None,
+            "createdAt": now,
+            "finishedAt": None,
+        }
+        _jobs[job["id"]] = job
+        _write(_snapshot(job))
+        with open(_model_path(model), "w") as f:
+            f.write(job["id"])
+        return job, True
+
+
+async def start(model: str) -> tuple[dict, bool]:
+    """pull 작업 시작. (작업, 새로 만들었는지) 반환 — 진행 중인 같은 모델 작업이 있으면 그것을 반환."""
+    model = (model or "").strip()
+    if not model:
+        raise PullJobError("Model name is required")
+
+    job, created = await asyncio.to_thread(_register, model)
+    if created:
+        task = asyncio.create_task(_run(job))
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+    return job, created
+
+
+def _update_totals(job: dict) -> None:
+    job["completed"] = sum(b["completed"] for b in job["backends"])
+    job["total"] = sum(b["total"] for b in job["backends"])
+    job["percent"] = round(job["completed"] * 100 / job["total"], 1) if job["total"] else 0.0
+
+
+async def _pull_backend(job: dict, backend: dict) -> None:
+    layers: dict[str, tuple[int, int]] = {}  # digest → (completed, total)
+    last_save = 0.0
+    backend["status"] = "running"
+    try:
+        async for progress in ollama_client.pull_stream(job["model"], backend["url"]):
+            if progress.get("error"):
+                raise _PullFailed(progress["error"])
+            backend["detail"] = progress.get("status", "")
+            digest = progress.get("digest")
+            if digest and progress.get("total"):
+                layers[digest] = (progress.get("completed", 0) or 0, progress["total"])
+                backend["completed"] = sum(c for c, _ in layers.values())
+                backend["total"] = sum(t for _, t in layers.values())
+                backend["percent"] = round(backend["completed"] * 100 / backend["total"], 1)
+                _update_totals(job)
+            now = time.monotonic()
+            if now - last_save >= SAVE_INTERVAL:
+                last_save = now
+                await _save(job)
+        if backend["detail"] != "success":
+            raise _PullFailed(f"pull ended without success (last status: {backend['detail'] or 'none'})")
+        backend["status"] = "completed"
+        backend["percent"] = 100.0
+    except _PullFailed as e:
+        backend["status"] = "failed"
+        backend["error"] = str(e)
+    except Exception as e:
+        backend["status"] = "failed"
+        backend["error"] = f"{type(e).__name__}: {e}"
+    if backend["error"]:
+        logger.warning(f"Pull {job['model']} on {backend['url']} failed: {backend['error']}")
+
+
+async def _heartbeat(job: dict) -> None:
+    while True:
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        await _save(job)
+
+
+async def _run(job: dict) -> None:
+    job["status"] = "running"
+    await _save(job)
+    heartbeat = asyncio.create_task(_heartbeat(job))
+    try:
+        await asyncio.gather(*(_pull_backend(job, b) for b in job["backends"]))
+    finally:
+        heartbeat.cancel()
+
+    _update_totals(job)
+    failed = [b for b in job["backends"] if b["status"] == "failed"]
+    job["status"] = "failed" if failed else "completed"
+    job["error"] = "; ".join(f"{b['url']}: {b['error']}" for b in failed) or None
+    job["finishedAt"] = time.time()
+    await _save(job)
+    logger.info(f"Pull job {job['id']} ({job['model']}) {job['status']}")
+
+    try:
+        await model_catalog.refresh()
+    except Exception:
+        pass
+    # 완료된 작업은 파일/Redis에 남고, 워커 메모리에는 진행 중인 작업만 유지
+    _jobs.pop(job["id"], None)
+    _written.pop(job["id"], None)
+
+
+async def follow(job_id: str, interval: float = 0.5, heartbeat: float = 15.0):
+    """SSE용: 상태가 바뀔 때마다 작업 상태를 반환, 끝나면 종료. 변화가 없으면 heartbeat마다 None."""
+    last_seen = None
+    idle = 0.0
+    while True:
+        job = await asyncio.to_thread(get_job, job_id)
+        if job is None:
+            return
+        seen = (job.get("updatedAt"), job["status"])
+        if seen != last_seen:
+            last_seen = seen
+            idle = 0.0
+            yield job
+            if job["status"] not in ACTIVE_STATUSES:
+                return
+        elif idle >= heartbeat:
+            idle = 0.0
+            yield None
+        await asyncio.sleep(interval)
+        idle += interval
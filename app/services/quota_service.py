@@ -1,18 +1,38 @@
-from datetime import datetime, timezone
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
 
-from app.database import pb
-from app.services import cache
+from app.services import cache, storage, timing, usage_spool
+
+logger = logging.getLogger(__name__)
 
 
 def _today() -> str:
     return datetime.now(timezone.utc).strftime("%Y-%m-%d")
 
 
+def ensure_quota_available(user: dict) -> None:
+    """요청 전 확인: 이미 한도를 다 쓴 경우 ValueError.
+
+    응답을 그대로 흘려보내는 경로(패스스루)는 응답 후 429로 바꿀 수 없으므로 시작 전에 거른다.
+    """
+    daily_usage = user.get("dailyUsage", 0) or 0
+    daily_quota = user.get("dailyQuota", 5000) or 5000
+    total_usage = user.get("usage", 0) or 0
+    total_quota = user.get("totalQuota", 50000) or 50000
+
+    if daily_usage >= daily_quota:
+        raise ValueError(f"Daily quota exceeded ({daily_usage}/{daily_quota})")
+    if total_usage >= total_quota:
+        raise ValueError(f"Total quota exceeded ({total_usage}/{total_quota})")
+
+
+@timing.timed("deduct")
 def check_and_deduct(user: dict, tokens_used: int, api_key_id: str | None = None) -> None:
     """Check quota and deduct tokens. Raises ValueError if over quota.
 
     user dict에 이미 quota 정보가 있으므로 DB 재조회 없이 사용.
-    write 후 캐시 무효화.
+    차감은 스풀에 먼저 기록하고 재전송기가 저장소에 증분으로 반영 (반영 후 캐시 무효화).
     """
     user_id = user["id"]
     daily_usage = user.get("dailyUsage", 0) or 0
@@ -25,44 +45,47 @@ def check_and_deduct(user: dict, tokens_used: int, api_key_id: str | None = None
     if total_usage + tokens_used > total_quota:
         raise ValueError(f"Total quota exceeded ({total_usage}/{total_quota})")
 
-    # DB 업데이트
-    pb.collection("users").update(user_id, {
-        "dailyUsage": daily_usage + tokens_used,
-        "totalUsage": total_usage + tokens_used,
-        "lastActive": datetime.now(timezone.utc).isoformat(),
-    })
+    usage_spool.submit("quota", {"user": user_id, "apiKey": api_key_id or "", "tokens": tokens_used})
 
+
+def _entry_day(entry: dict) -> str:
+    return datetime.fromtimestamp(entry["ts"], timezone.utc).strftime("%Y-%m-%d")
+
+
+def _apply_user_delta(entry: dict) -> None:
+    """스풀 항목 → users 증분 갱신. 지난 날짜 항목(장애 후 재전송)은 일일 사용량에 넣지 않음"""
+    body = entry["body"]
+    backend = storage.backend()
+    today = _today()
+    try:
+        backend.add_user_usage(body["user"], body["tokens"], today if _entry_day(entry) == today else None)
+    except storage.Rejected as e:
+        raise usage_spool.Rejected(str(e))
     # 캐시 무효화 (다음 요청에서 신선한 데이터 사용)
-    cache.invalidate_user(user_id)
+    backend.after_commit(lambda: cache.invalidate_user(body["user"]))
 
-    # API Key usage 업데이트
-    if api_key_id:
-        try:
-            key_record = pb.collection("api_keys").get_one(api_key_id)
-            last_reset = str(getattr(key_record, "lastResetDate", "") or getattr(key_record, "last_reset_date", "") or "")
-            today = _today()
-            used_requests = getattr(key_record, "usedRequests", None) or getattr(key_record, "used_requests", None) or 0
-            used_tokens = getattr(key_record, "usedTokens", None) or getattr(key_record, "used_tokens", None) or 0
-            total_used_tokens = getattr(key_record, "totalUsedTokens", None) or getattr(key_record, "total_used_tokens", None) or 0
-
-            if not last_reset.startswith(today):
-                used_requests = 0
-                used_tokens = 0
-
-            pb.collection("api_keys").update(api_key_id, {
-                "usedRequests": used_requests + 1,
-                "usedTokens": used_tokens + tokens_used,
-                "totalUsedTokens": total_used_tokens + tokens_used,
-                "lastResetDate": today,
-            })
-        except Exception:
-            pass
-
-
-def reset_daily_if_needed(user_id: str) -> None:
+
+def _apply_key_delta(entry: dict) -> None:
+    """스풀 항목 → api_keys 증분 갱신 (오늘 첫 사용이면 일일 카운터를 이 요청 값으로 재설정)"""
+    body = entry["body"]
+    api_key_id = body.get("apiKey")
+    if not api_key_id:
+        return
+    today = _today()
+    try:
+        storage.backend().add_key_usage(api_key_id, body["tokens"], today if _entry_day(entry) == today else None)
+    except storage.Rejected as e:
+        raise usage_spool.Rejected(str(e))
+
+
+usage_spool.register("quota", [("user", _apply_user_delta), ("key", _apply_key_delta)])
+
+
+@timing.timed("reset")
+async def reset_daily_if_needed(user_id: str) -> None:
     """Reset daily usage if it's a new day. Called at request time.
 
-    Redis 캐시로 같은 날 중복 체크 방지.
+    Redis 캐시로 같은 날 중복 체크 방지. 저장소 호출은 전용 스레드 풀에서 (이벤트 루프를 막지 않음)
     """
     today = _today()
 
@@ -71,24 +94,37 @@ def reset_daily_if_needed(user_id: str) -> None:
         return
 
     try:
-        record = pb.collection("users").get_one(user_id)
-        last_active = getattr(record, "lastActive", "") or getattr(record, "last_active", "") or ""
-
-        if last_active:
-            last_date = str(last_active)[:10]
-            if last_date != today:
-                pb.collection("users").update(user_id, {
-                    "dailyUsage": 0,
-                    "lastActive": datetime.now(timezone.utc).isoformat(),
-                })
-                cache.invalidate_user(user_id)
-        else:
-            pb.collection("users").update(user_id, {
-                "lastActive": datetime.now(timezone.utc).isoformat(),
-            })
-            cache.invalidate_user(user_id)
+        backend = storage.backend()
+        if await storage.run(backend.reset_user_daily, user_id, today):
+            backend.after_commit(lambda: cache.invalidate_user(user_id))
 
         # 오늘 체크 완료 표시 (자정까지 캐시)
         cache.mark_daily_reset_done(user_id, today)
     except Exception:
         pass
+
+
+def reset_all_daily_usage() -> int:
+    """자정 일괄 리셋: 오늘 활동이 없는 유저/키의 일일 사용량을 0으로.
+
+    요청 시점의 reset_daily_if_needed와 같은 기준(마지막 활동일 != 오늘)을 사용하므로
+    자정 직후 이미 사용을 시작한 유저의 카운터는 건드리지 않는다.
+    Returns: 리셋한 레코드 수
+    """
+    user_ids, keys = storage.backend().reset_all_daily(_today())
+    for user_id in user_ids:
+        cache.invalidate_user(user_id)
+    return len(user_ids) + keys
+
+
+async def daily_reset_job() -> None:
+    """리더 싱글톤 작업: 매일 UTC 자정 직후 일괄 리셋 (leader.register_job으로 등록)"""
+    while True:
+        now = datetime.now(timezone.utc)
+        next_midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=5, microsecond=0)
+        await asyncio.sleep((next_midnight - now).total_seconds())
+        try:
+            count = await asyncio.to_thread(reset_all_daily_usage)
+            logger.info(f"Daily usage reset: {count} records")
+        except Exception as e:
+            logger.error(f"Daily usage reset failed: {type(e).__name__}: {e}")
@@ -0,0 +1,34 @@
+"""
+서비스 준비 상태(readiness) 추적
+- lifespan 백그라운드 작업(Ollama 감지, 워밍업)이 진행 상황을 기록
+- /api/ready 엔드포인트가 이 상태를 그대로 노출 (로드밸런서/오케스트레이터용)
+
+상태 값:
+  pending  → 아직 시작 전
+  running  → 진행 중
+  done     → 성공
+  failed   → 실패 (서비스는 기본값으로 계속 동작)
+"""
+import time
+
+COMPONENTS = ("detection", "warmup")
+
+_state: dict[str, dict] = {
+    name: {"status": "pending", "updatedAt": None} for name in COMPONENTS
+}
+
+
+def set_state(component: str, status: str, **detail) -> None:
+    _state[component] = {"status": status, "updatedAt": time.time(), **detail}
+
+
+def is_ready() -> bool:
+    """모든 구성 요소가 끝났으면(성공/실패 무관) 준비 완료로 간주"""
+    return all(s["status"] in ("done", "failed") for s in _state.values())
+
+
+def snapshot() -> dict:
+    return {
+        "ready": is_ready(),
+        "components": {name: dict(s) for name, s in _state.items()},
+    }
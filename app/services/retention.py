@@ -0,0 +1,206 @@
+"""
+보존 기간 정책 — 오래된 원본 행을 일별 집계로 접은 뒤 삭제
+usage_logs / security_events는 요청·이벤트마다 한 행씩 끝없이 늘어나 -created 정렬 조회가 점점 느려지므로,
+리더 싱글톤 작업이 RETENTION_INTERVAL_SECONDS마다 콜렉션별 보존 기간(RETENTION_DAYS)이 지난 행을 정리합니다.
+
+처리 순서 (콜렉션마다, 가장 오래된 UTC 날짜부터 하루씩):
+  1. 접기: 그날 원본 행 전체 → 일별 집계를 절대값으로 기록 (여러 번 실행해도 같은 결과)
+       usage_logs       → usage_user_daily / usage_key_daily / usage_model_hourly (rollups와 같은 콜렉션)
+       security_events  → security_events_daily (day, type, severity, count)
+  2. 진행 상태 기록: system_settings의 "retention:{콜렉션}" = {"foldedDay": 날짜}
+       → 삭제 도중 중단돼도 재시작 시 남은 행만으로 다시 접지 않음 (집계가 줄어드는 것 방지)
+  3. 삭제: RETENTION_DELETE_BATCH개씩, 초당 RETENTION_DELETE_RATE개 이하로
+       배치 사이에는 진행 중인 대화형 요청이 빠질 때까지 잠시 양보 (priority.wait_for_turn)
+
+로컬 컬럼형 사용량 저장소(usage_store)는 같은 주기에 USAGE_STORE_RETENTION_DAYS가 지난 날짜 파티션을
+디렉터리째 삭제 (리더 워커의 DATA_DIR 기준 — 같은 호스트의 워커들은 DATA_DIR을 공유)
+"""
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from pocketbase.models import Record
+from pocketbase.utils import ClientResponseError
+
+from app.config import settings
+from app.database import pb
+from app.services import leader, pagination, priority, rollups, usage_store
+
+logger = logging.getLogger(__name__)
+
+SECURITY_DAILY = "security_events_daily"
+SECURITY_METRICS = ("count",)
+START_DELAY_SECONDS = 120
+
+_status: dict[str, dict] = {}  # 콜렉션 → {"foldedDay", "deleted", "lastRun", "lastError"}
+_store_status = {"removedPartitions": 0, "lastRun": None, "lastError": ""}
+
+
+# ── 접기 (일별 집계) ──────────────────────────────────────────────
+
+def _day_filter(day: str) -> str:
+    start = datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    return (
+        f"created>={pagination.quote(pagination.format_datetime(start))}"
+        f" && created<{pagination.quote(pagination.format_datetime(start + timedelta(days=1)))}"
+    )
+
+
+def _fold_usage_logs(day: str) -> int:
+    aggregated: dict = {}
+    rows = 0
+    for items in pagination.iter_pages("usage_logs", _day_filter(day), sort_field="id"):
+        rollups.aggregate([Record(item) for item in items], aggregated)
+        rows += len(items)
+    rollups.write_absolute(aggregated)
+    return rows
+
+
+def _fold_security_events(day: str) -> int:
+    aggregated: dict = {}
+    rows = 0
+    for items in pagination.iter_pages("security_events", _day_filter(day), sort_field="id"):
+        for item in items:
+            dims = {"day": day, "type": item.get("type") or "", "severity": item.get("severity") or ""}
+            key = (SECURITY_DAILY, rollups.record_id(SECURITY_DAILY, dims))
+            entry = aggregated.setdefault(key, {"dims": dims, "delta": {"count": 0}})
+            entry["delta"]["count"] += 1
+        rows += len(items)
+    rollups.write_absolute(aggregated, metrics=SECURITY_METRICS)
+    return rows
+
+
+FOLDERS = {
+    "usage_logs": _fold_usage_logs,
+    "security_events": _fold_security_events,
+}
+
+
+# ── 진행 상태 (system_settings) ───────────────────────────────────
+
+def _state_key(collection: str) -> str:
+    return f"retention:{collection}"
+
+
+def _read_state(collection: str) -> dict:
+    results = pb.collection("system_settings").get_list(1, 1, {"filter": f"key={pagination.quote(_state_key(collection))}"})
+    if not results.items:
+        return {}
+    try:
+        return json.loads(getattr(results.items[0], "value", "") or "{}")
+    except ValueError:
+        return {}
+
+
+def _write_state(collection: str, state: dict) -> None:
+    key = _state_key(collection)
+    value = json.dumps(state)
+    results = pb.collection("system_settings").get_list(1, 1, {"filter": f"key={pagination.quote(key)}"})
+    if results.items:
+        pb.collection("system_settings").update(results.items[0].id, {"value": value})
+    else:
+        pb.collection("system_settings").create({"key": key, "value": value, "description": "retention job progress"})
+
+
+# ── 삭제 ──────────────────────────────────────────────────────────
+
+def _oldest_day(collection: str, cutoff: str) -> str | None:
+    """cutoff(날짜) 이전 행 중 가장 오래된 행의 날짜"""
+    items, _ = pagination.fetch_page(
+        collection, f"created<{pagination.quote(cutoff + ' 00:00:00.000Z')}", "created", False, 1, fields="id,created",
+    )
+    return str(items[0]["created"])[:10] if items else None
+
+
+def _delete_ids(collection: str, ids: list[str]) -> int:
+    deleted = 0
+    for record_id in ids:
+        try:
+            pb.collection(collection).delete(record_id)
+            deleted += 1
+        except ClientResponseError as e:
+            if e.status != 404:
+                raise
+    return deleted
+
+
+async def _delete_day(collection: str, day: str) -> int:
+    """그날 행을 배치 단위로 속도 제한하며 삭제"""
+    deleted = 0
+    batch = max(1, settings.RETENTION_DELETE_BATCH)
+    while True:
+        items, _ = await asyncio.to_thread(
+            pagination.fetch_page, collection, _day_filter(day), "id", False, batch, None, "id",
+        )
+        if not items:
+            return deleted
+        await priority.wait_for_turn(max_wait=5.0)
+        started = time.monotonic()
+        count = await asyncio.to_thread(_delete_ids, collection, [item["id"] for item in items])
+        deleted += count
+        _status[collection]["deleted"] += count
+        budget = len(items) / max(settings.RETENTION_DELETE_RATE, 0.1)
+        await asyncio.sleep(max(budget - (time.monotonic() - started), 0.0))
+
+
+async def apply_policy(collection: str, days: int) -> int:
+    """콜렉션 하나에 보존 정책 적용. 삭제한 행 수 반환"""
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
+    status = _status.setdefault(collection, {"foldedDay": "", "deleted": 0, "lastRun": None, "lastError": ""})
+    fold = FOLDERS.get(collection)
+    state = await asyncio.to_thread(_read_state, collection)
+    total = 0
+    while True:
+        day = await asyncio.to_thread(_oldest_day, collection, cutoff)
+        if day is None:
+            break
+        if fold is not None and state.get("foldedDay", "") < day:
+            rows = await asyncio.to_thread(fold, day)
+            state["foldedDay"] = day
+            await asyncio.to_thread(_write_state, collection, state)
+            logger.info(f"Retention: folded {rows} {collection} rows for {day}")
+        status["foldedDay"] = state.get("foldedDay", "")
+        count = await _delete_day(collection, day)
+        total += count
+        logger.info(f"Retention: deleted {count} {collection} rows for {day}")
+    status["lastRun"] = datetime.now(timezone.utc).isoformat()
+    return total
+
+
+async def retention_job() -> None:
+    """리더 싱글톤 작업 (leader.register_job으로 등록)"""
+    await asyncio.sleep(START_DELAY_SECONDS)  # 시작 직후 워밍업/감지와 겹치지 않도록
+    while True:
+        for collection, days in settings.RETENTION_DAYS.items():
+            if days <= 0:
+                continue
+            try:
+                await apply_policy(collection, days)
+                _status[collection]["lastError"] = ""
+            except Exception as e:
+                _status.setdefault(collection, {"foldedDay": "", "deleted": 0, "lastRun": None})
+                _status[collection]["lastError"] = f"{type(e).__name__}: {e}"
+                logger.error(f"Retention for {collection} failed: {type(e).__name__}: {e}")
+        if settings.USAGE_STORE_RETENTION_DAYS > 0:
+            try:
+                removed = await asyncio.to_thread(usage_store.prune, settings.USAGE_STORE_RETENTION_DAYS)
+                _store_status["removedPartitions"] += removed
+                _store_status["lastRun"] = datetime.now(timezone.utc).isoformat()
+                _store_status["lastError"] = ""
+                if removed:
+                    logger.info(f"Retention: removed {removed} usage store partitions")
+            except Exception as e:
+                _store_status["lastError"] = f"{type(e).__name__}: {e}"
+                logger.error(f"Retention for usage store failed: {type(e).__name__}: {e}")
+        leader.publish_state(retention=snapshot())
+        await asyncio.sleep(settings.RETENTION_INTERVAL_SECONDS)
+
+
+def snapshot() -> dict:
+    return {
+        "policies": dict(settings.RETENTION_DAYS),
+        "collections": {name: dict(status) for name, status in _status.items()},
+        "usageStore": {"retentionDays": settings.USAGE_STORE_RETENTION_DAYS, **_store_status},
+    }
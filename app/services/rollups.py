@@ -0,0 +1,223 @@
+"""
+사용량 롤업 (사전 집계)
+대시보드/관리자 분석이 usage_logs 원본 행을 훑지 않도록, 사용 로그를 기록할 때 집계 테이블도 함께 갱신합니다.
+
+콜렉션 (레코드 하나 = 차원 조합 하나):
+  usage_user_daily    user, day("YYYY-MM-DD")
+  usage_key_daily     apiKey, user, day
+  usage_model_hourly  model, hour("YYYY-MM-DD HH:00")
+  공통 수치: requests, errors, promptTokens, completionTokens, totalTokens, responseTimeMs(합계)
+
+- 레코드 id는 차원 값의 해시(15자) → 조회 없이 바로 갱신, 없으면 같은 id로 생성 (워커 간 생성 경합은 재시도)
+- 요청 경로에서는 메모리에 증분만 쌓고, 워커별 백그라운드 작업이 ROLLUP_FLUSH_SECONDS마다
+  PocketBase "필드+" 증분 갱신으로 반영 (차원 조합당 1회 쓰기, 종료 시 남은 증분도 기록)
+- 기록 실패한 증분은 버리지 않고 다음 주기에 다시 시도
+- 시각은 UTC 기준 (usage_logs.created와 동일) — 기존 로그로부터의 재계산은 backfill_rollups.py
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone
+
+from pocketbase.utils import ClientResponseError
+
+from app.config import settings
+from app.database import pb
+
+logger = logging.getLogger(__name__)
+
+USER_DAILY = "usage_user_daily"
+KEY_DAILY = "usage_key_daily"
+MODEL_HOURLY = "usage_model_hourly"
+COLLECTIONS = (USER_DAILY, KEY_DAILY, MODEL_HOURLY)
+METRICS = ("requests", "errors", "promptTokens", "completionTokens", "totalTokens", "responseTimeMs")
+PAGE_SIZE = 500
+
+_pending: dict[tuple[str, str], dict] = {}  # (콜렉션, 레코드 id) → {"dims": {...}, "delta": {...}}
+_lock = threading.Lock()
+
+
+def record_id(collection: str, dims: dict) -> str:
+    """차원 조합 → PocketBase 레코드 id (15자, [a-z0-9])"""
+    key = "|".join([collection, *(str(dims[k]) for k in sorted(dims))])
+    return hashlib.sha1(key.encode()).hexdigest()[:15]
+
+
+def _entries(
+    user_id: str, api_key_id: str, model: str, prompt_tokens: int, completion_tokens: int,
+    response_time_ms: int, is_error: bool, at: datetime,
+) -> list[tuple[str, dict, dict]]:
+    """사용 1건 → [(콜렉션, 차원, 수치)]"""
+    day = at.strftime("%Y-%m-%d")
+    values = {
+        "requests": 1,
+        "errors": 1 if is_error else 0,
+        "promptTokens": prompt_tokens,
+        "completionTokens": completion_tokens,
+        "totalTokens": prompt_tokens + completion_tokens,
+        "responseTimeMs": response_time_ms,
+    }
+    entries = [(USER_DAILY, {"user": user_id, "day": day}, values)]
+    if api_key_id:
+        entries.append((KEY_DAILY, {"apiKey": api_key_id, "user": user_id, "day": day}, values))
+    if model:
+        entries.append((MODEL_HOURLY, {"model": model, "hour": at.strftime("%Y-%m-%d %H:00")}, values))
+    return entries
+
+
+def _add(target: dict, collection: str, dims: dict, values: dict) -> None:
+    key = (collection, record_id(collection, dims))
+    entry = target.get(key)
+    if entry is None:
+        target[key] = {"dims": dims, "delta": dict(values)}
+        return
+    delta = entry["delta"]
+    for name, value in values.items():
+        delta[name] = delta.get(name, 0) + value
+
+
+def record(
+    user_id: str, api_key_id: str, model: str, prompt_tokens: int, completion_tokens: int,
+    response_time_ms: int, is_error: bool, at: datetime | None = None,
+) -> None:
+    """사용 1건을 메모리 증분에 추가 (_log_usage에서 호출, I/O 없음)"""
+    at = at or datetime.now(timezone.utc)
+    entries = _entries(user_id, api_key_id, model, prompt_tokens, completion_tokens, response_time_ms, is_error, at)
+    with _lock:
+        for collection, dims, values in entries:
+            _add(_pending, collection, dims, values)
+
+
+def _apply(
+    collection: str, rid: str, dims: dict, values: dict, absolute: bool = False, metrics: tuple[str, ...] = METRICS,
+) -> None:
+    """레코드 하나 갱신: 있으면 증분(또는 절대값) 수정, 없으면 생성"""
+    body = dict(values) if absolute else {f"{name}+": value for name, value in values.items() if value}
+    for attempt in range(2):
+        try:
+            pb.collection(collection).update(rid, body)
+            return
+        except ClientResponseError as e:
+            if e.status != 404 or attempt:
+                raise
+        try:
+            pb.collection(collection).create({"id": rid, **dims, **{m: values.get(m, 0) for m in metrics}})
+            return
+        except ClientResponseError as e:
+            if e.status != 400:
+                raise
+            # 다른 워커가 먼저 생성 → 다시 갱신
+
+
+def flush() -> int:
+    """쌓인 증분을 PocketBase에 반영. 반영한 레코드 수 반환 (실패분은 다음 주기로)"""
+    global _pending
+    with _lock:
+        batch, _pending = _pending, {}
+    done = 0
+    failed: dict = {}
+    for (collection, rid), entry in batch.items():
+        try:
+            _apply(collection, rid, entry["dims"], entry["delta"])
+            done += 1
+        except Exception as e:
+            failed[(collection, rid)] = entry
+            logger.warning(f"Rollup write failed ({collection}/{rid}): {type(e).__name__}: {e}")
+    if failed:
+        with _lock:
+            for (collection, _), entry in failed.items():
+                _add(_pending, collection, entry["dims"], entry["delta"])
+    return done
+
+
+async def flush_job() -> None:
+    """워커별 백그라운드 작업 (lifespan에서 시작)"""
+    try:
+        while True:
+            await asyncio.sleep(settings.ROLLUP_FLUSH_SECONDS)
+            await asyncio.to_thread(flush)
+    finally:
+        flush()  # 종료 시 남은 증분 기록
+
+
+def pending_count() -> int:
+    return len(_pending)
+
+
+# ── 조회 ──
+
+def _list_all(collection: str, filter: str, sort: str) -> list:
+    items = []
+    page = 1
+    while True:
+        result = pb.collection(collection).get_list(page, PAGE_SIZE, {"filter": filter, "sort": sort})
+        items.extend(result.items)
+        if len(result.items) < PAGE_SIZE:
+            return items
+        page += 1
+
+
+def _values(record) -> dict:
+    return {
+        "requests": getattr(record, "requests", 0) or 0,
+        "errors": getattr(record, "errors", 0) or 0,
+        "promptTokens": getattr(record, "prompt_tokens", 0) or 0,
+        "completionTokens": getattr(record, "completion_tokens", 0) or 0,
+        "totalTokens": getattr(record, "total_tokens", 0) or 0,
+        "responseTimeMs": getattr(record, "response_time_ms", 0) or 0,
+    }
+
+
+def user_days(user_id: str, since_day: str = "") -> list[dict]:
+    """사용자의 일별 롤업 (날짜 오름차순). since_day가 없으면 전체 기간"""
+    filter = f'user="{user_id}"' + (f' && day>="{since_day}"' if since_day else "")
+    return [{"day": r.day, **_values(r)} for r in _list_all(USER_DAILY, filter, "day")]
+
+
+def model_hours(since_hour: str) -> list[dict]:
+    """since_hour("YYYY-MM-DD HH:00") 이후 모델×시간 롤업 (모든 워커 합계, 시간 오름차순)"""
+    return [{"model": r.model, "hour": r.hour, **_values(r)} for r in _list_all(MODEL_HOURLY, f'hour>="{since_hour}"', "hour")]
+
+
+def model_totals(since_hour: str) -> dict[str, dict]:
+    """since_hour("YYYY-MM-DD HH:00") 이후 모델별 합계"""
+    totals: dict[str, dict] = {}
+    for r in _list_all(MODEL_HOURLY, f'hour>="{since_hour}"', "hour"):
+        acc = totals.setdefault(r.model, dict.fromkeys(METRICS, 0))
+        for name, value in _values(r).items():
+            acc[name] += value
+    return totals
+
+
+# ── 백필 ──
+
+def aggregate(rows, result: dict | None = None) -> dict:
+    """usage_logs 레코드들 → {(콜렉션, id): {"dims", "delta"}} (backfill_rollups.py용, result에 누적)"""
+    result = {} if result is None else result
+    for r in rows:
+        created = r.created if isinstance(r.created, datetime) else datetime.fromisoformat(str(r.created).replace("Z", "+00:00"))
+        if created.tzinfo is None:
+            created = created.replace(tzinfo=timezone.utc)
+        entries = _entries(
+            getattr(r, "user", "") or "",
+            getattr(r, "api_key", "") or "",
+            getattr(r, "model", "") or "",
+            getattr(r, "prompt_tokens", 0) or 0,
+            getattr(r, "completion_tokens", 0) or 0,
+            getattr(r, "response_time_ms", 0) or 0,
+            bool(getattr(r, "is_error", False)),
+            created.astimezone(timezone.utc),
+        )
+        for collection, dims, values in entries:
+            if collection == USER_DAILY and not dims["user"]:
+                continue
+            _add(result, collection, dims, values)
+    return result
+
+
+def write_absolute(aggregated: dict, metrics: tuple[str, ...] = METRICS) -> int:
+    """백필 결과를 절대값으로 기록 (여러 번 실행해도 같은 결과)"""
+    for (collection, rid), entry in aggregated.items():
+        _apply(collection, rid, entry["dims"], entry["delta"], absolute=True, metrics=metrics)
+    return len(aggregated)
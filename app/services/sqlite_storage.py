@@ -0,0 +1,555 @@
+"""
+내장 SQLite 저장소 (STORAGE_BACKEND=sqlite — 단일 노드 배포용)
+인증 조회, 쿼터 카운터, 사용 로그를 로컬 SQLite 파일({DATA_DIR}/storage.db)에서 처리해 요청마다의 PocketBase 왕복을 없앱니다.
+PocketBase는 계속 원본(계정/키 관리, 관리자 화면, 내보내기, 롤업)이고, 리더 작업(mirror_job)이 양방향으로 맞춥니다.
+
+테이블:
+  users / api_keys  PocketBase 레코드의 로컬 사본. 신원 필드(이메일, 역할, 한도, 상태, keyHash, isActive…)는
+                    PocketBase → 로컬 (처음 조회 시 읽어 오고, 이후 STORAGE_SYNC_SECONDS마다 updated 기준으로 당겨 옴)
+                    카운터 반영으로 updated가 바뀐 레코드는 반영 응답의 updated를 기억해 두고, 다음 당겨 오기에서
+                    그 값 그대로면(다른 변경 없음) 건너뜀. 삭제 반영(id 전체 비교)은 STORAGE_RECONCILE_SECONDS마다
+                    카운터(dailyUsage, totalUsage, used*, lastActive, lastResetDate)는 로컬이 원본 → PocketBase에 절대값으로 반영
+                    (version > pushedVersion인 행만. 이 모드에서는 PocketBase에서 카운터를 직접 고쳐도 다음 반영 때 덮어씀)
+  usage_logs        로컬에 먼저 기록 → PocketBase에 같은 id로 생성 (mirrored=1, 거부되면 2), 반영 후 LOCAL_LOG_DAYS 지나면 로컬에서 삭제
+  meta              당겨 오기 기준 시각 등
+
+쓰기/읽기:
+  - WAL 모드: 읽기 연결(스레드별)은 쓰기 중에도 막히지 않음. 여러 워커 프로세스가 같은 파일을 써도 됨 (busy_timeout)
+  - 쓰기는 전용 스레드 하나가 큐에서 모아서 한 트랜잭션으로 실행 (최대 STORAGE_SQLITE_BATCH개, 항목별 SAVEPOINT)
+    → 동시 요청의 로그/카운터 갱신이 fsync 한 번으로 묶임. 호출 쪽은 큐에 넣고 바로 반환 (flush()로 반영 대기)
+  - SQL 문은 모듈 상수(고정 문자열 + ? 파라미터) → 연결의 문장 캐시(cached_statements)에서 준비된 문장을 재사용
+  - 카운터 갱신은 읽기 없이 UPDATE 한 문장 (오늘 첫 사용 여부도 CASE로 판단)
+    로컬 행이 없어 0행이 바뀌면(새 storage.db, Redis 인증 캐시 히트, 삭제 반영 직후) PocketBase에서 행을 읽어 와
+    넣고 같은 UPDATE를 다시 실행 — 전용 스레드 하나에서 (쓰기 스레드가 HTTP 왕복을 기다리지 않도록)
+"""
+import asyncio
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from pocketbase.models import Record
+from pocketbase.utils import ClientResponseError
+
+from app.config import settings
+from app.database import pb
+from app.services import leader, pagination, storage
+from app.services.storage import Rejected, Storage
+
+logger = logging.getLogger(__name__)
+
+LOCAL_LOG_DAYS = 7
+PUSH_BATCH = 200
+REFETCH_ATTEMPTS = 3
+
+USER_IDENTITY = ("email", "name", "role", "primaryApiKey", "dailyQuota", "totalQuota", "lastIp", "status", "accessCount")
+USER_COUNTERS = ("dailyUsage", "totalUsage", "lastActive")
+KEY_IDENTITY = ("user", "name", "keyHash", "keyPrefix", "isActive", "dailyRequests", "dailyTokens", "totalTokens")
+KEY_COUNTERS = ("usedRequests", "usedTokens", "totalUsedTokens", "lastResetDate")
+LOG_FIELDS = (
+    "user", "apiKey", "model", "endpoint", "promptTokens", "completionTokens",
+    "totalTokens", "responseTimeMs", "statusCode", "ip", "isError",
+)
+BOOL_FIELDS = ("isActive", "isError")
+TEXT_FIELDS = (
+    "email", "name", "role", "primaryApiKey", "lastIp", "status", "lastActive",
+    "user", "keyHash", "keyPrefix", "lastResetDate",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    email TEXT DEFAULT '', name TEXT DEFAULT '', role TEXT DEFAULT 'USER', primaryApiKey TEXT DEFAULT '',
+    dailyQuota INTEGER DEFAULT 5000, totalQuota INTEGER DEFAULT 50000, lastIp TEXT DEFAULT '',
+    status TEXT DEFAULT 'active', accessCount INTEGER DEFAULT 0,
+    dailyUsage INTEGER DEFAULT 0, totalUsage INTEGER DEFAULT 0, lastActive TEXT DEFAULT '',
+    version INTEGER DEFAULT 0, pushedVersion INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_users_lastActive ON users (lastActive);
+CREATE INDEX IF NOT EXISTS idx_users_dirty ON users (id) WHERE version > pushedVersion;
+
+CREATE TABLE IF NOT EXISTS api_keys (
+    id TEXT PRIMARY KEY,
+    user TEXT DEFAULT '', name TEXT DEFAULT '', keyHash TEXT NOT NULL, keyPrefix TEXT DEFAULT '',
+    isActive INTEGER DEFAULT 1, dailyRequests INTEGER DEFAULT 0, dailyTokens INTEGER DEFAULT 0, totalTokens INTEGER DEFAULT 0,
+    usedRequests INTEGER DEFAULT 0, usedTokens INTEGER DEFAULT 0, totalUsedTokens INTEGER DEFAULT 0, lastResetDate TEXT DEFAULT '',
+    version INTEGER DEFAULT 0, pushedVersion INTEGER DEFAULT 0
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_api_keys_keyHash ON api_keys (keyHash);
+CREATE INDEX IF NOT EXISTS idx_api_keys_lastResetDate ON api_keys (lastResetDate);
+CREATE INDEX IF NOT EXISTS idx_api_keys_dirty ON api_keys (id) WHERE version > pushedVersion;
+
+CREATE TABLE IF NOT EXISTS usage_logs (
+    id TEXT PRIMARY KEY,
+    created TEXT NOT NULL,
+    user TEXT DEFAULT '', apiKey TEXT DEFAULT '', model TEXT DEFAULT '', endpoint TEXT DEFAULT '',
+    promptTokens INTEGER DEFAULT 0, completionTokens INTEGER DEFAULT 0, totalTokens INTEGER DEFAULT 0,
+    responseTimeMs INTEGER DEFAULT 0, statusCode INTEGER DEFAULT 0, ip TEXT DEFAULT '', isError INTEGER DEFAULT 0,
+    mirrored INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_usage_logs_mirrored_created ON usage_logs (mirrored, created);
+
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+def _upsert_sql(table: str, identity: tuple[str, ...], counters: tuple[str, ...]) -> str:
+    """새 행은 PocketBase 값 그대로(카운터 포함), 이미 있는 행은 신원 필드만 갱신"""
+    columns = ("id",) + identity + counters
+    updates = ", ".join(f"[{c}]=excluded.[{c}]" for c in identity)
+    return (
+        f"INSERT INTO {table} ({', '.join(f'[{c}]' for c in columns)}) VALUES ({', '.join('?' * len(columns))}) "
+        f"ON CONFLICT(id) DO UPDATE SET {updates}"
+    )
+
+
+SQL_GET_USER = f"SELECT id, {', '.join(USER_IDENTITY + USER_COUNTERS)} FROM users WHERE id=?"
+SQL_FIND_KEY = f"SELECT id, {', '.join(f'[{c}]' for c in KEY_IDENTITY + KEY_COUNTERS)} FROM api_keys WHERE keyHash=?"
+SQL_UPSERT_USER = _upsert_sql("users", USER_IDENTITY, USER_COUNTERS)
+SQL_UPSERT_KEY = _upsert_sql("api_keys", KEY_IDENTITY, KEY_COUNTERS)
+SQL_DROP_KEY_HASH = "DELETE FROM api_keys WHERE keyHash=? AND id<>?"
+SQL_ADD_USER_TODAY = (
+    "UPDATE users SET totalUsage=totalUsage+?, dailyUsage=dailyUsage+?, lastActive=?, version=version+1 WHERE id=?"
+)
+SQL_ADD_USER_TOTAL = "UPDATE users SET totalUsage=totalUsage+?, version=version+1 WHERE id=?"
+SQL_ADD_KEY_TODAY = (
+    "UPDATE api_keys SET"
+    " usedRequests=CASE WHEN substr(lastResetDate, 1, 10)=?1 THEN usedRequests+1 ELSE 1 END,"
+    " usedTokens=CASE WHEN substr(lastResetDate, 1, 10)=?1 THEN usedTokens+?2 ELSE ?2 END,"
+    " totalUsedTokens=totalUsedTokens+?2,"
+    " lastResetDate=CASE WHEN substr(lastResetDate, 1, 10)=?1 THEN lastResetDate ELSE ?1 END,"
+    " version=version+1 WHERE id=?3"
+)
+SQL_ADD_KEY_TOTAL = "UPDATE api_keys SET totalUsedTokens=totalUsedTokens+?, version=version+1 WHERE id=?"
+SQL_RESET_USER = (
+    "UPDATE users SET dailyUsage=CASE WHEN lastActive='' THEN dailyUsage ELSE 0 END, lastActive=?1, version=version+1"
+    " WHERE id=?2 AND substr(lastActive, 1, 10)<>?3"
+)
+SQL_RESET_ALL_USERS = "UPDATE users SET dailyUsage=0, version=version+1 WHERE dailyUsage>0 AND lastActive<? RETURNING id"
+SQL_RESET_ALL_KEYS = (
+    "UPDATE api_keys SET usedRequests=0, usedTokens=0, lastResetDate=?1, version=version+1"
+    " WHERE (usedRequests>0 OR usedTokens>0) AND lastResetDate<?2"
+)
+SQL_INSERT_LOG = (
+    f"INSERT OR IGNORE INTO usage_logs (id, created, {', '.join(f'[{c}]' for c in LOG_FIELDS)})"
+    f" VALUES ({', '.join('?' * (len(LOG_FIELDS) + 2))})"
+)
+SQL_DIRTY_USERS = (
+    f"SELECT id, version, {', '.join(USER_COUNTERS)} FROM users"
+    f" WHERE version>pushedVersion AND id>? ORDER BY id LIMIT {PUSH_BATCH}"
+)
+SQL_DIRTY_KEYS = (
+    f"SELECT id, version, {', '.join(KEY_COUNTERS)} FROM api_keys"
+    f" WHERE version>pushedVersion AND id>? ORDER BY id LIMIT {PUSH_BATCH}"
+)
+SQL_PENDING_LOGS = (
+    f"SELECT id, {', '.join(f'[{c}]' for c in LOG_FIELDS)} FROM usage_logs"
+    f" WHERE mirrored=0 AND created<=? ORDER BY created LIMIT {PUSH_BATCH}"
+)
+SQL_MARK_LOG = "UPDATE usage_logs SET mirrored=? WHERE id=?"
+SQL_PRUNE_LOGS = "DELETE FROM usage_logs WHERE mirrored>0 AND created<?"
+SQL_GET_META = "SELECT value FROM meta WHERE key=?"
+SQL_SET_META = "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value"
+
+
+def _pb_now() -> str:
+    return pagination.format_datetime(datetime.now(timezone.utc))
+
+
+def _row_values(item: dict, columns: tuple[str, ...]) -> list:
+    return [("" if c in TEXT_FIELDS else 0) if item.get(c) is None else item[c] for c in columns]
+
+
+def _to_record(row: sqlite3.Row) -> Record:
+    data = dict(row)
+    for field in BOOL_FIELDS:
+        if field in data:
+            data[field] = bool(data[field])
+    return Record(data)
+
+
+class SQLiteStorage(Storage):
+    name = "sqlite"
+    local = True
+
+    def __init__(self, path: str | None = None):
+        self.path = path or settings.STORAGE_SQLITE_PATH or os.path.join(settings.DATA_DIR, "storage.db")
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        conn.close()
+
+        self._local = threading.local()
+        self._readers: list[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._stats = {"transactions": 0, "writes": 0, "failedWrites": 0, "maxBatch": 0, "refetchedRows": 0, "lostCounterWrites": 0}
+        self._refetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage-refetch")
+        self._mirror = {
+            "lastRun": None, "lastError": "", "pulled": 0, "skippedOwnPushes": 0, "removed": 0,
+            "pushedCounters": 0, "pushedLogs": 0, "rejectedLogs": 0,
+        }
+        self._pushed: dict[tuple[str, str], str] = {}  # (콜렉션, id) → 카운터 반영 응답의 updated (원본 문자열)
+        self._last_reconcile: float | None = None
+        self._writer = threading.Thread(target=self._write_loop, name="storage-writer", daemon=True)
+        self._writer.start()
+
+    # ── 연결 ──
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path, timeout=5.0, isolation_level=None, check_same_thread=False, cached_statements=256,
+        )
+        conn.row_factory = sqlite3.Row
+        # WAL에서 커밋마다 로그 fsync — 쓰기를 트랜잭션 단위로 모으므로 fsync 횟수는 배치 수
+        conn.execute("PRAGMA synchronous=FULL")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    # ── 쓰기 스레드 (그룹 커밋) ──
+
+    def _submit(self, op) -> Future:
+        """op(conn)을 쓰기 큐에 추가. 반환된 Future는 커밋 후 완료"""
+        future: Future = Future()
+        self._queue.put((op, future))
+        return future
+
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        batch_size = max(1, settings.STORAGE_SQLITE_BATCH)
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            while len(batch) < batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._apply(conn, batch)
+        conn.close()
+
+    def _apply(self, conn: sqlite3.Connection, batch: list) -> None:
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for op, future in batch:
+                conn.execute("SAVEPOINT op")
+                try:
+                    results.append((future, op(conn), None))
+                    conn.execute("RELEASE op")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO op")
+                    conn.execute("RELEASE op")
+                    results.append((future, None, e))
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            logger.error(f"Storage write transaction failed ({len(batch)} ops): {type(e).__name__}: {e}")
+            results = [(future, None, e) for _, future in batch]
+        self._stats["transactions"] += 1
+        self._stats["writes"] += len(batch)
+        self._stats["maxBatch"] = max(self._stats["maxBatch"], len(batch))
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+                continue
+            self._stats["failedWrites"] += 1
+            future.set_exception(error)
+            logger.warning(f"Storage write failed: {type(error).__name__}: {error}")
+
+    def _write(self, sql: str, params) -> Future:
+        return self._submit(lambda conn: conn.execute(sql, params).rowcount)
+
+    def after_commit(self, callback) -> None:
+        # 같은 큐 순서 → 앞서 넣은 쓰기와 같은 트랜잭션 또는 그 뒤에 완료 (콜백은 쓰기 스레드에서 실행)
+        self._submit(lambda conn: None).add_done_callback(lambda _: callback())
+
+    def flush(self) -> None:
+        self._submit(lambda conn: None).result()
+
+    def close(self) -> None:
+        self._refetcher.shutdown(wait=True)
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=10)
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+
+    # ── PocketBase → 로컬 ──
+
+    def _store_users(self, items: list[dict]) -> Future:
+        rows = [[item["id"], *_row_values(item, USER_IDENTITY + USER_COUNTERS)] for item in items]
+        return self._submit(lambda conn: conn.executemany(SQL_UPSERT_USER, rows).rowcount)
+
+    def _store_keys(self, items: list[dict]) -> Future:
+        def op(conn):
+            for item in items:
+                conn.execute(SQL_DROP_KEY_HASH, (item.get("keyHash"), item["id"]))
+                conn.execute(SQL_UPSERT_KEY, [item["id"], *_row_values(item, KEY_IDENTITY + KEY_COUNTERS)])
+        return self._submit(op)
+
+    # ── Storage ──
+
+    def get_user(self, user_id: str) -> Record | None:
+        row = self._reader().execute(SQL_GET_USER, (user_id,)).fetchone()
+        if row is not None:
+            return _to_record(row)
+        try:
+            item = pb.send(f"/api/collections/users/records/{user_id}", {"method": "GET"})
+        except ClientResponseError as e:
+            if e.status == 404:
+                return None
+            raise
+        self._store_users([item])
+        return Record(dict(item))
+
+    def find_api_key(self, key_hash: str) -> Record | None:
+        row = self._reader().execute(SQL_FIND_KEY, (key_hash,)).fetchone()
+        if row is not None:
+            return _to_record(row) if row["isActive"] else None
+        items, _ = pagination.fetch_page(
+            "api_keys", f"keyHash={pagination.quote(key_hash)} && isActive=true", "id", False, 1,
+        )
+        if not items:
+            return None
+        self._store_keys(items)
+        return Record(dict(items[0]))
+
+    # ── 카운터 갱신 (행이 없으면 PocketBase에서 읽어 와 다시 실행) ──
+
+    def _write_counter(self, collection: str, row_id: str, sql: str, params, attempt: int = 0) -> None:
+        self._write(sql, params).add_done_callback(
+            lambda future: self._counter_written(future, collection, row_id, sql, params, attempt)
+        )
+
+    def _counter_written(self, future: Future, collection: str, row_id: str, sql: str, params, attempt: int) -> None:
+        """쓰기 스레드에서 호출: 0행이 바뀌었으면 행 가져오기를 전용 스레드에 넘김 (실패한 쓰기는 _apply가 이미 기록)"""
+        if future.exception() is not None or future.result():
+            return
+        if attempt >= REFETCH_ATTEMPTS:
+            self._lose_counter(collection, row_id, params, "row still missing after refetch")
+            return
+        try:
+            self._refetcher.submit(self._refetch_and_retry, collection, row_id, sql, params, attempt + 1)
+        except RuntimeError:  # 종료 중
+            self._lose_counter(collection, row_id, params, "storage closing")
+
+    def _refetch_and_retry(self, collection: str, row_id: str, sql: str, params, attempt: int) -> None:
+        if attempt > 1:
+            time.sleep(attempt - 1)  # PocketBase 일시 장애 → 짧게 쉬고 재시도
+        try:
+            item = pb.send(f"/api/collections/{collection}/records/{row_id}", {"method": "GET"})
+        except ClientResponseError as e:
+            if e.status == 404:
+                self._lose_counter(collection, row_id, params, "deleted in PocketBase")
+                return
+            logger.warning(f"Storage refetch of {collection}/{row_id} failed: {e}")
+        else:
+            (self._store_users if collection == "users" else self._store_keys)([item])
+            self._stats["refetchedRows"] += 1
+        self._write_counter(collection, row_id, sql, params, attempt)
+
+    def _lose_counter(self, collection: str, row_id: str, params, reason: str) -> None:
+        self._stats["lostCounterWrites"] += 1
+        logger.error(f"Storage counter update dropped ({collection}/{row_id}, params={params}): {reason}")
+
+    def add_user_usage(self, user_id: str, tokens: int, today: str | None) -> None:
+        if today is None:
+            self._write_counter("users", user_id, SQL_ADD_USER_TOTAL, (tokens, user_id))
+        else:
+            self._write_counter("users", user_id, SQL_ADD_USER_TODAY, (tokens, tokens, _pb_now(), user_id))
+
+    def add_key_usage(self, key_id: str, tokens: int, today: str | None) -> None:
+        if today is None:
+            self._write_counter("api_keys", key_id, SQL_ADD_KEY_TOTAL, (tokens, key_id))
+        else:
+            self._write_counter("api_keys", key_id, SQL_ADD_KEY_TODAY, (today, tokens, key_id))
+
+    def reset_user_daily(self, user_id: str, today: str) -> bool:
+        record = self.get_user(user_id)
+        if record is None:
+            raise Rejected(f"user {user_id} not found")
+        last_active = str(getattr(record, "last_active", "") or "")
+        if last_active[:10] == today:
+            return False
+        self._write(SQL_RESET_USER, (_pb_now(), user_id, today))
+        return True
+
+    def reset_all_daily(self, today: str) -> tuple[list[str], int]:
+        before = f"{today} 00:00:00"
+
+        def op(conn):
+            user_ids = [row[0] for row in conn.execute(SQL_RESET_ALL_USERS, (before,)).fetchall()]
+            keys = conn.execute(SQL_RESET_ALL_KEYS, (today, before)).rowcount
+            return user_ids, keys
+
+        return self._submit(op).result()
+
+    def insert_usage_log(self, record_id: str, fields: dict) -> None:
+        self._write(SQL_INSERT_LOG, [record_id, _pb_now(), *(fields.get(c, "") for c in LOG_FIELDS)])
+
+    # ── PocketBase와 맞추기 (리더 작업) ──
+
+    def _meta(self, key: str) -> str:
+        row = self._reader().execute(SQL_GET_META, (key,)).fetchone()
+        return row[0] if row else ""
+
+    def _pull(self, collection: str, store) -> int:
+        """updated가 기준 시각 이후인 레코드 → 로컬 신원 필드 갱신 (새 레코드는 추가).
+        이 노드의 카운터 반영으로만 updated가 바뀐 레코드는 건너뜀"""
+        key = f"pull:{collection}"
+        since = self._meta(key)
+        pulled = 0
+        latest = since
+        for items in pagination.iter_pages(collection, f"updated>={pagination.quote(since)}" if since else "", "updated"):
+            changed = [
+                item for item in items
+                if self._pushed.pop((collection, item["id"]), None) != str(item.get("updated") or "")
+            ]
+            if changed:
+                store(changed).result()
+            self._mirror["skippedOwnPushes"] += len(items) - len(changed)
+            latest = max(latest, max(str(item.get("updated") or "") for item in items))
+            pulled += len(changed)
+        if latest != since:
+            self._write(SQL_SET_META, (key, latest)).result()
+        return pulled
+
+    def _reconcile(self, collection: str) -> int:
+        """PocketBase에서 삭제된 레코드를 로컬에서도 삭제 (삭제는 updated로 드러나지 않으므로 id 전체 비교)"""
+        remote: set[str] = set()
+        cursor = None
+        while True:
+            items, cursor = pagination.fetch_page(collection, "", "id", False, pagination.MAX_PAGE_SIZE, cursor, "id")
+            remote.update(item["id"] for item in items)
+            if cursor is None:
+                break
+        local = [row[0] for row in self._reader().execute(f"SELECT id FROM {collection}").fetchall()]
+        gone = [(record_id,) for record_id in local if record_id not in remote]
+        if gone:
+            self._submit(lambda conn: conn.executemany(f"DELETE FROM {collection} WHERE id=?", gone)).result()
+        return len(gone)
+
+    def _push_counters(self, collection: str, sql: str, counters: tuple[str, ...]) -> int:
+        """바뀐 카운터를 절대값으로 반영 — id 순으로 한 바퀴만 (계속 갱신되는 행 때문에 끝나지 않는 일이 없도록)"""
+        pushed = 0
+        last_id = ""
+        while True:
+            rows = self._reader().execute(sql, (last_id,)).fetchall()
+            if not rows:
+                return pushed
+            last_id = rows[-1]["id"]
+            done = []
+            for row in rows:
+                try:
+                    item = pb.send(
+                        f"/api/collections/{collection}/records/{row['id']}",
+                        {"method": "PATCH", "body": {c: row[c] for c in counters}, "params": {"fields": "id,updated"}},
+                    )
+                    self._pushed[(collection, row["id"])] = str(item.get("updated") or "")
+                except ClientResponseError as e:
+                    if e.status != 404:
+                        raise
+                    # PocketBase에서 삭제됨 → 다음 _reconcile이 로컬 행도 삭제
+                done.append((row["version"], row["id"], row["version"]))
+                pushed += 1
+            self._submit(lambda conn: conn.executemany(
+                f"UPDATE {collection} SET pushedVersion=? WHERE id=? AND pushedVersion<?", done,
+            )).result()
+
+    def _push_logs(self) -> None:
+        """아직 반영하지 않은 로그를 같은 id로 PocketBase에 생성 (이번 실행 시작 전까지 기록된 것만)"""
+        remote = storage.PocketBaseStorage()
+        upto = _pb_now()
+        while True:
+            rows = self._reader().execute(SQL_PENDING_LOGS, (upto,)).fetchall()
+            if not rows:
+                return
+            marks = []
+            try:
+                for row in rows:
+                    fields = {c: row[c] for c in LOG_FIELDS}
+                    fields["isError"] = bool(fields["isError"])
+                    try:
+                        remote.insert_usage_log(row["id"], fields)
+                        marks.append((1, row["id"]))
+                        self._mirror["pushedLogs"] += 1
+                    except Rejected as e:
+                        marks.append((2, row["id"]))
+                        self._mirror["rejectedLogs"] += 1
+                        logger.error(f"usage log {row['id']} rejected by PocketBase: {e}")
+            finally:
+                if marks:
+                    self._submit(lambda conn: conn.executemany(SQL_MARK_LOG, marks)).result()
+
+    def sync(self) -> bool:
+        """PocketBase와 한 번 맞추기: 신원 당겨 오기 → 삭제 반영 → 카운터/로그 반영 → 반영된 오래된 로그 정리"""
+        try:
+            self._sync_once()
+            self._mirror["lastError"] = ""
+            return True
+        except Exception as e:
+            self._mirror["lastError"] = f"{type(e).__name__}: {e}"
+            logger.warning(f"Storage mirror failed: {type(e).__name__}: {e}")
+            return False
+        finally:
+            self._mirror["lastRun"] = datetime.now(timezone.utc).isoformat()
+
+    def _sync_once(self) -> None:
+        self._mirror["pulled"] += self._pull("users", self._store_users)
+        self._mirror["pulled"] += self._pull("api_keys", self._store_keys)
+        if self._last_reconcile is None or time.monotonic() - self._last_reconcile >= settings.STORAGE_RECONCILE_SECONDS:
+            self._mirror["removed"] += self._reconcile("api_keys")
+            self._mirror["removed"] += self._reconcile("users")
+            self._last_reconcile = time.monotonic()
+        self._mirror["pushedCounters"] += self._push_counters("users", SQL_DIRTY_USERS, USER_COUNTERS)
+        self._mirror["pushedCounters"] += self._push_counters("api_keys", SQL_DIRTY_KEYS, KEY_COUNTERS)
+        self._push_logs()
+        cutoff = pagination.format_datetime(datetime.now(timezone.utc) - timedelta(days=LOCAL_LOG_DAYS))
+        self._write(SQL_PRUNE_LOGS, (cutoff,)).result()
+
+    def snapshot(self) -> dict:
+        reader = self._reader()
+        return {
+            "backend": self.name,
+            "path": self.path,
+            "writer": {**self._stats, "queued": self._queue.qsize()},
+            "pending": {
+                "users": reader.execute("SELECT count(*) FROM users WHERE version>pushedVersion").fetchone()[0],
+                "apiKeys": reader.execute("SELECT count(*) FROM api_keys WHERE version>pushedVersion").fetchone()[0],
+                "usageLogs": reader.execute("SELECT count(*) FROM usage_logs WHERE mirrored=0").fetchone()[0],
+            },
+            "mirror": dict(self._mirror),
+        }
+
+
+async def mirror_job() -> None:
+    """리더 싱글톤 작업 (STORAGE_BACKEND=sqlite일 때 leader.register_job으로 등록)"""
+    backend = storage.backend()
+    while True:
+        started = time.monotonic()
+        await asyncio.to_thread(backend.sync)
+        leader.publish_state(storage=backend.snapshot())
+        await asyncio.sleep(max(settings.STORAGE_SYNC_SECONDS - (time.monotonic() - started), 1.0))
@@ -0,0 +1,237 @@
+"""
+핫 경로 저장소 인터페이스 (인증 조회, 쿼터 카운터, 사용 로그)
+요청마다 도는 조회/갱신을 Storage 메서드로 모아 두고 STORAGE_BACKEND로 구현을 고릅니다.
+
+  pocketbase  기존 동작 — 모든 호출이 PocketBase REST 왕복 (기본값, 여러 호스트에 걸친 배포)
+  sqlite      단일 노드용 내장 SQLite(WAL) — app/services/sqlite_storage.py
+              users / api_keys는 PocketBase에서 읽어 와 로컬에 두고, 카운터와 usage_logs는 로컬에 먼저 기록한 뒤
+              리더 작업이 PocketBase로 일괄 반영 (관리자 화면/내보내기/롤업은 계속 PocketBase를 읽음)
+
+- 메서드는 모두 동기 함수 (스풀 재전송기/리더 작업처럼 이미 스레드에서 도는 쪽은 그대로 호출)
+- 이벤트 루프에서는 run()으로 호출 → 전용 스레드 풀(STORAGE_THREADS)에서 실행
+  asyncio.to_thread의 기본 풀은 내보내기/보존 정책/스풀 재전송 같은 긴 작업과 같이 쓰므로,
+  인증·쿼터 조회가 그 뒤에 줄 서지 않도록 분리
+- 반환 레코드는 pocketbase Record (기존 호출 쪽의 snake_case 속성 접근을 그대로 사용)
+"""
+import abc
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from pocketbase.models import Record
+from pocketbase.utils import ClientResponseError
+
+from app.config import settings
+from app.database import pb
+
+logger = logging.getLogger(__name__)
+
+
+class Rejected(Exception):
+    """저장소가 쓰기 자체를 거부 (대상 사용자/키 없음, 검증 오류 — 재시도해도 같은 결과)"""
+
+
+class Storage(abc.ABC):
+    """핫 경로 저장소. 날짜 인자는 UTC "YYYY-MM-DD" (today=None은 지난 날짜 항목 — 누적 카운터만)"""
+
+    name = ""
+    local = False  # 쓰기가 로컬 디스크에 바로 반영됨 (PocketBase 장애와 무관 → 스풀을 거치지 않음)
+
+    @abc.abstractmethod
+    def get_user(self, user_id: str) -> Record | None:
+        ...
+
+    @abc.abstractmethod
+    def find_api_key(self, key_hash: str) -> Record | None:
+        """활성 API 키 조회 (비활성/없음 → None)"""
+
+    @abc.abstractmethod
+    def add_user_usage(self, user_id: str, tokens: int, today: str | None) -> None:
+        """사용량 증분. today가 있으면 일일 사용량과 마지막 활동 시각도"""
+
+    @abc.abstractmethod
+    def add_key_usage(self, key_id: str, tokens: int, today: str | None) -> None:
+        """키 사용량 증분. today가 있으면 일일 카운터도 (오늘 첫 사용이면 이 요청 값으로 재설정)"""
+
+    @abc.abstractmethod
+    def reset_user_daily(self, user_id: str, today: str) -> bool:
+        """마지막 활동일이 오늘이 아니면 일일 사용량 초기화. 변경했으면 True"""
+
+    @abc.abstractmethod
+    def reset_all_daily(self, today: str) -> tuple[list[str], int]:
+        """오늘 활동이 없는 사용자/키의 일일 카운터 초기화 → (초기화한 사용자 id 목록, 초기화한 키 수)"""
+
+    @abc.abstractmethod
+    def insert_usage_log(self, record_id: str, fields: dict) -> None:
+        """usage_logs 기록 (같은 record_id는 한 번만)"""
+
+    def after_commit(self, callback) -> None:
+        """지금까지 요청한 쓰기가 반영된 뒤 callback() 실행 (캐시 무효화가 반영보다 앞서지 않도록)"""
+        callback()
+
+    def flush(self) -> None:
+        """대기 중인 쓰기를 모두 반영할 때까지 대기"""
+
+    def close(self) -> None:
+        pass
+
+    def snapshot(self) -> dict:
+        return {"backend": self.name}
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class PocketBaseStorage(Storage):
+    name = "pocketbase"
+
+    def get_user(self, user_id: str) -> Record | None:
+        try:
+            return pb.collection("users").get_one(user_id)
+        except ClientResponseError as e:
+            if e.status == 404:
+                return None
+            raise
+
+    def find_api_key(self, key_hash: str) -> Record | None:
+        results = pb.collection("api_keys").get_list(1, 1, {"filter": f'keyHash="{key_hash}" && isActive=true'})
+        return results.items[0] if results.items else None
+
+    def add_user_usage(self, user_id: str, tokens: int, today: str | None) -> None:
+        update = {"totalUsage+": tokens}
+        if today is not None:
+            update["dailyUsage+"] = tokens
+            update["lastActive"] = _now_iso()
+        try:
+            pb.collection("users").update(user_id, update)
+        except ClientResponseError as e:
+            if e.status == 404:
+                raise Rejected(f"user {user_id} not found")
+            raise
+
+    def add_key_usage(self, key_id: str, tokens: int, today: str | None) -> None:
+        if today is None:
+            update = {"totalUsedTokens+": tokens}
+        else:
+            try:
+                key_record = pb.collection("api_keys").get_one(key_id)
+            except ClientResponseError as e:
+                if e.status == 404:
+                    raise Rejected(f"api key {key_id} not found")
+                raise
+            last_reset = str(getattr(key_record, "lastResetDate", "") or getattr(key_record, "last_reset_date", "") or "")
+            if last_reset.startswith(today):
+                update = {"usedRequests+": 1, "usedTokens+": tokens, "totalUsedTokens+": tokens}
+            else:
+                update = {"usedRequests": 1, "usedTokens": tokens, "totalUsedTokens+": tokens, "lastResetDate": today}
+        try:
+            pb.collection("api_keys").update(key_id, update)
+        except ClientResponseError as e:
+            if e.status == 404:
+                raise Rejected(f"api key {key_id} not found")
+            raise
+
+    def reset_user_daily(self, user_id: str, today: str) -> bool:
+        record = pb.collection("users").get_one(user_id)
+        last_active = getattr(record, "lastActive", "") or getattr(record, "last_active", "") or ""
+        if last_active:
+            if str(last_active)[:10] == today:
+                return False
+            pb.collection("users").update(user_id, {"dailyUsage": 0, "lastActive": _now_iso()})
+        else:
+            pb.collection("users").update(user_id, {"lastActive": _now_iso()})
+        return True
+
+    def reset_all_daily(self, today: str) -> tuple[list[str], int]:
+        user_ids: list[str] = []
+        keys = 0
+        while True:
+            users = pb.collection("users").get_list(
+                1, 200, {"filter": f'dailyUsage>0 && lastActive<"{today} 00:00:00"'}
+            )
+            if not users.items:
+                break
+            for u in users.items:
+                pb.collection("users").update(u.id, {"dailyUsage": 0})
+                user_ids.append(u.id)
+
+        while True:
+            results = pb.collection("api_keys").get_list(
+                1, 200, {"filter": f'(usedRequests>0 || usedTokens>0) && lastResetDate<"{today} 00:00:00"'}
+            )
+            if not results.items:
+                break
+            for k in results.items:
+                pb.collection("api_keys").update(k.id, {
+                    "usedRequests": 0,
+                    "usedTokens": 0,
+                    "lastResetDate": today,
+                })
+                keys += 1
+        return user_ids, keys
+
+    def insert_usage_log(self, record_id: str, fields: dict) -> None:
+        try:
+            pb.collection("usage_logs").create({"id": record_id, **fields})
+        except ClientResponseError as e:
+            if e.status != 400:
+                raise
+            try:
+                pb.collection("usage_logs").get_one(record_id)  # 이미 생성됨 (이전 재전송이 응답 전에 끊긴 경우)
+            except ClientResponseError as e2:
+                if e2.status == 404:
+                    raise Rejected(f"usage_logs rejected: {e.data}")
+                raise
+
+
+# ── 선택 + 실행 ───────────────────────────────────────────────────
+
+_backend: Storage | None = None
+_backend_lock = threading.Lock()
+_executor: ThreadPoolExecutor | None = None
+
+
+def backend() -> Storage:
+    """STORAGE_BACKEND에 따른 저장소 (처음 호출 시 생성)"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if settings.STORAGE_BACKEND == "sqlite":
+                    from app.services.sqlite_storage import SQLiteStorage
+                    _backend = SQLiteStorage()
+                else:
+                    if settings.STORAGE_BACKEND != "pocketbase":
+                        logger.warning(f"Unknown STORAGE_BACKEND {settings.STORAGE_BACKEND!r}, using pocketbase")
+                    _backend = PocketBaseStorage()
+                logger.info(f"Storage backend: {_backend.name}")
+    return _backend
+
+
+async def run(func, *args):
+    """저장소 메서드를 전용 스레드 풀에서 실행 (contextvars 전달 — asyncio.to_thread와 같은 방식)"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.STORAGE_THREADS, thread_name_prefix="storage")
+    ctx = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(_executor, functools.partial(ctx.run, func, *args))
+
+
+def close() -> None:
+    """종료 시: 대기 중인 쓰기 반영 후 연결/스레드 정리"""
+    global _backend, _executor
+    if _backend is not None:
+        _backend.close()
+        _backend = None
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+def snapshot() -> dict:
+    return backend().snapshot()
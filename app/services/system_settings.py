@@ -0,0 +1,136 @@
+"""
+system_settings 스냅샷 — PocketBase system_settings 콜렉션(key → value)을 워커 메모리에 불변 매핑으로 유지
+Ollama URL 등 요청 경로에서 읽는 설정이 Redis 캐시가 식을 때마다 PocketBase를 조회하지 않도록:
+
+- 시작 시 한 번 전체 로드 (load), 이후 워커별 refresh_job이 SETTINGS_REFRESH_SECONDS마다 변경 여부만 확인
+  (가장 최근 updated(밀리초 원본 값) + 레코드 수 — 한 행짜리 조회. 바뀌었을 때만 전체 다시 로드)
+- 이 워커에서 저장한 값(put)은 PocketBase 반영 직후 스냅샷에 바로 적용, 다른 워커는 다음 확인 주기에 반영
+- 읽기(get / snapshot)는 잠금 없음 — 교체는 MappingProxyType 참조 하나를 바꾸는 것뿐
+- 값이 바뀌면 on_change로 등록한 리스너를 이벤트 루프에서 호출 (바뀐 키 → 새 값, 삭제된 키는 None)
+"""
+import asyncio
+import logging
+import threading
+import time
+from types import MappingProxyType
+from typing import Callable, Mapping
+
+from app.config import settings
+from app.database import pb
+
+logger = logging.getLogger(__name__)
+
+_snapshot: Mapping[str, str] = MappingProxyType({})
+_version: tuple | None = None  # (레코드 수, 가장 최근 updated, 그 id) — 마지막 로드 시점
+_write_lock = threading.Lock()
+_listeners: list[Callable[[dict], None]] = []
+_loop: asyncio.AbstractEventLoop | None = None
+_state = {"loadedAt": None, "reloads": 0, "lastError": None}
+
+
+def get(key: str, default: str | None = None) -> str | None:
+    return _snapshot.get(key, default)
+
+
+def snapshot() -> Mapping[str, str]:
+    """현재 스냅샷 (읽기 전용 매핑 — 보관해도 이후 변경의 영향을 받지 않음)"""
+    return _snapshot
+
+
+def on_change(callback: Callable[[dict], None]) -> None:
+    """값 변경 리스너 등록. callback({키: 새 값 | None})은 이벤트 루프 스레드에서 호출"""
+    _listeners.append(callback)
+
+
+def _notify(changed: dict) -> None:
+    for callback in _listeners:
+        try:
+            callback(changed)
+        except Exception as e:
+            logger.error(f"system_settings listener failed: {type(e).__name__}: {e}")
+
+
+def _publish(values: dict) -> None:
+    """새 스냅샷으로 교체하고 바뀐 키를 리스너에 전달 (_write_lock 보유 상태에서 호출)"""
+    global _snapshot
+    old = _snapshot
+    changed = {k: values.get(k) for k in old.keys() | values.keys() if old.get(k) != values.get(k)}
+    if not changed:
+        return
+    _snapshot = MappingProxyType(values)
+    if _loop is None or _loop.is_closed():
+        _notify(changed)
+    else:
+        _loop.call_soon_threadsafe(_notify, changed)
+
+
+def _current_version() -> tuple:
+    """(레코드 수, 가장 최근 updated, 그 레코드 id) — Record로 변환하면 updated가 초 단위로 잘리므로
+    pb.send로 원본 값(밀리초)을 받음 (같은 초 안의 두 번째 수정도 감지)"""
+    data = pb.send("/api/collections/system_settings/records", {
+        "method": "GET",
+        "params": {"page": 1, "perPage": 1, "sort": "-updated,-id", "fields": "id,updated"},
+    })
+    items = data.get("items") or []
+    newest = (items[0].get("updated", ""), items[0].get("id", "")) if items else ("", "")
+    return (data.get("totalItems", 0), *newest)
+
+
+def load() -> None:
+    """PocketBase에서 전체 다시 로드 (동기 — 스레드에서 호출)"""
+    global _version
+    version = _current_version()
+    records = pb.collection("system_settings").get_full_list(200)
+    values = {getattr(r, "key", ""): getattr(r, "value", "") or "" for r in records if getattr(r, "key", "")}
+    with _write_lock:
+        _publish(values)
+        _version = version
+    _state["reloads"] += 1
+
+
+def _refresh_if_changed() -> bool:
+    if _version is not None and _current_version() == _version:
+        return False
+    load()
+    return True
+
+
+async def refresh() -> bool:
+    """변경이 있으면 다시 로드. 다시 로드했으면 True (실패 시 이전 스냅샷 유지)"""
+    global _loop
+    _loop = asyncio.get_running_loop()
+    try:
+        reloaded = await asyncio.to_thread(_refresh_if_changed)
+    except Exception as e:
+        _state["lastError"] = f"{type(e).__name__}: {e}"
+        logger.warning(f"system_settings refresh failed, keeping previous snapshot: {_state['lastError']}")
+        return False
+    if reloaded:
+        _state["loadedAt"] = time.time()
+    _state["lastError"] = None
+    return reloaded
+
+
+def put(key: str, value: str, description: str = "") -> None:
+    """PocketBase에 저장하고 이 워커의 스냅샷에 바로 반영 (동기 — PocketBase 오류는 그대로 전달)"""
+    results = pb.collection("system_settings").get_list(1, 1, {"filter": f'key="{key}"'})
+    if results.items:
+        update = {"value": value}
+        if description:
+            update["description"] = description
+        pb.collection("system_settings").update(results.items[0].id, update)
+    else:
+        pb.collection("system_settings").create({"key": key, "value": value, "description": description})
+    with _write_lock:
+        _publish({**_snapshot, key: value})
+
+
+async def refresh_job() -> None:
+    """워커별 백그라운드 작업: 주기적으로 변경 확인 (첫 로드는 lifespan에서 refresh())"""
+    while True:
+        await asyncio.sleep(settings.SETTINGS_REFRESH_SECONDS)
+        await refresh()
+
+
+def stats() -> dict:
+    return {"keys": len(_snapshot), **_state}
@@ -0,0 +1,100 @@
+"""
+요청 단위 구간 측정 (Server-Timing)
+요청이 느릴 때 인증, 일일 리셋, Ollama 대기, 쿼터 차감, 사용 로그 중 어디서 시간이 갔는지 확인용.
+
+- RequestLoggerMiddleware가 요청마다 begin()으로 측정 객체를 만들고 contextvar에 둠
+  (엔드포인트 태스크와 스레드풀 실행에도 컨텍스트가 복사되므로 같은 객체에 누적)
+- 코드에서는 `with timing.span("upstream"):` 또는 `@timing.timed("auth")`로 구간 표시
+  같은 이름이 여러 번 나오면 합산 (예: 배치 안의 여러 upstream 호출)
+- 응답 헤더: Server-Timing: auth;dur=1.2, upstream;dur=812.4, total;dur=815.0
+  스트리밍 응답은 헤더 시점(첫 바이트 전)까지의 구간만 담기고, 전체 구간은 스트림 종료 시 로그로 남김
+- 요청 컨텍스트 밖(백그라운드 작업 등)에서는 아무것도 하지 않음
+"""
+import contextvars
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+
+
+class RequestTiming:
+    __slots__ = ("request_id", "start", "spans")
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.start = time.perf_counter()
+        self.spans: dict[str, list] = {}  # 이름 → [누적 ms, 횟수]
+
+    def add(self, name: str, ms: float) -> None:
+        entry = self.spans.get(name)
+        if entry is None:
+            self.spans[name] = [ms, 1]
+        else:
+            entry[0] += ms
+            entry[1] += 1
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+    def header(self) -> str:
+        parts = [f"{name};dur={ms:.1f}" for name, (ms, _) in self.spans.items()]
+        parts.append(f"total;dur={self.total_ms():.1f}")
+        return ", ".join(parts)
+
+    def summary(self) -> dict:
+        """구조화 로그용 {이름: ms} (여러 번 호출된 구간은 {이름}_n에 횟수)"""
+        out = {}
+        for name, (ms, count) in self.spans.items():
+            out[name] = round(ms, 1)
+            if count > 1:
+                out[f"{name}_n"] = count
+        return out
+
+
+_current: contextvars.ContextVar[RequestTiming | None] = contextvars.ContextVar("request_timing", default=None)
+
+
+def begin(request_id: str) -> RequestTiming:
+    timing = RequestTiming(request_id)
+    _current.set(timing)
+    return timing
+
+
+def current() -> RequestTiming | None:
+    return _current.get()
+
+
+def request_id() -> str:
+    timing = _current.get()
+    return timing.request_id if timing else ""
+
+
+@contextmanager
+def span(name: str):
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, (time.perf_counter() - start) * 1000)
+
+
+def timed(name: str):
+    """함수 전체를 구간으로 측정하는 데코레이터 (sync/async 모두, FastAPI 의존성 시그니처 유지)"""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
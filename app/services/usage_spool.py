@@ -0,0 +1,377 @@
+"""
+사용량/쿼터 차감 로컬 스풀 (추가 전용 로그 → PocketBase 재전송)
+PocketBase가 잠깐 끊기면 usage_logs 생성과 쿼터 차감이 예외로 버려져 과금 기록이 영구히 사라지므로,
+요청 경로에서는 로컬 스풀에 먼저 추가하고 백그라운드 재전송기가 PocketBase에 반영합니다.
+
+저장 구조 ({DATA_DIR}/spool/{pid}-{시작시각}/ — 워커별 디렉터리):
+  .lock             소유 워커가 살아있는 동안 flock 보유
+  seg-{n}.log       추가 전용 세그먼트 (한 줄 = 항목 하나 {"id", "kind", "ts", "requestId", "body"}), SPOOL_SEGMENT_BYTES마다 교체
+  acks.log          반영 완료 단계 "{kind}:{id}:{단계}" (디렉터리 전체 공용, 한 항목이 여러 단계면 단계별로 기록)
+  dead.jsonl        PocketBase가 거부한 항목 (검증 오류, 삭제된 사용자 등 — 재시도해도 실패하는 경우)
+
+- 기록: submit()은 메모리 버퍼에만 추가, SPOOL_FSYNC_MS마다 모아서 write + fsync (그룹 커밋)
+  → 프로세스가 죽으면 최대 한 주기분만 유실될 수 있음
+- 재전송: 세그먼트를 순서대로 읽어 kind별 등록된 단계(register)를 실행, 실패하면 그 항목에서 멈추고 백오프 후 재시도
+- 멱등성: 항목 id는 submit()마다 서버에서 생성 (pid + 순번 + uuid4). 클라이언트가 정하는 X-Request-ID는
+  requestId 필드로만 남김 — 같은 요청 ID를 반복해 보내도 차감/로그가 중복으로 취급되어 빠지지 않도록.
+  usage_logs는 항목 id 해시를 레코드 id로 생성해 재전송 시 중복 생성이 400으로 막히고,
+  증분 갱신 단계는 acks.log에 기록된 단계를 다시 실행하지 않음
+  (단계 반영 직후 acks.log fsync 전에 죽는 경우만 재실행될 수 있음 — 배치 단위로 fsync)
+- acks.log는 세그먼트를 삭제할 때 그 세그먼트 항목의 키를 걸러 다시 씀
+- 다 반영된 세그먼트는 삭제. 종료된 워커의 디렉터리는 flock을 잡을 수 있으므로 다른 워커가 넘겨받아 재전송 후 삭제
+- 로컬 저장소(STORAGE_BACKEND=sqlite)는 자체 그룹 커밋으로 바로 기록되므로 스풀을 거치지 않음
+"""
+import asyncio
+import glob
+import hashlib
+import itertools
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Callable
+
+from app.config import settings
+from app.services import storage, timing
+
+try:
+    import fcntl
+except ImportError:  # 파일 락 미지원 → 다른 워커 디렉터리는 넘겨받지 않음
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_MAX_SECONDS = 30.0
+
+
+class Rejected(Exception):
+    """PocketBase가 항목 자체를 거부 (재시도해도 같은 결과) → dead.jsonl로 옮기고 다음 항목 진행"""
+
+
+_handlers: dict[str, list[tuple[str, Callable[[dict], None]]]] = {}  # kind → [(단계 이름, 함수)]
+_lock = threading.Lock()
+_buffer: list[str] = []
+_replay_lock = threading.Lock()
+_dir: str | None = None
+_lock_file = None
+_segment = {"n": 0, "size": 0}
+_readers: dict[str, dict] = {}  # 세그먼트 경로 → {"pos": 반영을 마친 위치}
+_acks: dict[str, set[str]] = {}  # 스풀 디렉터리 → 완료 단계 set
+_seq = itertools.count()
+_adopted: dict[str, object] = {}  # 넘겨받은 디렉터리 → flock 파일
+_state = {"oldestTs": None, "failing": False, "lastError": "", "backoff": 0.0}
+_stats = {"appended": 0, "committed": 0, "delivered": 0, "failures": 0, "deadLetters": 0, "fsyncs": 0}
+
+
+def register(kind: str, steps: list[tuple[str, Callable[[dict], None]]]) -> None:
+    """항목 종류별 반영 단계 등록. 각 단계는 entry를 받아 PocketBase에 반영 (실패 시 예외, 영구 거부는 Rejected)"""
+    _handlers[kind] = steps
+
+
+def record_id(kind: str, entry_id: str) -> str:
+    """항목 → PocketBase 레코드 id (15자, [a-z0-9]) — 같은 요청을 다시 보내도 같은 id"""
+    return hashlib.sha1(f"{kind}:{entry_id}".encode()).hexdigest()[:15]
+
+
+def _root() -> str:
+    return os.path.join(settings.DATA_DIR, "spool")
+
+
+def _segment_path(directory: str, n: int) -> str:
+    return os.path.join(directory, f"seg-{n:08d}.log")
+
+
+def _open_dir() -> str:
+    """이 워커의 스풀 디렉터리 생성 + flock (처음 기록할 때 한 번)"""
+    global _dir, _lock_file
+    if _dir is None:
+        directory = os.path.join(_root(), f"{os.getpid()}-{int(time.time() * 1000)}")
+        os.makedirs(directory, exist_ok=True)
+        _lock_file = open(os.path.join(directory, ".lock"), "a+")
+        if fcntl is not None:
+            fcntl.flock(_lock_file.fileno(), fcntl.LOCK_EX)
+        _dir = directory
+    return _dir
+
+
+# ── 기록 ──────────────────────────────────────────────────────────
+
+def submit(kind: str, body: dict) -> None:
+    """반영할 항목 추가. 스풀이 꺼져 있거나 저장소가 로컬이면 바로 반영 (기존처럼 실패는 로그만)"""
+    entry = {
+        "id": f"{os.getpid():x}-{next(_seq):x}-{uuid.uuid4().hex}",
+        "kind": kind,
+        "ts": time.time(),
+        "requestId": timing.request_id(),
+        "body": body,
+    }
+    if not settings.SPOOL_ENABLED or storage.backend().local:
+        try:
+            for _, step in _handlers[kind]:
+                step(entry)
+        except Exception as e:
+            logger.warning(f"Usage write failed ({kind}/{entry['id']}): {type(e).__name__}: {e}")
+        return
+    line = json.dumps(entry, separators=(",", ":")) + "\n"
+    with _lock:
+        _buffer.append(line)
+        _stats["appended"] += 1
+        if _state["oldestTs"] is None:
+            _state["oldestTs"] = entry["ts"]
+
+
+def commit() -> int:
+    """버퍼를 현재 세그먼트에 기록 + fsync. 기록한 항목 수 반환"""
+    global _buffer
+    with _lock:
+        lines, _buffer = _buffer, []
+    if not lines:
+        return 0
+    try:
+        directory = _open_dir()
+        data = "".join(lines).encode()
+        if _segment["size"] and _segment["size"] + len(data) > settings.SPOOL_SEGMENT_BYTES:
+            _segment.update(n=_segment["n"] + 1, size=0)
+        with open(_segment_path(directory, _segment["n"]), "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        _segment["size"] += len(data)
+    except OSError as e:
+        # 디스크 기록 실패 → 버퍼에 되돌려 다음 주기에 재시도 (메모리에는 남아 있음)
+        with _lock:
+            _buffer = lines + _buffer
+        logger.error(f"Spool write failed: {e}")
+        return 0
+    _stats["committed"] += len(lines)
+    _stats["fsyncs"] += 1
+    return len(lines)
+
+
+# ── 재전송 ────────────────────────────────────────────────────────
+
+def _load_reader(path: str) -> dict:
+    reader = _readers.get(path)
+    if reader is None:
+        reader = _readers[path] = {"pos": 0}
+    return reader
+
+
+def _ack_path(directory: str) -> str:
+    return os.path.join(directory, "acks.log")
+
+
+def _load_acks(directory: str) -> set[str]:
+    acked = _acks.get(directory)
+    if acked is None:
+        acked = _acks[directory] = set()
+        # seg-{n}.ack: 세그먼트별 ack를 쓰던 이전 버전이 남긴 디렉터리
+        for path in [_ack_path(directory), *glob.glob(os.path.join(directory, "seg-*.ack"))]:
+            try:
+                with open(path) as f:
+                    acked.update(line.strip() for line in f if line.strip())
+            except FileNotFoundError:
+                pass
+    return acked
+
+
+def _write_acks(directory: str, keys: list[str]) -> None:
+    if not keys:
+        return
+    with open(_ack_path(directory), "a") as f:
+        f.write("".join(k + "\n" for k in keys))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _drop_segment(directory: str, path: str) -> None:
+    """다 반영된 세그먼트 삭제 + 그 항목들의 ack를 acks.log에서 제거"""
+    ids = set()
+    with open(path, "rb") as f:
+        for raw in f:
+            if raw.endswith(b"\n"):
+                ids.add(json.loads(raw)["id"])
+    acked = _load_acks(directory)
+    acked.difference_update({k for k in acked if k.split(":", 2)[1] in ids})
+    tmp = _ack_path(directory) + ".tmp"
+    with open(tmp, "w") as f:
+        f.write("".join(k + "\n" for k in acked))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, _ack_path(directory))
+    os.remove(path)
+    try:
+        os.remove(path[:-4] + ".ack")
+    except FileNotFoundError:
+        pass
+    _readers.pop(path, None)
+
+
+def _dead_letter(directory: str, entry: dict, error: Exception) -> None:
+    with open(os.path.join(directory, "dead.jsonl"), "a") as f:
+        f.write(json.dumps({**entry, "error": str(error)}) + "\n")
+    _stats["deadLetters"] += 1
+    logger.error(f"Spool entry rejected ({entry.get('kind')}/{entry.get('id')}): {error}")
+
+
+def _deliver(entry: dict, acked: set[str], new_acks: list[str]) -> None:
+    """항목 하나의 남은 단계 실행 (실패 시 예외 → 이미 끝난 단계는 new_acks에 남아 있음)"""
+    for name, step in _handlers.get(entry["kind"], []):
+        key = f"{entry['kind']}:{entry['id']}:{name}"
+        if key in acked:
+            continue
+        step(entry)
+        acked.add(key)
+        new_acks.append(key)
+
+
+def _replay_segment(directory: str, path: str, active: bool) -> bool:
+    """세그먼트 하나 재전송. 끝까지 반영했으면 True (실패로 멈추면 False)"""
+    reader = _load_reader(path)
+    acked = _load_acks(directory)
+    new_acks: list[str] = []
+    ok = True
+    try:
+        with open(path, "rb") as f:
+            f.seek(reader["pos"])
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # 기록 중인 마지막 줄
+                entry = json.loads(raw)
+                try:
+                    _deliver(entry, acked, new_acks)
+                    _stats["delivered"] += 1
+                except Rejected as e:
+                    _dead_letter(directory, entry, e)
+                except Exception as e:
+                    _state["lastError"] = f"{type(e).__name__}: {e}"
+                    _state["oldestTs"] = entry["ts"]
+                    _stats["failures"] += 1
+                    ok = False
+                    break
+                reader["pos"] += len(raw)
+                if len(new_acks) >= settings.SPOOL_REPLAY_BATCH:
+                    _write_acks(directory, new_acks)
+                    new_acks = []
+    finally:
+        _write_acks(directory, new_acks)
+
+    if ok and not active and reader["pos"] >= os.path.getsize(path):
+        _drop_segment(directory, path)
+    return ok
+
+
+def _adopt_orphans() -> None:
+    """종료된 워커의 스풀 디렉터리 넘겨받기 (flock을 잡을 수 있으면 소유자가 없는 것)"""
+    if fcntl is None:
+        return
+    for directory in glob.glob(os.path.join(_root(), "*")):
+        if directory == _dir or directory in _adopted or not os.path.isdir(directory):
+            continue
+        try:
+            f = open(os.path.join(directory, ".lock"), "a+")
+        except OSError:
+            continue
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            continue
+        _adopted[directory] = f
+        logger.info(f"Adopted spool directory {directory}")
+
+
+def _replay_dir(directory: str, own: bool) -> bool:
+    for path in sorted(glob.glob(os.path.join(directory, "seg-*.log"))):
+        active = own and path == _segment_path(directory, _segment["n"])
+        if not _replay_segment(directory, path, active):
+            return False
+    if not own and not glob.glob(os.path.join(directory, "seg-*.log")):
+        dead = os.path.join(directory, "dead.jsonl")
+        if os.path.exists(dead):
+            # 거부된 항목은 지우지 않고 스풀 루트에 모아 둠
+            with open(dead) as src, open(os.path.join(_root(), "dead.jsonl"), "a") as dst:
+                shutil.copyfileobj(src, dst)
+        _adopted.pop(directory).close()
+        _acks.pop(directory, None)
+        shutil.rmtree(directory, ignore_errors=True)
+    return True
+
+
+def replay() -> bool:
+    """넘겨받은 디렉터리 → 이 워커 디렉터리 순으로 재전송. 모두 반영했으면 True"""
+    with _replay_lock:
+        if not os.path.isdir(_root()):
+            return True
+        _adopt_orphans()
+        ok = True
+        for directory in list(_adopted):
+            if not _replay_dir(directory, own=False):
+                ok = False
+                break
+        if ok and _dir is not None:
+            ok = _replay_dir(_dir, own=True)
+        if ok:
+            with _lock:
+                _state["oldestTs"] = json.loads(_buffer[0])["ts"] if _buffer else None
+        _state["failing"] = not ok
+        return ok
+
+
+async def run() -> None:
+    """워커별 백그라운드 작업 (lifespan에서 시작): 그룹 커밋 + 재전송"""
+    last_replay = 0.0
+    try:
+        while True:
+            await asyncio.sleep(settings.SPOOL_FSYNC_MS / 1000)
+            await asyncio.to_thread(commit)
+            if time.monotonic() - last_replay < _state["backoff"]:
+                continue
+            last_replay = time.monotonic()
+            try:
+                ok = await asyncio.to_thread(replay)
+            except Exception as e:
+                ok = False
+                logger.error(f"Spool replay failed: {type(e).__name__}: {e}")
+            if ok:
+                _state["backoff"] = 0.0
+            else:
+                _state["backoff"] = min(max(_state["backoff"] * 2, 1.0), BACKOFF_MAX_SECONDS)
+    finally:
+        commit()  # 종료 시 남은 버퍼 기록 (반영은 다음 실행 때 넘겨받은 워커가)
+
+
+# ── 지표 ──────────────────────────────────────────────────────────
+
+def snapshot() -> dict:
+    """스풀 깊이(미반영 항목/바이트)와 지연(가장 오래된 미반영 항목의 경과 시간)"""
+    with _lock:
+        buffered = len(_buffer)
+        oldest = _state["oldestTs"]
+    depth_bytes = 0
+    segments = 0
+    for path in glob.glob(os.path.join(_root(), "*", "seg-*.log")):
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            continue
+        reader = _readers.get(path)
+        depth_bytes += size - (reader["pos"] if reader else 0)
+        segments += 1
+    pending = _stats["committed"] - _stats["delivered"] - _stats["deadLetters"]  # 넘겨받은 항목이 섞이면 근사값
+    return {
+        "enabled": settings.SPOOL_ENABLED,
+        "depthEntries": buffered + max(pending, 0),
+        "depthBytes": depth_bytes,
+        "bufferedEntries": buffered,
+        "segments": segments,
+        "adoptedDirs": len(_adopted),
+        "lagSeconds": round(time.time() - oldest, 3) if oldest else 0.0,
+        "failing": _state["failing"],
+        "backoffSeconds": _state["backoff"],
+        "lastError": _state["lastError"],
+        **_stats,
+    }
@@ -0,0 +1,462 @@
+"""
+로컬 컬럼형 사용량 저장소 — 시간 범위 분석 쿼리용
+usage_logs(PocketBase)와 별도로 사용 1건을 로컬 디스크의 컬럼 파일에도 추가해 두고,
+관리자 분석 쿼리(기간 + 그룹별 집계 + 지연시간 백분위)를 PocketBase 행 조회 없이 처리합니다.
+
+저장 구조 ({DATA_DIR}/usage_store/):
+  {YYYY-MM-DD}/{pid}-{시작시각}/   ← 날짜 파티션 / 워커별 세그먼트 (세그먼트당 쓰는 프로세스는 하나 → 락 불필요)
+    ts.col          float64  요청 종료 시각 (epoch 초, UTC)
+    model.col       uint32   모델        ┐
+    key.col         uint32   API 키 id    │ 사전 인코딩 코드 → {컬럼}.dict의 줄 번호
+    user.col        uint32   사용자 id    │
+    endpoint.col    uint32   엔드포인트   ┘
+    status.col      uint16   HTTP 상태 코드
+    prompt.col      uint32   프롬프트 토큰
+    completion.col  uint32   생성 토큰
+    latency.col     uint32   응답 시간 (ms)
+    error.col       uint8    오류 여부
+    {컬럼}.dict     사전 (한 줄에 값 하나, 추가 전용)
+    unordered       ts가 기록 순서대로 오름차순이 아닌 행이 있으면 생성되는 표시 파일 (내용 없음)
+
+- 고정 폭 배열(array)을 이어 붙인 파일이라 읽기는 mmap + memoryview.cast로 복사 없이 컬럼을 그대로 사용
+  (바이트 순서는 기록한 머신 기준 — 다른 아키텍처로 옮기지 않음)
+- 요청 경로는 메모리 버퍼에만 추가하고, 워커별 백그라운드 작업이 USAGE_STORE_FLUSH_SECONDS마다 파일에 기록
+  (사전 → 컬럼 순으로 기록하므로 읽는 쪽은 항상 코드에 해당하는 사전 값을 찾을 수 있음)
+- 기록 도중 읽으면 컬럼 길이가 다를 수 있어 가장 짧은 컬럼 길이까지만 사용
+- USAGE_STORE_RETENTION_DAYS가 지난 날짜 파티션은 리더의 보존 작업(retention.py)이 디렉터리째 삭제 (prune)
+  읽는 도중 지워진 세그먼트는 빈 세그먼트로 취급
+- ts는 append가 잠금 안에서 찍으므로 세그먼트 안에서 오름차순 → 범위 경계는 이분 탐색으로 정확히 구함
+  호출자가 ts를 넘겨 순서가 어긋난 세그먼트(unordered 표시)만 전체를 읽어 ts를 비교
+- 필터/집계는 행마다 파이썬 코드를 돌리지 않음: 조건 비교는 map(값.__eq__, 컬럼 슬라이스) + itertools.compress,
+  그룹은 행 번호를 그룹 키로 정렬해 groupby로 묶은 뒤 그룹별로 컬럼 값을 모아 sum — 파이썬 수준 반복은 그룹 수만큼
+  (일/시간 그룹은 ts // 86400, ts // 3600 정수로 묶고 문자열 변환은 그룹마다 한 번)
+"""
+import asyncio
+import bisect
+import itertools
+import logging
+import mmap
+import operator
+import os
+import re
+import shutil
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta, timezone
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = {
+    "ts": "d",
+    "model": "I",
+    "key": "I",
+    "user": "I",
+    "endpoint": "I",
+    "status": "H",
+    "prompt": "I",
+    "completion": "I",
+    "latency": "I",
+    "error": "B",
+}
+DICT_COLUMNS = ("model", "key", "user", "endpoint")
+GROUP_BY = ("model", "key", "user", "endpoint", "status", "day", "hour")
+DEFAULT_PERCENTILES = (50, 95, 99)
+_UINT32_MAX = 0xFFFFFFFF
+_DAY_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_DAY = 86400.0
+_HOUR = 3600.0
+
+_lock = threading.Lock()
+_segments: dict[str, "_Segment"] = {}  # 날짜 → 이 워커의 세그먼트
+_stats = {"appended": 0, "flushedRows": 0, "flushes": 0, "writeErrors": 0}
+
+
+def _root() -> str:
+    return os.path.join(settings.DATA_DIR, "usage_store")
+
+
+def _day_of(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d")
+
+
+# ── 쓰기 ──────────────────────────────────────────────────────────
+
+class _Segment:
+    """이 워커가 하루 파티션에 쓰는 세그먼트 (메모리 버퍼 + 사전)"""
+
+    def __init__(self, day: str):
+        self.path = os.path.join(_root(), day, f"{os.getpid()}-{int(time.time() * 1000)}")
+        self.codes: dict[str, dict[str, int]] = {name: {} for name in DICT_COLUMNS}
+        self.new_values: dict[str, list[str]] = {name: [] for name in DICT_COLUMNS}
+        self.buffers = {name: array(code) for name, code in COLUMNS.items()}
+        self.last_ts = 0.0
+        self.ordered = True  # 지금까지 추가한 ts가 오름차순인지
+        self.marked = False  # unordered 표시 파일을 만들었는지
+
+    def encode(self, column: str, value: str) -> int:
+        codes = self.codes[column]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+            self.new_values[column].append(value)
+        return code
+
+    def flush(self) -> int:
+        """버퍼를 파일에 추가 (_lock 보유 상태에서 호출). 기록한 행 수 반환"""
+        rows = len(self.buffers["ts"])
+        if not rows:
+            return 0
+        os.makedirs(self.path, exist_ok=True)
+        if not self.ordered and not self.marked:
+            # 컬럼보다 먼저 기록 — 어긋난 행을 읽을 수 있는 시점에는 항상 표시가 보임
+            open(os.path.join(self.path, "unordered"), "w").close()
+            self.marked = True
+        for name, values in self.new_values.items():
+            if values:
+                with open(os.path.join(self.path, f"{name}.dict"), "a", encoding="utf-8") as f:
+                    f.write("".join(v + "\n" for v in values))
+                values.clear()
+        for name, buffer in self.buffers.items():
+            with open(os.path.join(self.path, f"{name}.col"), "ab") as f:
+                buffer.tofile(f)
+            del buffer[:]
+        return rows
+
+
+def _clean(value: str) -> str:
+    return (value or "").replace("\n", " ").replace("\r", " ")
+
+
+def append(
+    user_id: str, api_key_id: str, model: str, endpoint: str, status_code: int,
+    prompt_tokens: int, completion_tokens: int, response_time_ms: int, is_error: bool,
+    ts: float | None = None,
+) -> None:
+    """사용 1건을 메모리 버퍼에 추가 (_log_usage에서 호출, I/O 없음)"""
+    if not settings.USAGE_STORE_ENABLED:
+        return
+    with _lock:
+        ts = time.time() if ts is None else ts  # 잠금 안에서 찍어야 세그먼트 안 ts가 오름차순
+        day = _day_of(ts)
+        segment = _segments.get(day)
+        if segment is None:
+            segment = _segments[day] = _Segment(day)
+        if ts < segment.last_ts:
+            segment.ordered = False
+        else:
+            segment.last_ts = ts
+        b = segment.buffers
+        b["ts"].append(ts)
+        b["model"].append(segment.encode("model", _clean(model)))
+        b["key"].append(segment.encode("key", _clean(api_key_id)))
+        b["user"].append(segment.encode("user", _clean(user_id)))
+        b["endpoint"].append(segment.encode("endpoint", _clean(endpoint)))
+        b["status"].append(min(max(int(status_code), 0), 0xFFFF))
+        b["prompt"].append(min(max(int(prompt_tokens), 0), _UINT32_MAX))
+        b["completion"].append(min(max(int(completion_tokens), 0), _UINT32_MAX))
+        b["latency"].append(min(max(int(response_time_ms), 0), _UINT32_MAX))
+        b["error"].append(1 if is_error else 0)
+        _stats["appended"] += 1
+
+
+def flush() -> int:
+    """모든 세그먼트 버퍼를 파일에 기록. 기록한 행 수 반환.
+    기록에 실패한 세그먼트는 컬럼 길이가 어긋났을 수 있으므로 버퍼와 함께 버리고, 다음 행부터 새 세그먼트에 기록"""
+    total = 0
+    today = _day_of(time.time())
+    with _lock:
+        for day, segment in list(_segments.items()):
+            try:
+                total += segment.flush()
+            except OSError as e:
+                _stats["writeErrors"] += 1
+                logger.warning(f"Usage store write failed ({segment.path}): {e}")
+                del _segments[day]
+                continue
+            if day < today:
+                del _segments[day]  # 지난 날짜 파티션은 닫음 (늦게 도착한 행은 새 세그먼트로)
+        _stats["flushedRows"] += total
+        _stats["flushes"] += 1
+    return total
+
+
+async def flush_job() -> None:
+    """워커별 백그라운드 작업 (lifespan에서 시작)"""
+    try:
+        while True:
+            await asyncio.sleep(settings.USAGE_STORE_FLUSH_SECONDS)
+            await asyncio.to_thread(flush)
+    finally:
+        flush()  # 종료 시 남은 버퍼 기록
+
+
+def prune(days: int) -> int:
+    """보존 기간(days일)이 지난 날짜 파티션 삭제 (동기 — 스레드에서 호출). 삭제한 파티션 수 반환"""
+    cutoff = _day_of(time.time() - days * 86400)
+    try:
+        names = os.listdir(_root())
+    except FileNotFoundError:
+        return 0
+    removed = 0
+    for name in sorted(names):
+        if _DAY_RE.match(name) and name < cutoff:
+            shutil.rmtree(os.path.join(_root(), name), ignore_errors=True)
+            removed += 1
+    return removed
+
+
+def stats() -> dict:
+    with _lock:
+        buffered = sum(len(s.buffers["ts"]) for s in _segments.values())
+    return {**_stats, "buffered": buffered}
+
+
+# ── 읽기 ──────────────────────────────────────────────────────────
+
+class _SegmentReader:
+    """세그먼트 파일을 mmap으로 열어 컬럼별 memoryview 제공"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._maps: list[mmap.mmap] = []
+        self._views: list[memoryview] = []
+        self.columns: dict[str, memoryview] = {}
+        self.rows = 0
+        self.ordered = True
+
+    def __enter__(self):
+        sizes = {}
+        for name, code in COLUMNS.items():
+            try:
+                sizes[name] = os.path.getsize(os.path.join(self.path, f"{name}.col")) // array(code).itemsize
+            except FileNotFoundError:
+                sizes[name] = 0
+        self.rows = min(sizes.values())
+        self.ordered = not os.path.exists(os.path.join(self.path, "unordered"))
+        if not self.rows:
+            return self
+        for name, code in COLUMNS.items():
+            width = array(code).itemsize
+            try:
+                with open(os.path.join(self.path, f"{name}.col"), "rb") as f:
+                    mm = mmap.mmap(f.fileno(), self.rows * width, access=mmap.ACCESS_READ)
+            except FileNotFoundError:  # 보존 작업이 파티션을 지움
+                self.__exit__()
+                self.rows = 0
+                return self
+            self._maps.append(mm)
+            self._views.append(memoryview(mm))
+            self.columns[name] = self._views[-1].cast(code)
+        return self
+
+    def __exit__(self, *exc):
+        for view in [*self.columns.values(), *self._views]:
+            view.release()
+        self.columns.clear()
+        self._views.clear()
+        for mm in self._maps:
+            mm.close()
+        self._maps.clear()
+
+    def dictionary(self, column: str) -> list[str]:
+        try:
+            with open(os.path.join(self.path, f"{column}.dict"), encoding="utf-8") as f:
+                return f.read().split("\n")[:-1]
+        except FileNotFoundError:
+            return []
+
+
+def _partitions(start: float, end: float) -> list[str]:
+    """[start, end) 구간에 걸친 세그먼트 경로 목록"""
+    root = _root()
+    try:
+        days = set(os.listdir(root))
+    except FileNotFoundError:
+        return []
+    paths = []
+    day = datetime.fromtimestamp(start, timezone.utc).date()
+    last = datetime.fromtimestamp(max(end - 1e-6, start), timezone.utc).date()
+    while day <= last:
+        name = day.isoformat()
+        if name in days:
+            day_path = os.path.join(root, name)
+            try:
+                paths.extend(os.path.join(day_path, seg) for seg in sorted(os.listdir(day_path)))
+            except FileNotFoundError:
+                pass
+        day += timedelta(days=1)
+    return paths
+
+
+def _row_range(ts: memoryview, start: float, end: float, ordered: bool) -> tuple[int, int]:
+    """ts가 [start, end)인 행 범위 — 오름차순 세그먼트는 이분 탐색으로 정확히, 아니면 세그먼트 전체"""
+    if not ordered:
+        return 0, len(ts)
+    lo = bisect.bisect_left(ts, start)
+    return lo, bisect.bisect_left(ts, end, lo)
+
+
+def _select(cols: dict[str, memoryview], lo: int, hi: int, conditions: list) -> list[int] | None:
+    """[lo, hi) 안에서 모든 조건을 만족하는 행 번호(lo 기준) 목록. 조건이 없으면 None (전체 행).
+
+    conditions: (컬럼, 비교 함수) — 비교 함수는 값.__eq__ 같은 C 메서드라 map이 행마다 파이썬 코드를 실행하지 않음
+    """
+    if not conditions:
+        return None
+    masks = [map(test, cols[name][lo:hi]) for name, test in conditions]
+    mask = masks[0]
+    for other in masks[1:]:
+        mask = map(operator.and_, mask, other)
+    return list(itertools.compress(range(hi - lo), mask))
+
+
+def _group_keys(cols: dict[str, memoryview], lo: int, hi: int, group_by: list[str]) -> list:
+    """행별 그룹 키 (세그먼트 안의 코드 — 사전 코드, 상태 코드, ts // 86400 또는 3600)"""
+    columns = []
+    for name in group_by:
+        if name == "day":
+            columns.append(list(map(_DAY.__rfloordiv__, cols["ts"][lo:hi])))
+        elif name == "hour":
+            columns.append(list(map(_HOUR.__rfloordiv__, cols["ts"][lo:hi])))
+        else:
+            columns.append(cols[name][lo:hi].tolist())
+    return columns[0] if len(columns) == 1 else list(zip(*columns))
+
+
+def _label(name: str, code, dicts: dict[str, list[str]]):
+    """그룹 키 코드 → 응답에 쓰는 값"""
+    if name in DICT_COLUMNS:
+        lookup = dicts[name]
+        return lookup[code] if code < len(lookup) else ""
+    if name == "day":
+        return time.strftime("%Y-%m-%d", time.gmtime(code * _DAY))
+    if name == "hour":
+        return time.strftime("%Y-%m-%d %H:00", time.gmtime(code * _HOUR))
+    return code
+
+
+def _accumulate(acc: dict, cols: dict[str, memoryview], lo: int, hi: int, members: list[int] | None) -> None:
+    """그룹에 속한 행(members, None이면 [lo, hi) 전체)의 값을 더함"""
+    if members is None:
+        values = {name: cols[name][lo:hi] for name in ("prompt", "completion", "latency", "error")}
+        acc["requests"] += hi - lo
+        acc["latencies"].frombytes(values["latency"].tobytes())
+    else:
+        values = {name: list(map(cols[name][lo:hi].__getitem__, members))
+                  for name in ("prompt", "completion", "latency", "error")}
+        acc["requests"] += len(members)
+        acc["latencies"].extend(values["latency"])
+    acc["errors"] += sum(values["error"])
+    acc["promptTokens"] += sum(values["prompt"])
+    acc["completionTokens"] += sum(values["completion"])
+
+
+def _percentile(sorted_values: array, p: float) -> int:
+    """최근접 순위(nearest-rank) 백분위"""
+    if not sorted_values:
+        return 0
+    rank = max(int(-(-p * len(sorted_values) // 100)), 1)  # ceil
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def query(
+    start: float, end: float,
+    group_by: list[str] | None = None,
+    filters: dict[str, str] | None = None,
+    percentiles: tuple[float, ...] = DEFAULT_PERCENTILES,
+) -> dict:
+    """[start, end) 구간 사용량을 group_by별로 집계. 파일 I/O가 있으므로 asyncio.to_thread로 호출.
+
+    filters: {"model"|"key"|"user"|"endpoint": 값, "status": 코드} — 모두 일치하는 행만
+    """
+    started = time.perf_counter()
+    group_by = list(group_by or [])
+    filters = {k: v for k, v in (filters or {}).items() if v not in (None, "")}
+    groups: dict[tuple, dict] = {}
+    scanned = 0
+    segments = 0
+
+    for path in _partitions(start, end):
+        with _SegmentReader(path) as seg:
+            if not seg.rows:
+                continue
+            segments += 1
+            cols = seg.columns
+            dicts = {name: seg.dictionary(name) for name in DICT_COLUMNS if name in group_by or name in filters}
+
+            # 사전 컬럼 필터는 값 → 코드로 바꿔 정수 비교 (세그먼트에 없는 값이면 건너뜀)
+            wanted: dict[str, int] = {}
+            skip = False
+            for name, value in filters.items():
+                if name == "status":
+                    wanted[name] = int(value)
+                elif name in DICT_COLUMNS:
+                    try:
+                        wanted[name] = dicts[name].index(value)
+                    except ValueError:
+                        skip = True
+                        break
+            if skip:
+                continue
+
+            lo, hi = _row_range(cols["ts"], start, end, seg.ordered)
+            scanned += hi - lo
+            conditions = [(name, code.__eq__) for name, code in wanted.items()]
+            if not seg.ordered:
+                conditions += [("ts", float(start).__le__), ("ts", float(end).__gt__)]
+            members = _select(cols, lo, hi, conditions)
+            if members is not None and not members:
+                continue
+
+            if not group_by:
+                runs = [((), members)]
+            else:
+                keys = _group_keys(cols, lo, hi, group_by)
+                get = keys.__getitem__
+                rows_in = range(hi - lo) if members is None else members
+                runs = (
+                    (raw if len(group_by) > 1 else (raw,), list(run))
+                    for raw, run in itertools.groupby(sorted(rows_in, key=get), key=get)
+                )
+            for raw, run in runs:
+                key = tuple(_label(name, code, dicts) for name, code in zip(group_by, raw))
+                acc = groups.get(key)
+                if acc is None:
+                    acc = groups[key] = {
+                        "requests": 0, "errors": 0, "promptTokens": 0, "completionTokens": 0,
+                        "latencies": array("I"),
+                    }
+                _accumulate(acc, cols, lo, hi, run)
+
+    rows = []
+    for key, acc in groups.items():
+        latencies = array("I", sorted(acc.pop("latencies")))
+        total_ms = sum(latencies)
+        count = acc["requests"]
+        total_tokens = acc["promptTokens"] + acc["completionTokens"]
+        latency_stats = {
+            "avg": round(total_ms / count, 1) if count else 0,
+            "min": latencies[0] if latencies else 0,
+            "max": latencies[-1] if latencies else 0,
+        }
+        for p in percentiles:
+            latency_stats[f"p{p:g}"] = _percentile(latencies, p)
+        rows.append({
+            **dict(zip(group_by, key)),
+            **acc,
+            "totalTokens": total_tokens,
+            "errorRate": round(acc["errors"] / count * 100, 2) if count else 0,
+            "tokensPerSec": round(acc["completionTokens"] / (total_ms / 1000), 1) if total_ms else 0,
+            "latencyMs": latency_stats,
+        })
+    rows.sort(key=lambda r: r["requests"], reverse=True)
+    return {
+        "groupBy": group_by,
+        "rows": rows,
+        "segments": segments,
+        "scannedRows": scanned,
+        "elapsedMs": round((time.perf_counter() - started) * 1000, 2),
+    }
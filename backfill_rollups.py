@@ -0,0 +1,89 @@
+"""
+사용량 롤업 백필 스크립트
+기존 usage_logs 전체(또는 --since 이후)를 읽어 usage_user_daily / usage_key_daily / usage_model_hourly를 다시 계산합니다.
+결과는 절대값으로 기록하므로 여러 번 실행해도 같은 결과 (롤업 도입 직후 1회, 또는 롤업이 어긋났을 때).
+
+- 게이트웨이와 같은 설정(POCKETBASE_URL, .env)과 PocketBase 클라이언트를 사용
+- usage_logs는 id 키셋 페이지네이션으로 읽음 (페이지 번호 방식의 깊은 오프셋 비용 없음)
+- 실행 중인 게이트웨이가 같은 기간에 증분을 반영하고 있으면 그 차이만큼 덮어쓰므로,
+  트래픽이 적은 시간에 실행하거나 --until로 과거 구간만 재계산
+- --since/--until은 날짜(UTC 자정) 단위로 지정 — 경계 날짜의 버킷이 일부 로그만으로 덮어써지지 않도록
+
+Usage:
+  python backfill_rollups.py [--since 2026-01-01] [--until 2026-10-01] [--dry-run]
+"""
+import argparse
+import sys
+import time
+
+from app.database import pb
+from app.services import rollups
+
+PAGE_SIZE = 500
+
+
+def iter_usage_logs(since: str = "", until: str = ""):
+    """usage_logs를 id 오름차순 키셋 페이지네이션으로 반환
+    (클라이언트가 created를 초 단위로 잘라 파싱하므로 created 대신 id를 커서로 사용)"""
+    bounds = []
+    if since:
+        bounds.append(f'created>="{since}"')
+    if until:
+        bounds.append(f'created<"{until}"')
+    last_id = ""
+    while True:
+        conditions = bounds + ([f'id>"{last_id}"'] if last_id else [])
+        page = pb.collection("usage_logs").get_list(1, PAGE_SIZE, {
+            "filter": " && ".join(conditions),
+            "sort": "id",
+            "skipTotal": 1,
+        })
+        if not page.items:
+            return
+        yield page.items
+        last_id = page.items[-1].id
+        if len(page.items) < PAGE_SIZE:
+            return
+
+
+def main():
+    parser = argparse.ArgumentParser(description="usage_logs → 사용량 롤업 재계산")
+    parser.add_argument("--since", default="", help="이 시각 이후 로그만 (예: 2026-01-01)")
+    parser.add_argument("--until", default="", help="이 시각 이전 로그만 (예: 2026-10-01)")
+    parser.add_argument("--dry-run", action="store_true", help="집계만 하고 기록하지 않음")
+    args = parser.parse_args()
+
+    print("=== 사용량 롤업 백필 ===\n")
+    started = time.time()
+    aggregated: dict = {}
+    rows = 0
+    try:
+        for items in iter_usage_logs(args.since, args.until):
+            rollups.aggregate(items, aggregated)
+            rows += len(items)
+            print(f"\r  usage_logs {rows}건 읽음", end="", flush=True)
+    except Exception as e:
+        print(f"\n  ERROR: usage_logs 조회 실패: {e}")
+        sys.exit(1)
+    print()
+
+    counts = {name: 0 for name in rollups.COLLECTIONS}
+    for collection, _ in aggregated:
+        counts[collection] += 1
+    for name, count in counts.items():
+        print(f"  {name}: {count}개 레코드")
+
+    if args.dry_run:
+        print("\n--dry-run: 기록하지 않았습니다.")
+        return
+
+    try:
+        written = rollups.write_absolute(aggregated)
+    except Exception as e:
+        print(f"  ERROR: 롤업 기록 실패: {e}")
+        sys.exit(1)
+    print(f"\n=== 완료! {written}개 레코드 기록 ({time.time() - started:.1f}s) ===")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+네이티브 /api/chat 요청 본문 처리 비용 비교 (멀티 MB 이미지 페이로드)
+
+  parse  : 기존 경로 — request.json() → ChatRequest 검증 → model_dump → httpx json= 재직렬화
+  scan   : 패스스루 — passthrough.scan() → rewrite() (원본은 memoryview 조각으로 참조)
+
+실행: python -m benchmarks.bench_passthrough [--sizes 1,4,16] [--repeat 20]
+"""
+import argparse
+import base64
+import json
+import os
+import time
+
+from app.models.ollama import ChatRequest
+from app.services import passthrough
+
+
+def make_body(image_mb: float, images: int = 1) -> bytes:
+    image = base64.b64encode(os.urandom(int(image_mb * 1024 * 1024 * 3 / 4))).decode()
+    return json.dumps({
+        "model": "llava:13b",
+        "messages": [
+            {"role": "system", "content": "You are a vision assistant."},
+            {"role": "user", "content": "Describe these images.", "images": [image] * images},
+        ],
+        "stream": True,
+        "options": {"temperature": 0.2, "num_ctx": 8192},
+    }).encode()
+
+
+def parse_path(body: bytes) -> int:
+    data = json.loads(body)
+    req = ChatRequest.model_validate(data)
+    payload = {"model": req.model, "messages": [m.model_dump() for m in req.messages], "stream": True}
+    return len(json.dumps(payload).encode())
+
+
+def scan_path(body: bytes) -> int:
+    scanned = passthrough.scan(body)
+    model = scanned.value(body, "model")
+    options = scanned.value(body, "options")
+    parts, length = passthrough.rewrite(body, scanned, {"keep_alive": "30m"}, {"model": model, "options": options})
+    return length
+
+
+def bench(fn, body: bytes, repeat: int) -> tuple[float, float]:
+    fn(body)  # 워밍업
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(body)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000, samples[-1] * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,4,16", help="이미지 크기(MB), 쉼표 구분")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'image':>8} {'body':>9} {'parse p50':>10} {'scan p50':>10} {'speedup':>8} {'parse max':>10} {'scan max':>10}")
+    for size in [float(s) for s in args.sizes.split(",")]:
+        body = make_body(size)
+        parse_p50, parse_max = bench(parse_path, body, args.repeat)
+        scan_p50, scan_max = bench(scan_path, body, args.repeat)
+        print(
+            f"{size:>6.0f}MB {len(body) / 1e6:>7.1f}MB {parse_p50:>8.2f}ms {scan_p50:>8.2f}ms "
+            f"{parse_p50 / scan_p50:>7.1f}x {parse_max:>8.2f}ms {scan_max:>8.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+핫 경로 저장소 비교: PocketBase 백엔드 vs 내장 SQLite 백엔드 (app/services/storage.py)
+인메모리 PocketBase(fake_pocketbase)를 하위 프로세스로 띄우고, 같은 시드 사용자/키로 두 백엔드의 연산을
+storage.run() (전용 스레드 풀) 경유로 동시에 호출해 처리량과 호출 지연을 비교합니다.
+
+  find_api_key   API 키 인증 조회 (캐시 미스 경로)
+  get_user       사용자 조회
+  add_usage      쿼터 차감 (사용자 + 키 카운터 증분)
+  insert_log     usage_logs 기록
+
+- SQLite는 측정 전에 모든 키/사용자를 한 번 조회해 로컬 사본을 만들어 둠 (read-through 워밍업)
+- SQLite 쓰기는 큐에 넣고 바로 반환하므로 호출 지연은 큐 추가 시간 — 처리량은 마지막 flush()(커밋 완료)까지 포함
+- PocketBase 쪽 지연은 대부분 HTTP 왕복. --pb-latency-ms로 원격 DB 왕복을 흉내낼 수 있음
+
+실행: python -m benchmarks.bench_storage [--ops 2000] [--concurrency 32] [--users 200] [--pb-latency-ms 1] [--json]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.fake_pocketbase import key_for
+from benchmarks.loadgen import REPO_ROOT, _free_port, _percentiles
+
+OPERATIONS = ("find_api_key", "get_user", "add_usage", "insert_log")
+
+
+def _start_pocketbase(args: argparse.Namespace, workdir: str) -> tuple[subprocess.Popen, str]:
+    port = _free_port()
+    log = open(os.path.join(workdir, "pocketbase.log"), "wb")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_pocketbase", "--port", str(port),
+         "--users", str(args.users), "--latency-ms", str(args.pb_latency_ms)],
+        cwd=workdir, env={**os.environ, "PYTHONPATH": REPO_ROOT}, stdout=log, stderr=subprocess.STDOUT,
+    )
+    log.close()
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/api/health", timeout=1.0).status_code == 200:
+                return proc, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    proc.terminate()
+    raise SystemExit("fake PocketBase did not start")
+
+
+def _calls(op: str, backend, users: int, n: int, rng: random.Random) -> list[tuple]:
+    """연산별 (함수, 인자...) 목록"""
+    calls = []
+    for i in range(n):
+        index = rng.randrange(users)
+        user_id, key_id = f"benchuser{index:06d}", f"benchkey{index:07d}"
+        if op == "find_api_key":
+            calls.append((backend.find_api_key, hashlib.sha256(key_for(index).encode()).hexdigest()))
+        elif op == "get_user":
+            calls.append((backend.get_user, user_id))
+        elif op == "add_usage":
+            calls.append((_add_usage, backend, user_id, key_id, rng.randint(1, 500)))
+        else:
+            calls.append((backend.insert_usage_log, f"{rng.getrandbits(60):015x}", {
+                "user": user_id, "apiKey": key_id, "model": "qwen3:8b", "endpoint": "/api/chat",
+                "promptTokens": 10, "completionTokens": 20, "totalTokens": 30,
+                "responseTimeMs": 120, "statusCode": 200, "ip": "127.0.0.1", "isError": False,
+            }))
+    return calls
+
+
+def _add_usage(backend, user_id: str, key_id: str, tokens: int) -> None:
+    today = time.strftime("%Y-%m-%d", time.gmtime())
+    backend.add_user_usage(user_id, tokens, today)
+    backend.add_key_usage(key_id, tokens, today)
+
+
+async def _measure(storage, backend, op: str, args: argparse.Namespace) -> dict:
+    calls = _calls(op, backend, args.users, args.ops, random.Random(args.seed))
+    latencies: list[float] = []
+    pending = iter(calls)
+
+    async def worker():
+        for func, *params in pending:
+            start = time.perf_counter()
+            await storage.run(func, *params)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    await storage.run(backend.flush)
+    elapsed = time.perf_counter() - start
+    return {"ops": len(calls), "opsPerSec": round(len(calls) / elapsed, 1), "latencyMs": _percentiles(latencies)}
+
+
+async def run(args: argparse.Namespace) -> dict:
+    workdir = tempfile.mkdtemp(prefix="abcdllm-bench-storage-")
+    proc, pb_url = _start_pocketbase(args, workdir)
+    try:
+        # app 모듈은 설정을 import 시점에 읽으므로 환경 변수를 먼저 지정
+        os.environ.update({"POCKETBASE_URL": pb_url, "DATA_DIR": os.path.join(workdir, "data"), "REDIS_URL": ""})
+        from app.services import storage
+        from app.services.sqlite_storage import SQLiteStorage
+
+        backends = {"pocketbase": storage.PocketBaseStorage(), "sqlite": SQLiteStorage(os.path.join(workdir, "storage.db"))}
+        for index in range(args.users):
+            await storage.run(backends["sqlite"].find_api_key, hashlib.sha256(key_for(index).encode()).hexdigest())
+            await storage.run(backends["sqlite"].get_user, f"benchuser{index:06d}")
+        await storage.run(backends["sqlite"].flush)
+
+        result = {"ops": args.ops, "concurrency": args.concurrency, "users": args.users,
+                  "pbLatencyMs": args.pb_latency_ms, "operations": {}}
+        for op in OPERATIONS:
+            result["operations"][op] = {
+                name: await _measure(storage, backend, op, args) for name, backend in backends.items()
+            }
+        result["sqliteWriter"] = backends["sqlite"].snapshot()["writer"]
+        for backend in backends.values():
+            backend.close()
+        storage.close()
+        return result
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_report(result: dict) -> None:
+    print(f"ops {result['ops']} per operation, concurrency {result['concurrency']}, "
+          f"users {result['users']}, PocketBase added latency {result['pbLatencyMs']} ms")
+    print()
+    print(f"{'operation':<14}{'backend':<12}{'ops/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'speedup':>9}")
+    for op, backends in result["operations"].items():
+        base = backends["pocketbase"]["opsPerSec"]
+        for name, r in backends.items():
+            lat = r["latencyMs"]
+            speedup = f"{r['opsPerSec'] / base:.1f}x" if base else "-"
+            print(f"{op:<14}{name:<12}{r['opsPerSec']:>10}{lat['p50']:>9.2f}{lat['p99']:>9.2f}{speedup:>9}")
+    writer = result["sqliteWriter"]
+    print()
+    print(f"sqlite writer: {writer['writes']} writes in {writer['transactions']} transactions "
+          f"(max batch {writer['maxBatch']}, failed {writer['failedWrites']})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=2000, help="연산별 호출 수")
+    parser.add_argument("--concurrency", type=int, default=32, help="동시 호출 수")
+    parser.add_argument("--users", type=int, default=200, help="시드 사용자/API 키 수")
+    parser.add_argument("--pb-latency-ms", type=float, default=0.0, help="가짜 PocketBase 요청당 지연 (ms)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="결과를 JSON으로 출력")
+    args = parser.parse_args()
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+
+
+if __name__ == "__main__":
+    main()
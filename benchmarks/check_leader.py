@@ -0,0 +1,221 @@
+"""
+멀티 워커 리더 선출 검증 (app/services/leader.py)
+같은 DATA_DIR을 공유하는 워커 프로세스 여러 개를 띄워 leader.run() 선출 루프만 돌리고, 각 워커가 기록하는
+상태 파일로 다음을 확인합니다. 하나라도 어긋나면 종료 코드 1.
+
+  single leader   일정 시간 동안 매 관찰 시점에 리더가 정확히 1명
+  failover        리더 프로세스를 SIGKILL → 남은 워커 중 정확히 1명이 승계 (싱글톤 작업도 새 리더에서 시작)
+  stale state     이전 실행이 남긴 leader_state.json이나 죽은 리더가 게시한 상태를 read_state가 돌려주지 않음
+                  (모든 워커가 보는 게시자는 항상 지금 리더)
+  redis down      REDIS_URL이 설정됐지만 접속 불가 → 파일 락으로 넘어가지 않고 아무도 리더가 되지 않음
+
+실행: python -m benchmarks.check_leader [--workers 4] [--observe 5] [--ttl 3]
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.loadgen import REPO_ROOT
+
+
+async def _worker(status_dir: str) -> None:
+    """워커 모드: 선출 루프를 돌리며 0.1초마다 {status_dir}/{pid} 에
+    "리더 여부 싱글톤작업실행여부 read_state()의 게시자" 기록"""
+    from app.services import leader
+
+    job_running = False
+
+    async def singleton():
+        nonlocal job_running
+        job_running = True
+        try:
+            await asyncio.Event().wait()
+        finally:
+            job_running = False
+
+    leader.register_job("check", singleton)
+    election = asyncio.create_task(leader.run())
+    path = os.path.join(status_dir, str(os.getpid()))
+    while True:
+        state = await asyncio.to_thread(leader.read_state) or {}
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(f"{int(leader.is_leader())} {int(job_running)} {state.get('leader') or '-'}")
+        os.replace(tmp, path)
+        if election.done():
+            election.result()
+        await asyncio.sleep(0.1)
+
+
+def _spawn(n: int, data_dir: str, status_dir: str, ttl: int, redis_url: str = "") -> list[subprocess.Popen]:
+    env = {
+        **os.environ,
+        "PYTHONPATH": REPO_ROOT,
+        "DATA_DIR": data_dir,
+        "LEADER_LOCK_TTL": str(ttl),
+        "REDIS_URL": redis_url,
+    }
+    return [
+        subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.check_leader", "--worker", status_dir],
+            cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        for _ in range(n)
+    ]
+
+
+def _read(status_dir: str, procs: list[subprocess.Popen]) -> dict[int, tuple[bool, bool, str]]:
+    """살아 있는 워커 pid → (리더 여부, 싱글톤 작업 실행 여부, 게시 상태의 리더 id)"""
+    alive = {p.pid for p in procs if p.poll() is None}
+    states = {}
+    for path in glob.glob(os.path.join(status_dir, "[0-9]*")):
+        if path.endswith(".tmp"):
+            continue
+        pid = int(os.path.basename(path))
+        if pid not in alive:
+            continue
+        try:
+            with open(path) as f:
+                leader, job, publisher = f.read().split()
+        except (OSError, ValueError):
+            continue
+        states[pid] = (leader == "1", job == "1", publisher)
+    return states
+
+
+def _leaders(states: dict) -> list[int]:
+    return [pid for pid, (leader, _, _) in states.items() if leader]
+
+
+def _wait_reported(status_dir: str, procs: list[subprocess.Popen], timeout: float) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        states = _read(status_dir, procs)
+        if len(states) == len([p for p in procs if p.poll() is None]):
+            return states
+        time.sleep(0.1)
+    raise SystemExit("workers did not report status")
+
+
+def _observe(status_dir: str, procs: list[subprocess.Popen], seconds: float) -> tuple[int, list[str]]:
+    """seconds 동안 관찰해 리더 수가 1이 아닌 시점을 모음. (마지막 리더 pid, 오류 목록)"""
+    errors = []
+    leader = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        states = _read(status_dir, procs)
+        leaders = _leaders(states)
+        if len(leaders) != 1:
+            errors.append(f"{len(leaders)} leaders at {time.strftime('%H:%M:%S')}: {states}")
+        else:
+            leader = leaders[0]
+            if not states[leader][1]:
+                errors.append(f"leader {leader} is not running the singleton job")
+            stale = {pid: p for pid, (_, _, p) in states.items() if p not in ("-", f"{p.rsplit(':', 1)[0]}:{leader}")}
+            if stale:
+                errors.append(f"workers read state published by a non-leader: {stale}")
+        time.sleep(0.2)
+    return leader, errors
+
+
+def _wait_leader(status_dir: str, procs: list[subprocess.Popen], timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if len(_leaders(_read(status_dir, procs))) == 1:
+            return
+        time.sleep(0.1)
+
+
+def _stop(procs: list[subprocess.Popen]) -> None:
+    for p in procs:
+        if p.poll() is None:
+            p.terminate()
+    for p in procs:
+        try:
+            p.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            p.kill()
+
+
+def check(args: argparse.Namespace) -> list[str]:
+    failures = []
+    workdir = tempfile.mkdtemp(prefix="abcdllm-leader-")
+    try:
+        # 1) 파일 락: 리더 1명 + SIGKILL 승계
+        data_dir = os.path.join(workdir, "data")
+        status_dir = os.path.join(workdir, "status")
+        os.makedirs(status_dir)
+        os.makedirs(data_dir)
+        with open(os.path.join(data_dir, "leader_state.json"), "w") as f:  # 이전 실행이 남긴 상태
+            json.dump({"leader": "previous-run:1", "startup": {"status": "ready"}}, f)
+        procs = _spawn(args.workers, data_dir, status_dir, args.ttl)
+        try:
+            _wait_reported(status_dir, procs, 30)
+            _wait_leader(status_dir, procs, args.ttl * 2)
+            leader, errors = _observe(status_dir, procs, args.observe)
+            print(f"single leader + stale state: {'ok' if not errors else 'FAIL'} (leader pid {leader})")
+            failures += [f"single leader: {e}" for e in errors[:5]]
+
+            if leader:
+                os.kill(leader, signal.SIGKILL)
+                next(p for p in procs if p.pid == leader).wait()
+                started = time.monotonic()
+                _wait_leader(status_dir, procs, args.ttl * 3)
+                took = time.monotonic() - started
+                successor, errors = _observe(status_dir, procs, args.observe)
+                ok = not errors and successor not in (0, leader)
+                print(f"failover: {'ok' if ok else 'FAIL'} (pid {leader} → {successor}, {took:.1f}s)")
+                failures += [f"failover: {e}" for e in errors[:5]]
+                if successor in (0, leader):
+                    failures.append("failover: no new leader")
+        finally:
+            _stop(procs)
+
+        # 2) Redis 설정 + 접속 불가: 파일 락으로 넘어가 리더가 생기면 안 됨
+        status_dir = os.path.join(workdir, "status-redis")
+        os.makedirs(status_dir)
+        procs = _spawn(2, os.path.join(workdir, "data-redis"), status_dir, args.ttl, "redis://127.0.0.1:1/0")
+        try:
+            _wait_reported(status_dir, procs, 30)
+            deadline = time.monotonic() + args.ttl * 2
+            leaders = []
+            while time.monotonic() < deadline and not leaders:
+                leaders = _leaders(_read(status_dir, procs))
+                time.sleep(0.2)
+            print(f"redis down: {'ok' if not leaders else 'FAIL'} ({len(leaders)} leaders)")
+            if leaders:
+                failures.append(f"redis down: {len(leaders)} workers took leadership without Redis")
+        finally:
+            _stop(procs)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--observe", type=float, default=5.0, help="각 단계 관찰 시간 (초)")
+    parser.add_argument("--ttl", type=int, default=3, help="LEADER_LOCK_TTL (초)")
+    parser.add_argument("--worker", metavar="STATUS_DIR", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        asyncio.run(_worker(args.worker))
+        return
+    failures = check(args)
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+부하 테스트용 가짜 Ollama 서버
+GPU 없이 게이트웨이 자체의 오버헤드(인증, 쿼터, 패스스루, 로그)를 측정하기 위한 Ollama API 흉내.
+
+- /api/chat, /api/generate: 실제 Ollama와 같은 NDJSON 스트림(stream=false면 단일 JSON)
+  · 첫 토큰 지연(--ttft-ms), 토큰 속도(--token-rate 토큰/초), 응답 토큰 수(--tokens, 요청의 options.num_predict 우선)
+  · --fail-rate 비율로 500 {"error": ...} 응답 (스트림 시작 전)
+  · keep_alive=0 이고 프롬프트가 없으면 언로드 요청으로 보고 즉시 done
+- /api/tags, /api/ps, /api/show, /api/embed, /api/version, / (감지 프로브용)
+- model 이름이 --models 목록에 없으면 404 {"error": "model '...' not found"}
+- GET /stats: 받은 요청 수 (엔드포인트별)
+
+실행: python -m benchmarks.fake_ollama [--port 11434] [--ttft-ms 50] [--token-rate 200] [--tokens 64] [--fail-rate 0]
+loadgen.py가 하위 프로세스로 띄울 때도 같은 옵션을 그대로 넘깁니다.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+DEFAULT_MODELS = ["qwen3:8b", "llama3.2:3b", "nomic-embed-text"]
+EMBED_DIM = 16
+
+config = {
+    "ttft_ms": 50.0,
+    "token_rate": 200.0,   # 0이면 지연 없이 바로 전송
+    "tokens": 64,
+    "fail_rate": 0.0,
+    "models": list(DEFAULT_MODELS),
+}
+counts: Counter = Counter()
+
+app = FastAPI(title="fake-ollama")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _digest(name: str) -> str:
+    return hashlib.sha256(name.encode()).hexdigest()
+
+
+def _model_entry(name: str) -> dict:
+    return {
+        "name": name,
+        "model": name,
+        "modified_at": "2026-01-01T00:00:00Z",
+        "size": 4_920_000_000,
+        "digest": _digest(name),
+        "details": {
+            "format": "gguf",
+            "family": name.split(":")[0],
+            "parameter_size": "8.2B",
+            "quantization_level": "Q4_K_M",
+        },
+    }
+
+
+def _error(status: int, message: str) -> JSONResponse:
+    return JSONResponse(status_code=status, content={"error": message})
+
+
+def _check(body: dict) -> JSONResponse | None:
+    model = body.get("model") or ""
+    if model not in config["models"]:
+        return _error(404, f"model '{model}' not found")
+    if config["fail_rate"] and random.random() < config["fail_rate"]:
+        return _error(500, "fake failure")
+    return None
+
+
+def _num_tokens(body: dict) -> int:
+    options = body.get("options") or {}
+    num_predict = options.get("num_predict")
+    if isinstance(num_predict, int) and num_predict > 0:
+        return num_predict
+    return config["tokens"]
+
+
+def _prompt_tokens(body: dict) -> int:
+    text = body.get("prompt") or ""
+    for message in body.get("messages") or []:
+        text += str(message.get("content") or "")
+    return max(1, len(text) // 4)
+
+
+def _final(body: dict, started: float, eval_count: int, prompt_eval_count: int) -> dict:
+    total = int((time.perf_counter() - started) * 1e9)
+    return {
+        "model": body["model"],
+        "created_at": _now(),
+        "done": True,
+        "done_reason": "stop",
+        "total_duration": total,
+        "load_duration": 0,
+        "prompt_eval_count": prompt_eval_count,
+        "prompt_eval_duration": int(config["ttft_ms"] * 1e6),
+        "eval_count": eval_count,
+        "eval_duration": max(0, total - int(config["ttft_ms"] * 1e6)),
+    }
+
+
+async def _tokens(n: int):
+    """토큰 문자열을 설정된 속도로 생성 (첫 토큰 전 ttft 지연)"""
+    await asyncio.sleep(config["ttft_ms"] / 1000)
+    interval = 1 / config["token_rate"] if config["token_rate"] > 0 else 0.0
+    next_at = time.perf_counter()
+    for i in range(n):
+        if interval:
+            next_at += interval
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        yield f"tok{i} "
+
+
+async def _respond(body: dict, chat: bool):
+    started = time.perf_counter()
+    n = _num_tokens(body)
+    prompt_eval_count = _prompt_tokens(body)
+
+    def piece(text: str) -> dict:
+        if chat:
+            return {"model": body["model"], "created_at": _now(), "message": {"role": "assistant", "content": text}, "done": False}
+        return {"model": body["model"], "created_at": _now(), "response": text, "done": False}
+
+    if body.get("stream", True):
+        async def stream():
+            async for text in _tokens(n):
+                yield json.dumps(piece(text)).encode() + b"\n"
+            final = _final(body, started, n, prompt_eval_count)
+            final.update({"message": {"role": "assistant", "content": ""}} if chat else {"response": ""})
+            yield json.dumps(final).encode() + b"\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    content = "".join([text async for text in _tokens(n)])
+    result = _final(body, started, n, prompt_eval_count)
+    result.update({"message": {"role": "assistant", "content": content}} if chat else {"response": content})
+    return JSONResponse(result)
+
+
+@app.get("/")
+async def root():
+    return PlainTextResponse("Ollama is running")
+
+
+@app.get("/api/version")
+async def version():
+    return {"version": "0.0.0-fake"}
+
+
+@app.get("/api/tags")
+async def tags():
+    counts["tags"] += 1
+    return {"models": [_model_entry(name) for name in config["models"]]}
+
+
+@app.get("/api/ps")
+async def ps():
+    counts["ps"] += 1
+    return {"models": [
+        {**_model_entry(name), "expires_at": "2099-01-01T00:00:00Z", "size_vram": 4_920_000_000}
+        for name in config["models"][:1]
+    ]}
+
+
+@app.post("/api/show")
+async def show(request: Request):
+    counts["show"] += 1
+    body = await request.json()
+    name = body.get("model") or body.get("name") or ""
+    if name not in config["models"]:
+        return _error(404, f"model '{name}' not found")
+    entry = _model_entry(name)
+    return {
+        "modelfile": f"FROM {name}",
+        "parameters": "num_ctx 8192",
+        "template": "{{ .Prompt }}",
+        "details": entry["details"],
+        "model_info": {"general.architecture": entry["details"]["family"], "general.parameter_count": 8_200_000_000},
+        "modified_at": entry["modified_at"],
+    }
+
+
+@app.post("/api/chat")
+async def chat(request: Request):
+    counts["chat"] += 1
+    body = await request.json()
+    error = _check(body)
+    if error is not None:
+        return error
+    if body.get("keep_alive") == 0 and not body.get("messages"):
+        return JSONResponse({"model": body["model"], "created_at": _now(), "message": {"role": "assistant", "content": ""},
+                             "done": True, "done_reason": "unload"})
+    return await _respond(body, chat=True)
+
+
+@app.post("/api/generate")
+async def generate(request: Request):
+    counts["generate"] += 1
+    body = await request.json()
+    error = _check(body)
+    if error is not None:
+        return error
+    if body.get("keep_alive") == 0 and not body.get("prompt"):
+        return JSONResponse({"model": body["model"], "created_at": _now(), "response": "", "done": True, "done_reason": "unload"})
+    return await _respond(body, chat=False)
+
+
+@app.post("/api/embed")
+async def embed(request: Request):
+    counts["embed"] += 1
+    body = await request.json()
+    error = _check(body)
+    if error is not None:
+        return error
+    inputs = body.get("input") or ""
+    inputs = [inputs] if isinstance(inputs, str) else inputs
+    vectors = []
+    for text in inputs:
+        seed = hashlib.sha256(str(text).encode()).digest()
+        vectors.append([round(b / 255 - 0.5, 4) for b in seed[:EMBED_DIM]])
+    return {"model": body["model"], "embeddings": vectors, "prompt_eval_count": sum(len(str(t)) // 4 + 1 for t in inputs)}
+
+
+@app.get("/stats")
+async def stats():
+    return dict(counts)
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--ttft-ms", type=float, default=config["ttft_ms"], help="첫 토큰까지 지연 (ms)")
+    parser.add_argument("--token-rate", type=float, default=config["token_rate"], help="초당 토큰 수 (0 = 지연 없음)")
+    parser.add_argument("--tokens", type=int, default=config["tokens"], help="응답 토큰 수 (options.num_predict 우선)")
+    parser.add_argument("--fail-rate", type=float, default=config["fail_rate"], help="500 응답 비율 (0~1)")
+    parser.add_argument("--models", default=",".join(DEFAULT_MODELS), help="제공할 모델 이름 (쉼표 구분)")
+
+
+def configure(args: argparse.Namespace) -> None:
+    config.update({
+        "ttft_ms": args.ttft_ms,
+        "token_rate": args.token_rate,
+        "tokens": args.tokens,
+        "fail_rate": args.fail_rate,
+        "models": [m.strip() for m in args.models.split(",") if m.strip()],
+    })
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="가짜 Ollama 서버 (부하 테스트용)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    add_arguments(parser)
+    args = parser.parse_args()
+    configure(args)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
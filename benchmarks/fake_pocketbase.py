@@ -0,0 +1,387 @@
+"""
+부하 테스트용 인메모리 PocketBase
+게이트웨이가 쓰는 레코드 REST API(/api/collections/{collection}/records)만 메모리에서 흉내냅니다.
+
+- 목록: page, perPage(최대 500), filter, sort(-필드, 쉼표 구분), skipTotal
+- filter 문법: = != > >= < <= ~ !~, &&, ||, 괄호, 문자열/숫자/true/false/null 리터럴
+- 단건 조회/생성/수정(PATCH, "필드+"/"필드-" 증감 지원)/삭제
+- 응답 레코드 형식: camelCase 필드 + id, collectionId, collectionName, created, updated
+- 오류 형식: {"code", "message", "data"} (pocketbase 클라이언트의 ClientResponseError로 변환됨)
+- --latency-ms: 요청마다 인위적 지연 (원격 DB 왕복 흉내)
+- 시작 시 사용자/API 키를 결정적으로 생성 (seed()가 만드는 평문 키 → loadgen이 그대로 사용)
+
+실행: python -m benchmarks.fake_pocketbase [--port 8090] [--users 100] [--latency-ms 0]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import re
+import secrets
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+MAX_PER_PAGE = 500
+KEY_PREFIX = "sk-abcd-bench-"
+
+_collections: dict[str, dict[str, dict]] = {}
+_config = {"latency_ms": 0.0}
+
+app = FastAPI(title="fake-pocketbase")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3] + "Z"
+
+
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}")
+
+
+def _normalize(value):
+    """PocketBase처럼 ISO 날짜 문자열을 'YYYY-MM-DD HH:MM:SS' 형식으로 저장 (문자열 비교 필터가 동작하도록)"""
+    if isinstance(value, str) and _DATE_RE.match(value):
+        return value[:10] + " " + value[11:]
+    return value
+
+
+def _new_id() -> str:
+    return secrets.token_hex(8)[:15]
+
+
+def insert(collection: str, data: dict, record_id: str | None = None) -> dict:
+    now = _now()
+    record = {k: _normalize(v) for k, v in data.items()}
+    record.update({
+        "id": record_id or data.get("id") or _new_id(),
+        "collectionId": collection,
+        "collectionName": collection,
+        "created": now,
+        "updated": now,
+    })
+    _collections.setdefault(collection, {})[record["id"]] = record
+    return record
+
+
+def key_for(index: int) -> str:
+    """index번째 시드 API 키 평문"""
+    return f"{KEY_PREFIX}{index:06d}"
+
+
+def seed(users: int, daily_quota: int = 10**12) -> list[str]:
+    """사용자 users명과 각자의 API 키를 생성하고 평문 키 목록을 반환 (같은 인자면 항상 같은 결과)"""
+    keys = []
+    for i in range(users):
+        user_id = f"benchuser{i:06d}"
+        insert("users", {
+            "email": f"bench{i}@example.com",
+            "name": f"bench {i}",
+            "role": "USER",
+            "primaryApiKey": "",
+            "dailyUsage": 0,
+            "dailyQuota": daily_quota,
+            "totalUsage": 0,
+            "totalQuota": daily_quota,
+            "lastActive": "",
+            "status": "active",
+            "accessCount": 0,
+        }, record_id=user_id)
+        plain = key_for(i)
+        insert("api_keys", {
+            "user": user_id,
+            "name": "bench",
+            "keyHash": hashlib.sha256(plain.encode()).hexdigest(),
+            "keyPrefix": plain[:16],
+            "dailyRequests": 0,
+            "dailyTokens": 0,
+            "totalTokens": 0,
+            "usedRequests": 0,
+            "usedTokens": 0,
+            "totalUsedTokens": 0,
+            "lastResetDate": "",
+            "isActive": True,
+        }, record_id=f"benchkey{i:07d}")
+        keys.append(plain)
+    return keys
+
+
+# ── filter 파서 ──
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<str>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<num>-?\d+(?:\.\d+)?)
+      | (?P<op>&&|\|\||!=|>=|<=|!~|[=<>~()])
+      | (?P<name>[A-Za-z_@][\w.@]*)
+    )""", re.VERBOSE)
+
+
+def _tokenize(text: str) -> list[tuple[str, object]]:
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        m = _TOKEN_RE.match(text, pos)
+        if not m or m.end() == pos:
+            raise ValueError(f"invalid filter near {text[pos:pos + 20]!r}")
+        pos = m.end()
+        if m.group("str") is not None:
+            tokens.append(("lit", re.sub(r"\\(.)", r"\1", m.group("str")[1:-1])))
+        elif m.group("num") is not None:
+            num = m.group("num")
+            tokens.append(("lit", float(num) if "." in num else int(num)))
+        elif m.group("op") is not None:
+            tokens.append(("op", m.group("op")))
+        else:
+            name = m.group("name")
+            literals = {"true": True, "false": False, "null": None}
+            tokens.append(("lit", literals[name]) if name in literals else ("field", name))
+        while pos < len(text) and text[pos].isspace():
+            pos += 1
+    return tokens
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _coerce(a, b):
+    """비교 전 형 맞추기: bool끼리, 숫자끼리(빈 값은 0), 그 외는 문자열(null은 "")"""
+    if isinstance(a, bool) or isinstance(b, bool):
+        return bool(a), bool(b)
+    if _is_number(a) and b in (None, ""):
+        return a, 0
+    if _is_number(b) and a in (None, ""):
+        return 0, b
+    if _is_number(a) and _is_number(b):
+        return a, b
+    return ("" if a is None else str(a)), ("" if b is None else str(b))
+
+
+def _compare(op: str, left, right) -> bool:
+    if op in ("~", "!~"):
+        needle = str(right if right is not None else "").replace("%", "")
+        found = needle.lower() in str(left if left is not None else "").lower()
+        return found if op == "~" else not found
+    a, b = _coerce(left, right)
+    try:
+        if op == "=":
+            return a == b
+        if op == "!=":
+            return a != b
+        if op == ">":
+            return a > b
+        if op == ">=":
+            return a >= b
+        if op == "<":
+            return a < b
+        if op == "<=":
+            return a <= b
+    except TypeError:
+        return False
+    raise ValueError(f"unknown operator {op}")
+
+
+@lru_cache(maxsize=4096)
+def compile_filter(text: str):
+    """filter 문자열 → record를 받아 bool을 반환하는 함수"""
+    tokens = _tokenize(text)
+    pos = 0
+
+    def peek():
+        return tokens[pos] if pos < len(tokens) else (None, None)
+
+    def take():
+        nonlocal pos
+        token = peek()
+        pos += 1
+        return token
+
+    def operand():
+        kind, value = take()
+        if kind == "field":
+            return lambda r, name=value: r.get(name)
+        if kind == "lit":
+            return lambda r, v=value: v
+        raise ValueError(f"expected operand, got {value!r}")
+
+    def primary():
+        if peek() == ("op", "("):
+            take()
+            node = disjunction()
+            if take() != ("op", ")"):
+                raise ValueError("missing )")
+            return node
+        left = operand()
+        kind, op = take()
+        if kind != "op" or op in ("&&", "||", "(", ")"):
+            raise ValueError(f"expected comparison operator, got {op!r}")
+        right = operand()
+        return lambda r: _compare(op, left(r), right(r))
+
+    def conjunction():
+        nodes = [primary()]
+        while peek() == ("op", "&&"):
+            take()
+            nodes.append(primary())
+        return nodes[0] if len(nodes) == 1 else (lambda r: all(n(r) for n in nodes))
+
+    def disjunction():
+        nodes = [conjunction()]
+        while peek() == ("op", "||"):
+            take()
+            nodes.append(conjunction())
+        return nodes[0] if len(nodes) == 1 else (lambda r: any(n(r) for n in nodes))
+
+    if not tokens:
+        return lambda r: True
+    node = disjunction()
+    if pos != len(tokens):
+        raise ValueError(f"unexpected token {tokens[pos][1]!r}")
+    return node
+
+
+def _sort_key(field: str):
+    def key(record):
+        value = record.get(field)
+        if value is None:
+            return (0, "")
+        if isinstance(value, (int, float)):
+            return (1, value)
+        return (2, str(value))
+    return key
+
+
+def _apply_sort(records: list[dict], sort: str) -> list[dict]:
+    for part in reversed([p.strip() for p in sort.split(",") if p.strip()]):
+        descending = part.startswith("-")
+        field = part.lstrip("+-")
+        records.sort(key=_sort_key(field), reverse=descending)
+    return records
+
+
+# ── HTTP ──
+
+def _error(status: int, message: str, data: dict | None = None) -> JSONResponse:
+    return JSONResponse(status_code=status, content={"code": status, "message": message, "data": data or {}})
+
+
+async def _delay() -> None:
+    if _config["latency_ms"]:
+        await asyncio.sleep(_config["latency_ms"] / 1000)
+
+
+async def _body(request: Request) -> dict:
+    raw = await request.body()
+    if not raw:
+        return {}
+    if request.headers.get("content-type", "").startswith("application/json"):
+        return json.loads(raw)
+    form = await request.form()
+    return {k: v for k, v in form.items()}
+
+
+def _update_fields(record: dict, data: dict) -> None:
+    for key, value in data.items():
+        if key in ("id", "created", "collectionId", "collectionName"):
+            continue
+        if key.endswith("+") or key.endswith("-"):
+            field = key[:-1]
+            current = record.get(field) or 0
+            record[field] = current + value if key.endswith("+") else current - value
+        else:
+            record[key] = _normalize(value)
+    record["updated"] = _now()
+
+
+@app.get("/api/health")
+async def health():
+    return {"code": 200, "message": "API is healthy.", "data": {}}
+
+
+@app.get("/api/collections/{collection}/records")
+async def list_records(collection: str, request: Request):
+    await _delay()
+    params = request.query_params
+    try:
+        page = max(1, int(params.get("page", 1)))
+        per_page = min(MAX_PER_PAGE, max(1, int(params.get("perPage", 30))))
+        match = compile_filter(params.get("filter", ""))
+    except ValueError as e:
+        return _error(400, "Something went wrong while processing your request. Invalid filter parameters.", {"filter": str(e)})
+
+    records = [r for r in _collections.get(collection, {}).values() if match(r)]
+    if params.get("sort"):
+        records = _apply_sort(records, params["sort"])
+    total = len(records)
+    start = (page - 1) * per_page
+    skip_total = params.get("skipTotal") in ("1", "true")
+    return {
+        "page": page,
+        "perPage": per_page,
+        "totalItems": -1 if skip_total else total,
+        "totalPages": -1 if skip_total else (total + per_page - 1) // per_page,
+        "items": records[start:start + per_page],
+    }
+
+
+@app.get("/api/collections/{collection}/records/{record_id}")
+async def get_record(collection: str, record_id: str):
+    await _delay()
+    record = _collections.get(collection, {}).get(record_id)
+    if record is None:
+        return _error(404, "The requested resource wasn't found.")
+    return record
+
+
+@app.post("/api/collections/{collection}/records")
+async def create_record(collection: str, request: Request):
+    await _delay()
+    data = await _body(request)
+    record_id = data.pop("id", None)
+    if record_id and record_id in _collections.get(collection, {}):
+        return _error(400, "Failed to create record.", {"id": {"code": "validation_invalid_id", "message": "The id is invalid or already exists."}})
+    return insert(collection, data, record_id)
+
+
+@app.patch("/api/collections/{collection}/records/{record_id}")
+async def update_record(collection: str, record_id: str, request: Request):
+    await _delay()
+    record = _collections.get(collection, {}).get(record_id)
+    if record is None:
+        return _error(404, "The requested resource wasn't found.")
+    _update_fields(record, await _body(request))
+    return record
+
+
+@app.delete("/api/collections/{collection}/records/{record_id}")
+async def delete_record(collection: str, record_id: str):
+    await _delay()
+    if _collections.get(collection, {}).pop(record_id, None) is None:
+        return _error(404, "The requested resource wasn't found.")
+    return Response(status_code=204)
+
+
+@app.get("/stats")
+async def stats():
+    return {name: len(records) for name, records in _collections.items()}
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="인메모리 PocketBase (부하 테스트용)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--users", type=int, default=100, help="생성할 사용자/API 키 수")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="요청마다 추가 지연 (ms)")
+    args = parser.parse_args()
+    _config["latency_ms"] = args.latency_ms
+    seed(args.users)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
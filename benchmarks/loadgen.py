@@ -0,0 +1,383 @@
+"""
+게이트웨이 부하 생성기
+가짜 Ollama(fake_ollama)와 인메모리 PocketBase(fake_pocketbase)를 하위 프로세스로 띄우고,
+그 앞에 실제 게이트웨이(uvicorn main:app)를 띄운 뒤 asyncio로 동시 요청을 보내 측정합니다.
+성능 관련 변경 전후로 같은 옵션으로 실행해 비교하는 용도.
+
+측정 항목:
+  - 처리량(req/s), 지연 p50/p99/max (요청 시작 → 본문 끝)
+  - TTFT p50/p99 (요청 시작 → 첫 본문 바이트, 스트리밍 요청만)
+  - 게이트웨이 CPU/요청 (측정 구간 동안 게이트웨이 프로세스와 워커들의 user+system CPU 합 ÷ 완료 요청 수)
+  - 엔드포인트별 요약, 오류 상태 코드별 건수
+
+요청 구성:
+  --endpoints   chat(/api/chat), generate(/api/generate), v1chat(/api/v1/chat),
+                openai(/v1/chat/completions, 항상 비스트리밍), embed(/api/embed) 중 쉼표로 선택 (균등 분배)
+  --stream-ratio 스트리밍 요청 비율 (0~1)
+  --keys        사용할 API 키(사용자) 수 — 키가 많을수록 인증/사용자 캐시 미스가 늘어남
+
+실행 예:
+  python -m benchmarks.loadgen --concurrency 64 --duration 20 --stream-ratio 0.7 --keys 200
+  python -m benchmarks.loadgen --workers 4 --token-rate 0 --tokens 16 --json > after.json
+  python -m benchmarks.loadgen --gateway-url http://127.0.0.1:8000 --api-key sk-abcd-... (이미 떠 있는 게이트웨이)
+
+참고:
+  - 게이트웨이는 임시 디렉터리를 작업 디렉터리로 실행 (.env 무시, DATA_DIR 격리, REDIS_URL 비움)
+  - 부하 생성기와 가짜 서버도 같은 머신의 CPU를 쓰므로 절대값보다 같은 조건에서의 전후 비교에 사용
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+
+import httpx
+
+from benchmarks import fake_ollama
+from benchmarks.fake_pocketbase import key_for
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHAT_MODEL = fake_ollama.DEFAULT_MODELS[0]
+EMBED_MODEL = fake_ollama.DEFAULT_MODELS[-1]
+ENDPOINTS = ("chat", "generate", "v1chat", "openai", "embed")
+STREAMABLE = {"chat", "generate", "v1chat"}
+PROMPT = "Summarize the benefits of connection pooling in two sentences."
+
+
+@dataclass
+class Sample:
+    endpoint: str
+    stream: bool
+    status: int
+    latency_ms: float
+    ttft_ms: float | None
+    error: str = ""
+
+
+# ── 하위 프로세스 ──
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _process_tree_cpu(pid: int) -> float:
+    """pid와 모든 자식 프로세스의 누적 CPU 시간 (초)"""
+    import psutil
+
+    try:
+        root = psutil.Process(pid)
+        procs = [root, *root.children(recursive=True)]
+    except psutil.NoSuchProcess:
+        return 0.0
+    total = 0.0
+    for proc in procs:
+        try:
+            times = proc.cpu_times()
+            total += times.user + times.system
+        except psutil.NoSuchProcess:
+            pass
+    return total
+
+
+class Stack:
+    """가짜 PocketBase + 가짜 Ollama + 게이트웨이 하위 프로세스 묶음"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.workdir = tempfile.mkdtemp(prefix="abcdllm-bench-")
+        self.procs: list[subprocess.Popen] = []
+        self.gateway: subprocess.Popen | None = None
+        self.gateway_url = ""
+        self.ollama_url = ""
+
+    def _spawn(self, name: str, argv: list[str], env: dict | None = None) -> subprocess.Popen:
+        log = open(os.path.join(self.workdir, f"{name}.log"), "wb")
+        proc = subprocess.Popen(
+            [sys.executable, *argv],
+            cwd=self.workdir,
+            env={**os.environ, "PYTHONPATH": REPO_ROOT, **(env or {})},
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+        log.close()
+        self.procs.append(proc)
+        return proc
+
+    def log_tail(self, name: str, lines: int = 30) -> str:
+        try:
+            with open(os.path.join(self.workdir, f"{name}.log"), errors="replace") as f:
+                return "".join(f.readlines()[-lines:])
+        except FileNotFoundError:
+            return ""
+
+    async def start(self) -> None:
+        args = self.args
+        pb_port, ollama_port, gateway_port = _free_port(), _free_port(), _free_port()
+        pb_url = f"http://127.0.0.1:{pb_port}"
+        self.ollama_url = f"http://127.0.0.1:{ollama_port}"
+        self.gateway_url = f"http://127.0.0.1:{gateway_port}"
+
+        self._spawn("pocketbase", [
+            "-m", "benchmarks.fake_pocketbase", "--port", str(pb_port),
+            "--users", str(args.keys), "--latency-ms", str(args.pb_latency_ms),
+        ])
+        self._spawn("ollama", [
+            "-m", "benchmarks.fake_ollama", "--port", str(ollama_port),
+            "--ttft-ms", str(args.ttft_ms), "--token-rate", str(args.token_rate),
+            "--tokens", str(args.tokens), "--fail-rate", str(args.fail_rate), "--models", args.models,
+        ])
+        await _wait_until(f"{pb_url}/api/health", "pocketbase", self)
+        await _wait_until(f"{self.ollama_url}/api/tags", "ollama", self)
+
+        self.gateway = self._spawn("gateway", [
+            "-m", "uvicorn", "main:app", "--app-dir", REPO_ROOT,
+            "--host", "127.0.0.1", "--port", str(gateway_port),
+            "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+        ], env={
+            "POCKETBASE_URL": pb_url,
+            "OLLAMA_BASE_URL": self.ollama_url,
+            "DEFAULT_MODEL": CHAT_MODEL,
+            "DEFAULT_EMBED_MODEL": EMBED_MODEL,
+            "DATA_DIR": os.path.join(self.workdir, "data"),
+            "REDIS_URL": "",
+            "JWT_SECRET": "bench-secret",
+        })
+        await _wait_until(f"{self.gateway_url}/api/ready", "gateway", self, timeout=90.0)
+
+    def stop(self) -> None:
+        # 게이트웨이부터 종료 (종료 시 PocketBase에 남은 기록을 반영할 수 있도록 하나씩 대기)
+        for proc in reversed(self.procs):
+            if proc.poll() is None:
+                proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        if self.args.keep_logs:
+            print(f"logs: {self.workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+async def _wait_until(url: str, name: str, stack: Stack, timeout: float = 30.0) -> None:
+    """url이 200을 반환할 때까지 대기 (게이트웨이는 /api/ready = Ollama 감지·워밍업 완료)"""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(timeout=2.0) as client:
+        while time.monotonic() < deadline:
+            if any(p.poll() is not None for p in stack.procs):
+                break
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{name} did not become ready: {url}\n{stack.log_tail(name)}")
+
+
+# ── 요청 ──
+
+def _request(endpoint: str, stream: bool) -> tuple[str, dict]:
+    messages = [{"role": "user", "content": PROMPT}]
+    if endpoint == "chat":
+        return "/api/chat", {"model": CHAT_MODEL, "messages": messages, "stream": stream}
+    if endpoint == "generate":
+        return "/api/generate", {"model": CHAT_MODEL, "prompt": PROMPT, "stream": stream}
+    if endpoint == "v1chat":
+        return "/api/v1/chat", {"model": CHAT_MODEL, "messages": messages, "stream": stream}
+    if endpoint == "openai":
+        return "/v1/chat/completions", {"model": CHAT_MODEL, "messages": messages}
+    if endpoint == "embed":
+        return "/api/embed", {"model": EMBED_MODEL, "input": PROMPT}
+    raise ValueError(f"unknown endpoint {endpoint}")
+
+
+async def _one(client: httpx.AsyncClient, endpoint: str, stream: bool, key: str) -> Sample:
+    path, payload = _request(endpoint, stream)
+    headers = {"Authorization": f"Bearer {key}"}
+    started = time.perf_counter()
+    ttft = None
+    try:
+        async with client.stream("POST", path, json=payload, headers=headers) as resp:
+            async for chunk in resp.aiter_raw():
+                if ttft is None and chunk:
+                    ttft = (time.perf_counter() - started) * 1000
+            status = resp.status_code
+        error = "" if status < 400 else f"HTTP {status}"
+    except httpx.HTTPError as e:
+        status, error = 0, type(e).__name__
+    latency = (time.perf_counter() - started) * 1000
+    return Sample(endpoint, stream, status, latency, ttft if stream else None, error)
+
+
+async def _worker(client, args, keys, rng: random.Random, deadline: float, budget: list, samples: list, record: bool) -> None:
+    endpoints = args.endpoint_list
+    while time.monotonic() < deadline:
+        if budget is not None:
+            if budget[0] <= 0:
+                return
+            budget[0] -= 1
+        endpoint = rng.choice(endpoints)
+        stream = endpoint in STREAMABLE and rng.random() < args.stream_ratio
+        sample = await _one(client, endpoint, stream, rng.choice(keys))
+        if record:
+            samples.append(sample)
+
+
+async def _drive(args, gateway_url: str, keys: list[str], seconds: float, requests: int | None, record: bool, seed: int) -> tuple[list[Sample], float]:
+    samples: list[Sample] = []
+    budget = [requests] if requests else None
+    deadline = time.monotonic() + (seconds if not requests else 10**9)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=gateway_url, limits=limits, timeout=httpx.Timeout(300.0)) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            _worker(client, args, keys, random.Random(seed * 7919 + i), deadline, budget, samples, record)
+            for i in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+    return samples, elapsed
+
+
+# ── 결과 ──
+
+def _percentiles(values: list[float]) -> dict:
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pct(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))], 2)
+
+    return {"p50": pct(0.5), "p99": pct(0.99), "max": round(ordered[-1], 2)}
+
+
+def summarize(samples: list[Sample], elapsed: float, cpu_seconds: float | None, workers: int | None) -> dict:
+    ok = [s for s in samples if not s.error]
+    errors = Counter(s.error for s in samples if s.error)
+    per_endpoint = defaultdict(list)
+    for s in samples:
+        per_endpoint[f"{s.endpoint}{' (stream)' if s.stream else ''}"].append(s)
+
+    result = {
+        "requests": len(samples),
+        "ok": len(ok),
+        "errors": dict(errors),
+        "elapsedS": round(elapsed, 2),
+        "throughputRps": round(len(ok) / elapsed, 1) if elapsed else 0.0,
+        "latencyMs": _percentiles([s.latency_ms for s in ok]),
+        "ttftMs": _percentiles([s.ttft_ms for s in ok if s.ttft_ms is not None]),
+        "endpoints": {
+            name: {
+                "requests": len(group),
+                "errors": sum(1 for s in group if s.error),
+                "latencyMs": _percentiles([s.latency_ms for s in group if not s.error]),
+                "ttftMs": _percentiles([s.ttft_ms for s in group if not s.error and s.ttft_ms is not None]),
+            }
+            for name, group in sorted(per_endpoint.items())
+        },
+    }
+    if cpu_seconds is not None:
+        result["gatewayCpu"] = {
+            "workers": workers,
+            "totalS": round(cpu_seconds, 3),
+            "msPerRequest": round(cpu_seconds * 1000 / len(samples), 3) if samples else 0.0,
+            "utilization": round(cpu_seconds / elapsed, 2) if elapsed else 0.0,  # 코어 수 기준 (1.0 = 1코어)
+        }
+    return result
+
+
+def _fmt(p: dict) -> str:
+    return f"p50 {p['p50']:.1f}  p99 {p['p99']:.1f}  max {p['max']:.1f}" if p else "-"
+
+
+def print_report(result: dict, args: argparse.Namespace) -> None:
+    print(f"concurrency {args.concurrency}, endpoints {','.join(args.endpoint_list)}, "
+          f"stream ratio {args.stream_ratio}, keys {args.keys}")
+    errors = ", ".join(f"{k}×{v}" for k, v in result["errors"].items())
+    print(f"requests      {result['requests']} (ok {result['ok']}{', errors: ' + errors if errors else ''})")
+    print(f"throughput    {result['throughputRps']} req/s over {result['elapsedS']}s")
+    print(f"latency ms    {_fmt(result['latencyMs'])}")
+    print(f"ttft ms       {_fmt(result['ttftMs'])}")
+    cpu = result.get("gatewayCpu")
+    if cpu:
+        print(f"gateway cpu   {cpu['msPerRequest']} ms/request "
+              f"({cpu['totalS']}s total, {cpu['utilization']} cores, {cpu['workers']} worker(s))")
+    print()
+    print(f"{'endpoint':<20}{'n':>7}{'err':>6}  {'latency p50/p99':>18}  {'ttft p50/p99':>16}")
+    for name, e in result["endpoints"].items():
+        lat = f"{e['latencyMs']['p50']:.1f}/{e['latencyMs']['p99']:.1f}" if e["latencyMs"] else "-"
+        ttft = f"{e['ttftMs']['p50']:.1f}/{e['ttftMs']['p99']:.1f}" if e["ttftMs"] else "-"
+        print(f"{name:<20}{e['requests']:>7}{e['errors']:>6}  {lat:>18}  {ttft:>16}")
+
+
+async def run(args: argparse.Namespace) -> dict:
+    stack = None
+    gateway_pid = args.gateway_pid
+    if args.gateway_url:
+        if not args.api_key:
+            raise SystemExit("--gateway-url requires at least one --api-key")
+        gateway_url, keys = args.gateway_url.rstrip("/"), args.api_key
+    else:
+        stack = Stack(args)
+        keys = [key_for(i) for i in range(args.keys)]
+    try:
+        if stack is not None:
+            await stack.start()
+            gateway_url, gateway_pid = stack.gateway_url, stack.gateway.pid
+        if args.warmup > 0:
+            await _drive(args, gateway_url, keys, args.warmup, None, record=False, seed=args.seed + 1)
+
+        cpu_before = _process_tree_cpu(gateway_pid) if gateway_pid else None
+        samples, elapsed = await _drive(args, gateway_url, keys, args.duration, args.requests, record=True, seed=args.seed)
+        cpu = _process_tree_cpu(gateway_pid) - cpu_before if gateway_pid else None
+        return summarize(samples, elapsed, cpu, args.workers if stack is not None else None)
+    finally:
+        if stack is not None:
+            stack.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="abcdLLM 게이트웨이 부하 테스트")
+    parser.add_argument("--concurrency", type=int, default=32, help="동시 요청 수")
+    parser.add_argument("--duration", type=float, default=15.0, help="측정 시간 (초)")
+    parser.add_argument("--requests", type=int, default=None, help="시간 대신 요청 수로 측정")
+    parser.add_argument("--warmup", type=float, default=2.0, help="측정 전 워밍업 시간 (초, 결과 제외)")
+    parser.add_argument("--endpoints", default="chat,generate,v1chat,openai", help=f"쉼표 구분: {','.join(ENDPOINTS)}")
+    parser.add_argument("--stream-ratio", type=float, default=0.5, help="스트리밍 요청 비율 (0~1)")
+    parser.add_argument("--keys", type=int, default=50, help="API 키(사용자) 수")
+    parser.add_argument("--workers", type=int, default=1, help="게이트웨이 uvicorn 워커 수")
+    parser.add_argument("--pb-latency-ms", type=float, default=0.0, help="가짜 PocketBase 요청당 지연 (ms)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="결과를 JSON으로 출력")
+    parser.add_argument("--keep-logs", action="store_true", help="하위 프로세스 로그 디렉터리 유지")
+    parser.add_argument("--gateway-url", default="", help="이미 실행 중인 게이트웨이 (하위 프로세스를 띄우지 않음)")
+    parser.add_argument("--api-key", action="append", default=[], help="--gateway-url과 함께 사용할 API 키 (반복 가능)")
+    parser.add_argument("--gateway-pid", type=int, default=None, help="--gateway-url 사용 시 CPU를 잴 게이트웨이 PID")
+    fake_ollama.add_arguments(parser)
+    args = parser.parse_args()
+
+    args.endpoint_list = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    unknown = set(args.endpoint_list) - set(ENDPOINTS)
+    if unknown or not args.endpoint_list:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown)) or '(none)'}")
+
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps({"config": {k: v for k, v in vars(args).items() if k not in ("api_key", "endpoint_list")}, **result}, indent=2))
+    else:
+        print_report(result, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""
+요청 단위 핫 경로 마이크로벤치마크
+부하 테스트(loadgen)와 별개로, 요청마다 실행되는 게이트웨이 자체 코드의 CPU 비용을 함수 단위로 추적합니다.
+
+케이스:
+  decode_jwt            dependencies._decode_jwt
+  api_key_user_hit      dependencies.get_api_key_user — 캐시 히트 (Redis 대신 프로세스 내 dict, JSON 직렬화 비용은 포함)
+  record_to_dict        dependencies._record_to_dict (PocketBase users 레코드)
+  key_to_response       keys._key_to_response (PocketBase api_keys 레코드)
+  chat_request_200msg   ChatRequest 검증 + _chat_payload(model_dump) — 메시지 200개
+  openai_completion     ollama_proxy._openai_completion (Ollama 응답 → OpenAI 형식)
+  ndjson_stream_lines   NdjsonFramer — 1000토큰 스트림, 줄 단위 조각
+  ndjson_stream_4k      NdjsonFramer — 같은 스트림, 4KB 조각 (줄이 조각 경계에 걸침)
+
+각 케이스는 timeit처럼 반복 횟수를 자동으로 정해(0.2초 이상) --repeat번 측정하고, 호출당 중앙값/최소값(µs)을 기록.
+비교는 최소값 기준 (다른 프로세스 간섭으로 생기는 잡음이 가장 적음 — timeit 권장과 동일).
+
+실행:
+  python -m benchmarks.micro                                  결과 출력
+  python -m benchmarks.micro --save benchmarks/micro_baseline.json  기준선 저장
+  python -m benchmarks.micro --compare benchmarks/micro_baseline.json [--threshold 0.2]
+      기준선 대비 최소값이 threshold 이상 느려진 케이스를 REGRESSION으로 표시하고 종료 코드 1
+  python -m benchmarks.micro --filter ndjson                  이름에 포함된 케이스만
+
+기준선은 측정한 머신에 종속되므로, 비교는 같은 머신에서 변경 전 --save → 변경 후 --compare 로 사용.
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import jwt
+from pocketbase.models import Record
+
+from app.config import settings
+from app.dependencies import _decode_jwt, _record_to_dict, get_api_key_user
+from app.models.ollama import ChatRequest
+from app.routers.keys import _key_to_response
+from app.routers.ollama_proxy import _chat_payload, _openai_completion
+from app.services import cache, passthrough
+
+CASES: dict = {}  # 이름 → setup 함수
+
+
+def case(name: str):
+    """setup 함수 등록: setup()은 측정할 인자 없는 함수를 반환"""
+    def decorator(setup):
+        CASES[name] = setup
+        return setup
+    return decorator
+
+
+class _DictRedis:
+    """cache 모듈이 쓰는 Redis 메서드만 가진 프로세스 내 저장소 (네트워크 왕복 제외, JSON 비용은 그대로)"""
+
+    def __init__(self):
+        self._data: dict[str, str] = {}
+
+    def get(self, key):
+        return self._data.get(key)
+
+    def setex(self, key, ttl, value):
+        self._data[key] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            self._data.pop(key, None)
+
+
+def _user_record_data(i: int = 0) -> dict:
+    return {
+        "id": f"benchuser{i:06d}",
+        "collectionId": "_pb_users_auth_",
+        "collectionName": "users",
+        "created": "2026-01-01 00:00:00.000Z",
+        "updated": "2026-10-01 12:00:00.000Z",
+        "email": f"bench{i}@example.com",
+        "name": f"bench {i}",
+        "role": "USER",
+        "primaryApiKey": "",
+        "dailyUsage": 1234,
+        "dailyQuota": 5000,
+        "totalUsage": 34567,
+        "totalQuota": 50000,
+        "lastActive": "2026-10-18 09:30:00.000Z",
+        "lastIp": "10.0.0.1",
+        "status": "active",
+        "accessCount": 42,
+        "verified": True,
+        "emailVisibility": False,
+        "username": f"bench{i}",
+    }
+
+
+def _key_record_data(i: int = 0) -> dict:
+    return {
+        "id": f"benchkey{i:07d}",
+        "collectionId": "api_keys",
+        "collectionName": "api_keys",
+        "created": "2026-01-01 00:00:00.000Z",
+        "updated": "2026-10-01 12:00:00.000Z",
+        "user": f"benchuser{i:06d}",
+        "name": "default",
+        "keyHash": "0" * 64,
+        "keyPrefix": "sk-abcd-0123456",
+        "keyPlain": "",
+        "dailyRequests": 1000,
+        "dailyTokens": 100000,
+        "totalTokens": 1000000,
+        "usedRequests": 12,
+        "usedTokens": 3456,
+        "totalUsedTokens": 98765,
+        "lastResetDate": "2026-10-18 00:00:00.000Z",
+        "isActive": True,
+    }
+
+
+def _ndjson_stream(tokens: int = 1000) -> bytes:
+    lines = []
+    for i in range(tokens):
+        lines.append(json.dumps({
+            "model": "qwen3:8b", "created_at": "2026-10-19T00:00:00.000000Z",
+            "message": {"role": "assistant", "content": f"tok{i} "}, "done": False,
+        }))
+    lines.append(json.dumps({
+        "model": "qwen3:8b", "created_at": "2026-10-19T00:00:01.000000Z",
+        "message": {"role": "assistant", "content": ""}, "done": True, "done_reason": "stop",
+        "total_duration": 1_000_000_000, "prompt_eval_count": 120, "eval_count": tokens,
+    }))
+    return ("\n".join(lines) + "\n").encode()
+
+
+def _run_coroutine(coro):
+    """await 지점이 없는 코루틴을 이벤트 루프 없이 실행 (API 키 캐시 히트 경로는 동기적으로 끝남)"""
+    try:
+        coro.send(None)
+    except StopIteration as e:
+        return e.value
+    coro.close()
+    raise RuntimeError("coroutine suspended; benchmark path is not synchronous")
+
+
+@case("decode_jwt")
+def _decode_jwt_case():
+    token = jwt.encode({"sub": "benchuser000000", "exp": int(time.time()) + 3600}, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+    return lambda: _decode_jwt(token)
+
+
+@case("api_key_user_hit")
+def _api_key_user_case():
+    cache._client = _DictRedis()
+    token = "sk-abcd-" + "ab" * 24
+    user = {**_record_to_dict(Record(_user_record_data())), "_api_key_id": "benchkey0000000"}
+    cache.set_cached_apikey_user(hashlib.sha256(token.encode()).hexdigest(), user)
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    if _run_coroutine(get_api_key_user(credentials))["id"] != user["id"]:
+        raise RuntimeError("api key cache miss")
+    return lambda: _run_coroutine(get_api_key_user(credentials))
+
+
+@case("record_to_dict")
+def _record_to_dict_case():
+    record = Record(_user_record_data())
+    return lambda: _record_to_dict(record)
+
+
+@case("key_to_response")
+def _key_to_response_case():
+    record = Record(_key_record_data())
+    return lambda: _key_to_response(record)
+
+
+@case("chat_request_200msg")
+def _chat_request_case():
+    data = {
+        "model": "qwen3:8b",
+        "messages": [
+            {"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i} " + "lorem ipsum dolor sit amet " * 8}
+            for i in range(200)
+        ],
+        "stream": True,
+        "options": {"temperature": 0.7, "num_ctx": 8192},
+    }
+
+    def run():
+        body = ChatRequest.model_validate(data)
+        return _chat_payload(body, body.model, stream=body.stream)
+    return run
+
+
+@case("openai_completion")
+def _openai_completion_case():
+    result = {
+        "model": "qwen3:8b", "created_at": "2026-10-19T00:00:01Z",
+        "message": {"role": "assistant", "content": "Connection pooling reuses sockets. " * 20},
+        "done": True, "done_reason": "stop", "total_duration": 1_000_000_000,
+        "prompt_eval_count": 120, "eval_count": 256,
+    }
+    return lambda: _openai_completion(result, "qwen3:8b")
+
+
+def _framer_case(chunks: list[bytes]):
+    def run():
+        framer = passthrough.NdjsonFramer()
+        for chunk in chunks:
+            framer.feed(chunk)
+        framer.close()
+        if framer.completion_tokens != 1000:
+            raise RuntimeError("framer missed the done object")
+    return run
+
+
+@case("ndjson_stream_lines")
+def _ndjson_lines_case():
+    return _framer_case([line + b"\n" for line in _ndjson_stream().split(b"\n")[:-1]])
+
+
+@case("ndjson_stream_4k")
+def _ndjson_4k_case():
+    stream = _ndjson_stream()
+    return _framer_case([stream[i:i + 4096] for i in range(0, len(stream), 4096)])
+
+
+def measure(fn, repeat: int, min_time: float = 0.2) -> dict:
+    fn()  # 워밍업 + 동작 확인
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2
+    per_call = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        per_call.append((time.perf_counter() - start) / loops * 1e6)
+    return {
+        "medianUs": round(statistics.median(per_call), 3),
+        "minUs": round(min(per_call), 3),
+        "loops": loops,
+        "repeat": repeat,
+    }
+
+
+def run_all(names: list[str], repeat: int) -> dict:
+    results = {}
+    for name in names:
+        results[name] = measure(CASES[name](), repeat)
+        print(f"  {name:<24}{results[name]['medianUs']:>12.2f} µs  (min {results[name]['minUs']:.2f})", file=sys.stderr)
+    return results
+
+
+def compare(baseline: dict, results: dict, threshold: float) -> list[str]:
+    """기준선 대비 표 출력. 느려진 케이스 이름 목록 반환"""
+    regressions = []
+    print(f"{'case':<24}{'baseline µs':>14}{'current µs':>14}{'change':>10}")
+    for name, current in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            print(f"{name:<24}{'-':>14}{current['minUs']:>14.2f}{'new':>10}")
+            continue
+        change = current["minUs"] / base["minUs"] - 1 if base["minUs"] else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{name:<24}{base['minUs']:>14.2f}{current['minUs']:>14.2f}{change * 100:>+9.1f}%{flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=7, help="측정 반복 횟수")
+    parser.add_argument("--filter", default="", help="이름에 이 문자열이 포함된 케이스만")
+    parser.add_argument("--save", metavar="PATH", help="결과를 기준선 JSON으로 저장")
+    parser.add_argument("--compare", metavar="PATH", help="기준선 JSON과 비교")
+    parser.add_argument("--threshold", type=float, default=0.2, help="회귀로 판단할 최소값 증가 비율 (기본 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    names = [n for n in CASES if args.filter in n]
+    if not names:
+        parser.error(f"no cases match {args.filter!r}")
+    results = run_all(names, args.repeat)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "meta": {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "machine": platform.machine(),
+                    "cpus": os.cpu_count(),
+                    "createdAt": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                },
+                "results": results,
+            }, f, indent=2)
+            f.write("\n")
+        print(f"saved {len(results)} cases → {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold * 100:.0f}%: {', '.join(regressions)}")
+            sys.exit(1)
+    elif not args.save:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,100 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from app.config import settings
-from app.routers import auth, user, keys, ollama_proxy, applications, admin, settings as settings_router
+from app.routers import auth, user, keys, ollama_proxy, applications, admin, batches, settings as settings_router
 from app.middleware.error_handler import register_error_handlers
 from app.middleware.request_logger import RequestLoggerMiddleware
 from app.middleware.rate_limiter import setup_rate_limiter
+from app.services import batch_service, leader, loop_monitor, model_catalog, model_policy, priority, quota_service, readiness, retention, rollups, storage, system_settings, usage_spool, usage_store
+
+
+async def _leader_startup() -> None:
+    """리더 싱글톤 작업: Ollama 감지 → 기본 모델 워밍업. 결과는 팔로워 워커에게 게시."""
+    from app.services.ollama_detector import auto_configure_ollama
+    from app.services.ollama_client import warmup
+
+    def _set(component: str, status: str, **detail) -> None:
+        readiness.set_state(component, status, **detail)
+        leader.publish_state(**{component: readiness.snapshot()["components"][component]})
+
+    _set("warmup", "pending")
+    _set("detection", "running")
+    try:
+        url = await auto_configure_ollama()
+        _set("detection", "done" if url else "failed", ollamaUrl=url)
+    except Exception as e:
+        _set("detection", "failed", error=str(e))
+
+    # 기본 모델 VRAM 워밍업 (첫 요청 콜드 스타트 제거)
+    _set("warmup", "running", model=settings.DEFAULT_MODEL)
+    ok = await warmup()
+    _set("warmup", "done" if ok else "failed", model=settings.DEFAULT_MODEL)
+
+
+async def _follow_leader_startup() -> None:
+    """팔로워 워커: 리더가 게시한 감지/워밍업 결과를 readiness에 반영하고 설정 스냅샷을 갱신."""
+    if await leader.wait_for_election():
+        return
+    while not leader.is_leader():
+        state = leader.read_state() or {}
+        for component in readiness.COMPONENTS:
+            if component in state:
+                readiness.set_state(component, **state[component])
+        if readiness.is_ready():
+            # 리더가 DB에 저장한 URL을 바로 반영 (바뀌었으면 리스너가 클라이언트 재생성)
+            await system_settings.refresh()
+            return
+        await asyncio.sleep(1.0)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """애플리케이션 시작 및 종료 시 실행되는 로직"""
-    # Startup: Ollama 자동 감지 및 구성
-    from app.services.ollama_detector import auto_configure_ollama
-    await auto_configure_ollama()
-
-    # Startup: 기본 모델 VRAM 워밍업 (첫 요청 콜드 스타트 제거)
-    import asyncio
-    from app.services.ollama_client import warmup
-    asyncio.create_task(warmup())
+    # system_settings 스냅샷 첫 로드 (Ollama URL 등 — 이후 요청 경로에서 PocketBase 조회 없음)
+    await system_settings.refresh()
+    # Startup: 싱글톤 작업은 리더 워커에서만 실행 (uvicorn --workers N 대응, app/services/leader.py)
+    # Ollama 감지 + 워밍업은 백그라운드로 실행되며 진행 상황은 /api/ready
+    leader.register_job("startup", _leader_startup)
+    leader.register_job("daily_reset", quota_service.daily_reset_job)
+    leader.register_job("model_policy", model_policy.policy_job)
+    leader.register_job("batch_worker", batch_service.worker_job)
+    leader.register_job("retention", retention.retention_job)
+    if settings.STORAGE_BACKEND == "sqlite":
+        # 내장 저장소 ↔ PocketBase 동기화 (신원 당겨 오기, 카운터/사용 로그 반영)
+        from app.services import sqlite_storage
+        leader.register_job("storage_mirror", sqlite_storage.mirror_job)
+    election_task = asyncio.create_task(leader.run())
+    follower_task = asyncio.create_task(_follow_leader_startup())
+    # 모델 목록 캐시는 워커마다 메모리에 유지 (리더 여부와 무관)
+    catalog_task = asyncio.create_task(model_catalog.refresh_job())
+    # 모델 등급: 팔로워는 리더가 게시한 값을 받아 keep_alive에 사용
+    tiers_task = asyncio.create_task(model_policy.tiers_job())
+    # 대화형 요청 수 공유 (배치 양보 판단을 리더 워커 밖의 트래픽까지 — Redis 있을 때)
+    priority_task = asyncio.create_task(priority.share_job())
+    # system_settings 변경 확인 (워커별 스냅샷)
+    settings_task = asyncio.create_task(system_settings.refresh_job())
+    # 이벤트 루프 지연 측정 + 블로킹 호출 스택 기록 (워커별)
+    loop_task = asyncio.create_task(loop_monitor.run())
+    # 사용량 롤업 증분 기록 (워커별 메모리 버퍼 → 주기적 반영)
+    rollup_task = asyncio.create_task(rollups.flush_job())
+    # 로컬 컬럼형 사용량 저장소 기록 (워커별 세그먼트)
+    store_task = asyncio.create_task(usage_store.flush_job())
+    # 사용 로그/쿼터 차감 스풀: 그룹 커밋 + PocketBase 재전송 (워커별 디렉터리, 종료된 워커 것은 넘겨받음)
+    spool_task = asyncio.create_task(usage_spool.run())
 
     yield
 
-    # Shutdown: 필요한 경우 정리 작업
+    # Shutdown: 팔로워 대기 중단, 리더 작업 취소 및 락 해제
+    for task in (spool_task, store_task, rollup_task, loop_task, tiers_task, priority_task, settings_task, catalog_task, follower_task, election_task):
+        task.cancel()
+    await asyncio.gather(election_task, follower_task, catalog_task, settings_task, priority_task, tiers_task, loop_task, rollup_task, store_task, spool_task, return_exceptions=True)
+    # 저장소 쓰기 큐 반영 후 닫기
+    await asyncio.to_thread(storage.close)
 
 
 app = FastAPI(title="abcdLLM API", version="1.0.0", lifespan=lifespan)
@@ -36,6 +106,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Request-ID", "X-Next-Cursor"],
 )
 
 # Middleware
@@ -49,6 +120,7 @@ app.include_router(user.router, prefix="/api/user", tags=["User"])
 app.include_router(keys.router, prefix="/api/keys", tags=["API Keys"])
 app.include_router(ollama_proxy.router, prefix="/api/v1", tags=["Ollama Proxy"])
 app.include_router(ollama_proxy.openai_router, prefix="/v1", tags=["OpenAI Compatible"])
+app.include_router(batches.router, prefix="/v1", tags=["Batch API"])
 app.include_router(ollama_proxy.ollama_native_router, prefix="/api", tags=["Ollama Native"])
 app.include_router(applications.router, prefix="/api/applications", tags=["Applications"])
 app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
@@ -58,3 +130,11 @@ app.include_router(settings_router.router, prefix="/api/settings", tags=["Settin
 @app.get("/api/health")
 async def health():
     return {"status": "ok"}
+
+
+@app.get("/api/ready")
+async def ready():
+    """Ollama 감지/워밍업이 끝났는지 반환. 진행 중이면 503."""
+    state = readiness.snapshot()
+    state["role"] = "leader" if leader.is_leader() else "follower"
+    return JSONResponse(status_code=200 if state["ready"] else 503, content=state)
@@ -0,0 +1,558 @@
+"""
+PocketBase 스키마 마이그레이션 (버전 관리 + 인덱스)
+setup_collections.py / create_usage_logs.py를 대체합니다. 콜렉션과 인덱스를 버전별 선언(MIGRATIONS)으로 두고,
+아직 적용되지 않은 버전만 순서대로 적용한 뒤 schema_migrations 콜렉션에 기록합니다.
+
+- 적용은 멱등: 콜렉션이 없으면 생성, 있으면 빠진 필드/인덱스만 추가 (기존 필드의 타입/옵션과 데이터는 건드리지 않음)
+  → 예전에 setup_collections.py로 만든 DB에도 그대로 실행 가능 (이미 있는 것은 건너뜀)
+- API 규칙(listRule 등)은 해당 버전을 처음 적용할 때만 설정 (이후 관리자 UI에서 바꾼 규칙을 덮어쓰지 않음)
+- 관계 필드는 {"collection": 이름}으로 선언하고 적용 시 콜렉션 id로 변환
+- 인덱스는 PocketBase가 그대로 SQLite에 실행하는 DDL. 핫 경로 조회(HOT_QUERIES)가 인덱스를 타는지는
+  --verify로 확인: 선언된 스키마로 SQLite 대역 DB를 만들어 데이터를 채운 뒤 EXPLAIN QUERY PLAN과
+  인덱스 유무에 따른 조회 시간을 비교 (PocketBase 없이 실행, 전체 스캔이 남으면 종료 코드 1)
+
+Usage:
+  PB_ADMIN_EMAIL=... PB_ADMIN_PASSWORD=... python migrate.py   미적용 마이그레이션 적용
+  python migrate.py --status                                    적용 현황
+  python migrate.py --dry-run                                   변경 예정 내용만 출력
+  python migrate.py --verify [--rows 50000]                     핫 경로 인덱스 확인 (로컬 SQLite)
+
+환경 변수: PB_URL (기본 POCKETBASE_URL 또는 http://127.0.0.1:8090), PB_ADMIN_EMAIL, PB_ADMIN_PASSWORD
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sqlite3
+import ssl
+import sys
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta, timezone
+
+PB_URL = os.environ.get("PB_URL") or os.environ.get("POCKETBASE_URL") or "http://127.0.0.1:8090"
+MIGRATIONS_COLLECTION = "schema_migrations"
+
+
+# ── 필드 선언 ─────────────────────────────────────────────────────
+
+def text(name: str, **options) -> dict:
+    return {"name": name, "type": "text", "options": options}
+
+
+def number(name: str, minimum: float | None = 0) -> dict:
+    return {"name": name, "type": "number", "options": {} if minimum is None else {"min": minimum}}
+
+
+def boolean(name: str) -> dict:
+    return {"name": name, "type": "bool"}
+
+
+def date(name: str) -> dict:
+    return {"name": name, "type": "date"}
+
+
+def select(name: str, values: list[str]) -> dict:
+    return {"name": name, "type": "select", "options": {"values": values, "maxSelect": 1}}
+
+
+def relation(name: str, collection: str) -> dict:
+    return {"name": name, "type": "relation", "options": {"collection": collection, "maxSelect": 1}}
+
+
+OPEN_RULES = {"listRule": "", "viewRule": "", "createRule": "", "updateRule": "", "deleteRule": ""}
+USAGE_METRICS = [number(m) for m in ("requests", "errors", "promptTokens", "completionTokens", "totalTokens", "responseTimeMs")]
+
+
+# ── 마이그레이션 (버전 순, 한 번 배포된 버전은 수정하지 말고 새 버전을 추가) ──
+
+MIGRATIONS = [
+    {
+        "version": 1,
+        "name": "기본 콜렉션",
+        "collections": {
+            "users": {
+                "schema": [
+                    text("name"),
+                    select("role", ["ADMIN", "USER"]),
+                    text("primaryApiKey"),
+                    number("dailyUsage"),
+                    number("dailyQuota"),
+                    number("totalUsage"),
+                    number("totalQuota"),
+                    date("lastActive"),
+                    text("lastIp"),
+                    select("status", ["active", "blocked"]),
+                    number("accessCount"),
+                ],
+                "rules": {"listRule": "", "viewRule": "", "createRule": "", "updateRule": "@request.auth.id != ''", "deleteRule": None},
+            },
+            "api_keys": {
+                "schema": [
+                    relation("user", "users"),
+                    text("name"),
+                    text("keyHash"),
+                    text("keyPrefix"),
+                    text("keyPlain"),
+                    number("dailyRequests"),
+                    number("dailyTokens"),
+                    number("totalTokens"),
+                    number("usedRequests"),
+                    number("usedTokens"),
+                    number("totalUsedTokens"),
+                    date("lastResetDate"),
+                    boolean("isActive"),
+                ],
+                "rules": OPEN_RULES,
+            },
+            "security_events": {
+                "schema": [
+                    select("type", ["failed_login", "unusual_traffic", "brute_force", "ddos_attempt"]),
+                    select("severity", ["low", "medium", "high", "critical"]),
+                    text("description"),
+                    text("ip"),
+                    relation("userId", "users"),
+                ],
+                "rules": OPEN_RULES,
+            },
+            "api_applications": {
+                "schema": [
+                    relation("user", "users"),
+                    text("userName"),
+                    text("projectName"),
+                    text("useCase"),
+                    number("requestedQuota"),
+                    text("targetModel"),
+                    select("status", ["pending", "approved", "rejected"]),
+                    text("adminNote"),
+                ],
+                "rules": OPEN_RULES,
+            },
+            "usage_logs": {
+                "schema": [
+                    relation("user", "users"),
+                    relation("apiKey", "api_keys"),
+                    text("model"),
+                    text("endpoint"),
+                    number("promptTokens"),
+                    number("completionTokens"),
+                    number("totalTokens"),
+                    number("responseTimeMs"),
+                    number("statusCode", minimum=None),
+                    text("ip"),
+                    boolean("isError"),
+                ],
+                "rules": OPEN_RULES,
+            },
+            "user_settings": {
+                "schema": [
+                    relation("user", "users"),
+                    boolean("autoModelUpdate"),
+                    boolean("detailedLogging"),
+                    text("ipWhitelist"),
+                    boolean("emailSecurityAlerts"),
+                    boolean("usageThresholdAlert"),
+                ],
+                "rules": OPEN_RULES,
+            },
+            "system_settings": {
+                "schema": [text("key", max=100), text("value"), text("description")],
+                "indexes": ["CREATE UNIQUE INDEX idx_system_settings_key ON system_settings (key)"],
+                "rules": OPEN_RULES,
+            },
+        },
+    },
+    {
+        # app/services/rollups.py — 차원 필드는 text (사용자/키가 삭제되어도 집계는 유지)
+        "version": 2,
+        "name": "사용량 롤업",
+        "collections": {
+            "usage_user_daily": {
+                "schema": [text("user"), text("day"), *USAGE_METRICS],
+                "indexes": ["CREATE UNIQUE INDEX idx_usage_user_daily ON usage_user_daily (user, day)"],
+                "rules": {**OPEN_RULES, "deleteRule": None},
+            },
+            "usage_key_daily": {
+                "schema": [text("apiKey"), text("user"), text("day"), *USAGE_METRICS],
+                "indexes": ["CREATE UNIQUE INDEX idx_usage_key_daily ON usage_key_daily (apiKey, day)"],
+                "rules": {**OPEN_RULES, "deleteRule": None},
+            },
+            "usage_model_hourly": {
+                "schema": [text("model"), text("hour"), *USAGE_METRICS],
+                "indexes": ["CREATE UNIQUE INDEX idx_usage_model_hourly ON usage_model_hourly (hour, model)"],
+                "rules": {**OPEN_RULES, "deleteRule": None},
+            },
+        },
+    },
+    {
+        # app/services/retention.py — 보존 기간이 지난 security_events를 접어 두는 곳
+        "version": 3,
+        "name": "보안 이벤트 일별 집계",
+        "collections": {
+            "security_events_daily": {
+                "schema": [text("day"), text("type"), text("severity"), number("count")],
+                "indexes": ["CREATE UNIQUE INDEX idx_security_events_daily ON security_events_daily (day, type, severity)"],
+                "rules": {**OPEN_RULES, "deleteRule": None},
+            },
+        },
+    },
+    {
+        # 요청 경로/관리자 목록/백그라운드 작업의 필터·정렬 컬럼 (HOT_QUERIES로 확인)
+        "version": 4,
+        "name": "핫 경로 인덱스",
+        "collections": {
+            "api_keys": {"indexes": [
+                "CREATE UNIQUE INDEX idx_api_keys_keyHash ON api_keys (keyHash)",
+                "CREATE INDEX idx_api_keys_user ON api_keys (user)",
+                "CREATE INDEX idx_api_keys_lastResetDate ON api_keys (lastResetDate)",
+            ]},
+            "usage_logs": {"indexes": [
+                "CREATE INDEX idx_usage_logs_user_created ON usage_logs (user, created)",
+                "CREATE INDEX idx_usage_logs_created ON usage_logs (created)",
+                "CREATE INDEX idx_usage_logs_apiKey ON usage_logs (apiKey)",
+            ]},
+            "user_settings": {"indexes": ["CREATE UNIQUE INDEX idx_user_settings_user ON user_settings (user)"]},
+            "security_events": {"indexes": ["CREATE INDEX idx_security_events_created ON security_events (created)"]},
+            "api_applications": {"indexes": ["CREATE INDEX idx_api_applications_user ON api_applications (user)"]},
+            "users": {"indexes": ["CREATE INDEX idx_users_lastActive ON users (lastActive)"]},
+        },
+    },
+]
+
+
+def declared_schema() -> dict[str, dict]:
+    """모든 버전을 합친 최종 스키마 {콜렉션: {"schema": [...], "indexes": [...]}}"""
+    result: dict[str, dict] = {}
+    for migration in MIGRATIONS:
+        for name, spec in migration["collections"].items():
+            target = result.setdefault(name, {"schema": [], "indexes": []})
+            target["schema"] += spec.get("schema", [])
+            target["indexes"] += spec.get("indexes", [])
+    return result
+
+
+def index_name(ddl: str) -> str:
+    match = re.search(r"INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?[`\"]?(\w+)", ddl, re.IGNORECASE)
+    return match.group(1) if match else ddl
+
+
+# ── PocketBase API ────────────────────────────────────────────────
+
+def api(method: str, path: str, body: dict | None = None, token: str = "") -> dict:
+    url = f"{PB_URL}{path}"
+    data = json.dumps(body).encode() if body else None
+    headers = {"Content-Type": "application/json", "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"}
+    if token:
+        headers["Authorization"] = token
+    req = urllib.request.Request(url, data=data, headers=headers, method=method)
+    ctx = ssl.create_default_context()
+    try:
+        with urllib.request.urlopen(req, context=ctx) as resp:
+            raw = resp.read()
+            return json.loads(raw) if raw else {}
+    except urllib.error.HTTPError as e:
+        err_body = e.read().decode()
+        raise RuntimeError(f"{method} {path} → {e.code}: {err_body}") from None
+
+
+def get_collection(name: str, token: str) -> dict | None:
+    try:
+        return api("GET", f"/api/collections/{name}", token=token)
+    except RuntimeError as e:
+        if "→ 404" in str(e):
+            return None
+        raise
+
+
+def _resolve_field(field: dict, token: str, ids: dict[str, str]) -> dict:
+    field = json.loads(json.dumps(field))
+    options = field.get("options") or {}
+    target = options.pop("collection", None)
+    if target:
+        if target not in ids:
+            collection = get_collection(target, token)
+            if collection is None:
+                raise RuntimeError(f"relation target {target} does not exist")
+            ids[target] = collection["id"]
+        options["collectionId"] = ids[target]
+    field["options"] = options
+    return field
+
+
+def ensure_collection(name: str, spec: dict, token: str, ids: dict[str, str], apply_rules: bool, dry_run: bool) -> list[str]:
+    """콜렉션 하나를 선언에 맞춤 (없으면 생성, 있으면 빠진 필드/인덱스만 추가). 변경 내용 목록 반환"""
+    existing = get_collection(name, token)
+    fields = [_resolve_field(f, token, ids) for f in spec.get("schema", [])]
+    indexes = spec.get("indexes", [])
+    rules = spec.get("rules", {}) if apply_rules else {}
+
+    if existing is None:
+        changes = [f"create {name} ({len(fields)} fields, {len(indexes)} indexes)"]
+        if not dry_run:
+            created = api("POST", "/api/collections", {
+                "name": name, "type": "base", "schema": fields, "indexes": indexes, **rules,
+            }, token)
+            ids[name] = created["id"]
+        return changes
+
+    ids[name] = existing["id"]
+    current_fields = existing.get("schema") or []
+    current_names = {f["name"] for f in current_fields}
+    current_indexes = existing.get("indexes") or []
+    current_index_names = {index_name(i) for i in current_indexes}
+
+    new_fields = [f for f in fields if f["name"] not in current_names]
+    new_indexes = [i for i in indexes if index_name(i) not in current_index_names]
+    for f in fields:
+        match = next((c for c in current_fields if c["name"] == f["name"]), None)
+        if match is not None and match.get("type") != f["type"]:
+            print(f"  Warning: {name}.{f['name']} is {match.get('type')}, declared {f['type']} (left unchanged)")
+
+    changes = [f"add field {name}.{f['name']}" for f in new_fields]
+    changes += [f"add index {index_name(i)}" for i in new_indexes]
+    changes += [f"set {rule} on {name}" for rule in rules]
+    if (new_fields or new_indexes or rules) and not dry_run:
+        # PATCH는 schema/indexes 전체를 교체하므로 기존 항목(필드 id 포함)을 그대로 두고 뒤에 추가
+        body: dict = {**rules}
+        if new_fields:
+            body["schema"] = current_fields + new_fields
+        if new_indexes:
+            body["indexes"] = current_indexes + new_indexes
+        api("PATCH", f"/api/collections/{existing['id']}", body, token)
+    return changes
+
+
+def applied_versions(token: str) -> dict[int, dict]:
+    if get_collection(MIGRATIONS_COLLECTION, token) is None:
+        return {}
+    result = api("GET", f"/api/collections/{MIGRATIONS_COLLECTION}/records?perPage=500&sort=version", token=token)
+    return {int(r["version"]): r for r in result.get("items", [])}
+
+
+def ensure_migrations_collection(token: str) -> None:
+    if get_collection(MIGRATIONS_COLLECTION, token) is None:
+        api("POST", "/api/collections", {
+            "name": MIGRATIONS_COLLECTION,
+            "type": "base",
+            "schema": [number("version"), text("name"), text("appliedAt")],
+            "indexes": [f"CREATE UNIQUE INDEX idx_{MIGRATIONS_COLLECTION}_version ON {MIGRATIONS_COLLECTION} (version)"],
+            "listRule": None, "viewRule": None, "createRule": None, "updateRule": None, "deleteRule": None,
+        }, token)
+
+
+def authenticate() -> str:
+    email = os.environ.get("PB_ADMIN_EMAIL", "")
+    password = os.environ.get("PB_ADMIN_PASSWORD", "")
+    if not email or not password:
+        print("  ERROR: PB_ADMIN_EMAIL / PB_ADMIN_PASSWORD 환경 변수가 필요합니다.")
+        sys.exit(2)
+    return api("POST", "/api/admins/auth-with-password", {"identity": email, "password": password})["token"]
+
+
+def run_migrations(dry_run: bool) -> None:
+    print(f"=== PocketBase 마이그레이션 ({PB_URL}) ===\n")
+    token = authenticate()
+    applied = applied_versions(token)
+    pending = [m for m in MIGRATIONS if m["version"] not in applied]
+    if not pending:
+        print(f"최신 상태입니다 (v{max(applied)}).")
+        return
+    if not dry_run:
+        ensure_migrations_collection(token)
+    ids: dict[str, str] = {"users": "_pb_users_auth_"}
+    for migration in pending:
+        print(f"[v{migration['version']}] {migration['name']}")
+        for name, spec in migration["collections"].items():
+            try:
+                changes = ensure_collection(name, spec, token, ids, apply_rules=True, dry_run=dry_run)
+            except RuntimeError as e:
+                print(f"  ERROR: {name}: {e}")
+                print("\n중단: 이 버전은 기록하지 않았습니다. 원인을 해결한 뒤 다시 실행하세요.")
+                sys.exit(1)
+            for change in changes or [f"{name}: 변경 없음"]:
+                print(f"  {change}")
+        if not dry_run:
+            api("POST", f"/api/collections/{MIGRATIONS_COLLECTION}/records", {
+                "version": migration["version"],
+                "name": migration["name"],
+                "appliedAt": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            }, token)
+        print()
+    print("--dry-run: 적용하지 않았습니다." if dry_run else "=== 완료! ===")
+
+
+def show_status() -> None:
+    token = authenticate()
+    applied = applied_versions(token)
+    for migration in MIGRATIONS:
+        record = applied.get(migration["version"])
+        mark = f"applied {record['appliedAt']}" if record else "pending"
+        print(f"  v{migration['version']:<3} {migration['name']:<20} {mark}")
+
+
+# ── 핫 경로 인덱스 확인 (SQLite 대역) ─────────────────────────────
+
+# (이름, 콜렉션, WHERE/ORDER 절, 파라미터 생성) — 앱이 PocketBase에 보내는 필터를 SQL로 옮긴 것
+HOT_QUERIES = [
+    ("api key lookup (dependencies.get_api_key_user)", "api_keys",
+     "WHERE keyHash = ? AND isActive = 1 LIMIT 1", lambda d: [d["keyHash"]]),
+    ("keys of a user (keys.list_keys)", "api_keys",
+     "WHERE user = ? LIMIT 50", lambda d: [d["user"]]),
+    ("daily key reset (quota_service)", "api_keys",
+     "WHERE (usedRequests > 0 OR usedTokens > 0) AND lastResetDate < ? LIMIT 200", lambda d: [d["yesterday"]]),
+    ("user usage range", "usage_logs",
+     "WHERE user = ? AND created >= ? ORDER BY created DESC LIMIT 100", lambda d: [d["user"], d["weekAgo"]]),
+    ("recent usage (admin metrics)", "usage_logs",
+     "ORDER BY created DESC LIMIT 100", lambda d: []),
+    ("usage export/retention range", "usage_logs",
+     "WHERE created >= ? AND created < ? ORDER BY created LIMIT 500", lambda d: [d["weekAgo"], d["dayAgo"]]),
+    ("usage by api key", "usage_logs",
+     "WHERE apiKey = ? LIMIT 100", lambda d: [d["apiKey"]]),
+    ("user settings (settings router)", "user_settings",
+     "WHERE user = ? LIMIT 1", lambda d: [d["user"]]),
+    ("system setting (ollama_client)", "system_settings",
+     "WHERE key = ? LIMIT 1", lambda d: ["ollama_base_url"]),
+    ("recent security events", "security_events",
+     "ORDER BY created DESC LIMIT 50", lambda d: []),
+    ("daily user reset (quota_service)", "users",
+     "WHERE dailyUsage > 0 AND lastActive < ? LIMIT 200", lambda d: [d["yesterday"]]),
+    ("user daily rollups (user dashboard)", "usage_user_daily",
+     "WHERE user = ? AND day >= ? ORDER BY day", lambda d: [d["user"], d["weekAgo"][:10]]),
+]
+
+_SQL_TYPES = {"number": "NUMERIC", "bool": "BOOLEAN"}
+
+
+def _pb_time(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3] + "Z"
+
+
+def build_standin(rows: int, with_indexes: bool) -> sqlite3.Connection:
+    """선언된 스키마로 PocketBase와 같은 형태(id TEXT PK, created/updated TEXT)의 SQLite DB 생성 + 데이터 채움"""
+    db = sqlite3.connect(":memory:")
+    schema = declared_schema()
+    for name, spec in schema.items():
+        columns = ["id TEXT PRIMARY KEY NOT NULL", "created TEXT DEFAULT '' NOT NULL", "updated TEXT DEFAULT '' NOT NULL"]
+        if name == "users":
+            columns += ["email TEXT DEFAULT ''", "username TEXT DEFAULT ''"]
+        columns += [f"[{f['name']}] {_SQL_TYPES.get(f['type'], 'TEXT')} DEFAULT ''" for f in spec["schema"]]
+        db.execute(f"CREATE TABLE [{name}] ({', '.join(columns)})")
+        if name == "users":
+            # PocketBase auth 콜렉션의 기본 인덱스
+            db.execute("CREATE UNIQUE INDEX _users_email ON users (email)")
+
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc)
+    users = max(rows // 50, 10)
+
+    def stamp(i: int, total: int) -> str:
+        return _pb_time(now - timedelta(days=30) + timedelta(seconds=30 * 86400 * i / total))
+
+    db.executemany("INSERT INTO users (id, created, email, dailyUsage, lastActive) VALUES (?, ?, ?, ?, ?)", [
+        (f"u{i:014d}", stamp(i, users), f"user{i}@example.com", rng.randint(0, 5000), stamp(rng.randint(0, users), users))
+        for i in range(users)
+    ])
+    db.executemany(
+        "INSERT INTO api_keys (id, created, user, keyHash, isActive, usedRequests, usedTokens, lastResetDate) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (f"k{i:014d}", stamp(i, users * 2), f"u{i % users:014d}", f"{rng.getrandbits(256):064x}", 1,
+             rng.randint(0, 100), rng.randint(0, 10000), stamp(rng.randint(0, users), users))
+            for i in range(users * 2)
+        ],
+    )
+    db.executemany(
+        "INSERT INTO usage_logs (id, created, user, apiKey, model, totalTokens, responseTimeMs, isError) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (f"l{i:014d}", stamp(i, rows), f"u{rng.randrange(users):014d}", f"k{rng.randrange(users * 2):014d}",
+             rng.choice(["qwen3:8b", "llama3.2:3b"]), rng.randint(1, 4000), rng.randint(50, 5000), rng.random() < 0.02)
+            for i in range(rows)
+        ],
+    )
+    db.executemany("INSERT INTO user_settings (id, created, user) VALUES (?, ?, ?)", [
+        (f"s{i:014d}", stamp(i, users), f"u{i:014d}") for i in range(users)
+    ])
+    db.executemany("INSERT INTO system_settings (id, created, key, value) VALUES (?, ?, ?, ?)", [
+        (f"g{i:014d}", stamp(i, 50), f"setting_{i}", "x") for i in range(50)
+    ] + [("gollama00000000", stamp(0, 1), "ollama_base_url", "http://127.0.0.1:11434")])
+    db.executemany("INSERT INTO security_events (id, created, type, severity) VALUES (?, ?, ?, ?)", [
+        (f"e{i:014d}", stamp(i, rows // 10), "failed_login", "low") for i in range(rows // 10)
+    ])
+    db.executemany("INSERT INTO usage_user_daily (id, user, day, requests) VALUES (?, ?, ?, ?)", [
+        (f"d{i:014d}", f"u{i % users:014d}", stamp(i, users * 30)[:10], 1) for i in range(users * 30)
+    ])
+
+    # PocketBase가 기본으로 만드는 인덱스(unique 롤업/설정 키 포함)는 v1~3 선언에 들어 있으므로
+    # 인덱스 없음 기준선에서는 v4(핫 경로 인덱스)만 뺀다
+    baseline = {index_name(i) for m in MIGRATIONS if m["version"] < 4 for spec in m["collections"].values() for i in spec.get("indexes", [])}
+    for spec in schema.values():
+        for ddl in spec["indexes"]:
+            if with_indexes or index_name(ddl) in baseline:
+                db.execute(ddl)
+    db.execute("ANALYZE")
+    return db
+
+
+def _sample(db: sqlite3.Connection) -> dict:
+    now = datetime.now(timezone.utc)
+    key_hash, user = db.execute("SELECT keyHash, user FROM api_keys ORDER BY id DESC LIMIT 1").fetchone()
+    return {
+        "keyHash": key_hash,
+        "user": user,
+        "apiKey": db.execute("SELECT id FROM api_keys ORDER BY id DESC LIMIT 1 OFFSET 3").fetchone()[0],
+        "dayAgo": _pb_time(now - timedelta(days=1)),
+        "weekAgo": _pb_time(now - timedelta(days=7)),
+        "yesterday": (now - timedelta(days=1)).strftime("%Y-%m-%d") + " 00:00:00.000Z",
+    }
+
+
+def _time_query(db: sqlite3.Connection, sql: str, params: list, repeat: int = 20) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        db.execute(sql, params).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def verify(rows: int) -> bool:
+    print(f"=== 핫 경로 인덱스 확인 (SQLite 대역, usage_logs {rows}행) ===\n")
+    indexed = build_standin(rows, with_indexes=True)
+    plain = build_standin(rows, with_indexes=False)
+    params = _sample(indexed)
+    ok = True
+    print(f"{'query':<48}{'no idx ms':>11}{'idx ms':>10}  plan")
+    for name, collection, clause, make_params in HOT_QUERIES:
+        sql = f"SELECT * FROM [{collection}] {clause}"
+        args = make_params(params)
+        plan = " / ".join(row[-1] for row in indexed.execute(f"EXPLAIN QUERY PLAN {sql}", args).fetchall())
+        scans = re.search(r"\bSCAN (?!.*USING (COVERING )?INDEX)", plan) is not None
+        ok = ok and not scans
+        before = _time_query(plain, sql, args)
+        after = _time_query(indexed, sql, args)
+        flag = "  FULL SCAN" if scans else ""
+        print(f"{name:<48}{before:>11.3f}{after:>10.3f}  {plan}{flag}")
+    print()
+    print("모든 핫 경로 조회가 인덱스를 사용합니다." if ok else "전체 스캔이 남은 조회가 있습니다 (FULL SCAN).")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PocketBase 스키마 마이그레이션")
+    parser.add_argument("--status", action="store_true", help="버전별 적용 현황")
+    parser.add_argument("--dry-run", action="store_true", help="변경 예정 내용만 출력")
+    parser.add_argument("--verify", action="store_true", help="SQLite 대역 DB로 핫 경로 인덱스 확인 (PocketBase 불필요)")
+    parser.add_argument("--rows", type=int, default=50000, help="--verify에서 채울 usage_logs 행 수")
+    args = parser.parse_args()
+
+    if args.verify:
+        sys.exit(0 if verify(args.rows) else 1)
+    if args.status:
+        show_status()
+        return
+    run_migrations(args.dry_run)
+
+
+if __name__ == "__main__":
+    main()